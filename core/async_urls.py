@@ -0,0 +1,14 @@
+from django.urls import path
+from . import async_views
+
+
+# Served ahead of core.urls under ASGI (see event_system.asgi_urls), so the
+# route names stay the same and reverse() works either way.
+urlpatterns = [
+    path('', async_views.dashboard_view, name='dashboard'),
+    path('dashboard/', async_views.dashboard_view, name='dashboard'),
+    path('categories/', async_views.category_list, name='category_list'),
+    path('events/', async_views.event_list, name='event_list'),
+    path('events/search/', async_views.search_events, name='event_search'),
+    path('profile/', async_views.profile_view, name='profile'),
+]
@@ -0,0 +1,252 @@
+"""
+Async versions of the read-heavy views, served by event_system.asgi_urls
+when the project runs under an ASGI server. They load their data with the
+async ORM and only hop to a thread to render the template, so one worker
+can hold many slow clients at once. The sync views in core.views remain
+what WSGI serves.
+"""
+import asyncio
+from datetime import date, datetime
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.http import StreamingHttpResponse
+from django.shortcuts import aget_object_or_404, render
+from django.template.loader import render_to_string
+from django.utils.functional import SimpleLazyObject
+
+from . import feeds, recurrence, search
+from .decorators import conditional_page, query_budget, replica_reads
+from .models import Category, Event, EventSeries, Participant, RSVP
+from .roles import Roles, is_organizer
+from .routers import primary_reads
+from .stats import (
+    DASHBOARD_PANEL_SIZE, aget_dashboard_events, aget_dashboard_stats, aget_occurrence_summary, aget_stats_version,
+    aget_today_events, get_dashboard_events, get_today_events,
+)
+from .versions import amodels_version
+from .views import (
+    EVENT_STREAM_THRESHOLD, FRAGMENT_TIMEOUT, SEARCH_PAGE_SIZE, _event_list_page, _event_occurrences,
+    _event_stream_key, _occurrence_start, _search_params, _split_event_list, merge_occurrences,
+)
+
+
+arender = sync_to_async(render)
+arender_to_string = sync_to_async(render_to_string)
+
+
+async def _fragment_cached(name, *vary_on):
+    return await cache.ahas_key(make_template_fragment_key(name, vary_on))
+
+
+async def _unless_cached(name, vary_on, load, fallback):
+    """
+    Loads a fragment's data with ``load`` unless the fragment is already
+    cached. A cached fragment gets a lazy sync ``fallback`` instead, in case
+    it is evicted before the template reads it. Either way the data fills
+    the fragment cache, so it is read from the primary.
+    """
+    if await _fragment_cached(name, *vary_on):
+        return SimpleLazyObject(primary_reads()(fallback))
+    with primary_reads():
+        return await load()
+
+
+# 6 once the stats and panels are cached; the first request of the day
+# also counts, loads the series and fills both panels
+@replica_reads
+@query_budget(13)
+@login_required
+@conditional_page(Event, EventSeries, Category, Participant, daily=True)
+async def dashboard_view(request):
+    filter_type = request.GET.get('filter', 'all')
+    if filter_type not in ('upcoming', 'past'):
+        filter_type = 'all'
+
+    today = date.today()
+    version, fragment_version = await asyncio.gather(
+        aget_stats_version(), amodels_version(Event, EventSeries, Category, Participant)
+    )
+    # All three below expand the series; load them once up front so they
+    # don't each miss the cache and load them concurrently
+    await aget_occurrence_summary(today, version)
+    stats, today_events, events_list = await asyncio.gather(
+        aget_dashboard_stats(today, version),
+        _unless_cached(
+            'dashboard_today', [today, fragment_version],
+            partial(aget_today_events, today, version), partial(get_today_events, today),
+        ),
+        _unless_cached(
+            'dashboard_events', [filter_type, today, fragment_version],
+            partial(aget_dashboard_events, filter_type, today, version),
+            partial(get_dashboard_events, filter_type, today),
+        ),
+    )
+
+    return await arender(request, 'core/dashboard.html', {
+        'total_events': stats['total_events'],
+        'total_participants': stats['total_participants'],
+        'upcoming_events': stats['upcoming_events'],
+        'past_events': stats['past_events'],
+        'scheduled_occurrences': stats['scheduled_occurrences'],
+        'today_events': today_events,
+        'events_list': events_list,
+        'filter_type': filter_type,
+        'panel_size': DASHBOARD_PANEL_SIZE,
+        'today': today,
+        'fragment_version': fragment_version,
+        'now': datetime.now(),
+    })
+
+
+@replica_reads
+@query_budget(6)
+@login_required
+@conditional_page(Category, Event)
+async def category_list(request):
+    categories = [category async for category in Category.objects.all()]
+    return await arender(request, 'core/category_list.html', {
+        'categories': categories,
+        'feed_token': feeds.make_feed_token(request.user),
+    })
+
+
+@replica_reads
+@query_budget(10)
+@login_required
+@conditional_page(Event, EventSeries, Category)
+async def event_list(request):
+    user = request.user
+    organizer, can_manage_events, version = await asyncio.gather(
+        sync_to_async(is_organizer)(user),
+        sync_to_async(lambda: Roles(user).can_manage_events)(),
+        amodels_version(Event, EventSeries, Category, Participant, RSVP),
+    )
+    page, context = _event_list_page(request, organizer, version)
+    context['categories'] = [category async for category in Category.objects.all()]
+
+    if context['per_page'] >= EVENT_STREAM_THRESHOLD and page.before is None:
+        return StreamingHttpResponse(_astream_event_list(request, page, context, can_manage_events))
+
+    vary_on = context['fragment_vary']
+    if await _fragment_cached('event_list_rows', vary_on, can_manage_events) and \
+            await _fragment_cached('event_list_pagination', vary_on):
+        context['events'] = SimpleLazyObject(primary_reads()(
+            lambda: list(merge_occurrences(page, page.object_list(), _event_occurrences(page, context)))
+        ))
+    else:
+        with primary_reads():
+            rows = await page.aobject_list()
+            occurrences = await _aevent_occurrences(page, context)
+        context['events'] = list(merge_occurrences(page, rows, occurrences))
+    return await arender(request, 'core/event_list.html', context)
+
+
+async def _aevent_occurrences(page, context):
+    if context['occurrence_window'] is None:
+        return iter(())
+    return await recurrence.aoccurrences(*_occurrence_start(page, context))
+
+
+async def _amerge_occurrences(page, rows, occurrences):
+    # merge_occurrences over an async iterator of rows
+    upcoming = next(occurrences, None)
+    first = True
+    async for row in rows:
+        if first and page.has_previous:
+            while upcoming is not None and upcoming.start_at < row.start_at:
+                upcoming = next(occurrences, None)
+        first = False
+        while upcoming is not None and upcoming.start_at < row.start_at:
+            yield upcoming
+            upcoming = next(occurrences, None)
+        yield row
+    if first and page.has_previous:
+        return
+    following = page.following_position
+    end = datetime.fromisoformat(following[0]) if following else None
+    while upcoming is not None and (end is None or upcoming.start_at < end):
+        yield upcoming
+        upcoming = next(occurrences, None)
+
+
+async def _astream_event_list(request, page, context, can_manage_events):
+    html = await arender_to_string('core/event_list.html', dict(context, streaming=True), request=request)
+    head, middle, tail = _split_event_list(html)
+    yield head
+
+    key = _event_stream_key(context, can_manage_events)
+    cached = await cache.aget(key)
+    if cached is not None:
+        rows, pagination = cached
+        yield rows
+        yield middle
+        yield pagination
+        yield tail
+        return
+
+    # ReplicaRoutingMiddleware is done before the body runs, so these rows
+    # come from the primary and are safe to cache
+    rows = []
+    chunk = []
+    occurrences = iter(await _aevent_occurrences(page, context))
+    async for event in _amerge_occurrences(page, page.aiterator(), occurrences):
+        chunk.append(event)
+        if len(chunk) == 100:
+            rows.append(await arender_to_string('core/event_list_rows.html', {'events': chunk}, request=request))
+            yield rows[-1]
+            chunk = []
+    if chunk or not rows:
+        rows.append(await arender_to_string('core/event_list_rows.html', {'events': chunk}, request=request))
+        yield rows[-1]
+
+    yield middle
+    pagination = await arender_to_string(
+        'core/event_list_pagination.html', dict(context, page=page), request=request
+    )
+    yield pagination
+    yield tail
+    await cache.aset(key, (''.join(rows), pagination), FRAGMENT_TIMEOUT)
+
+
+@replica_reads
+@query_budget(7)
+@login_required
+@conditional_page(Event, Category)
+async def search_events(request):
+    query, page_number = _search_params(request)
+    offset = (page_number - 1) * SEARCH_PAGE_SIZE
+    fragment_version = await amodels_version(Event, Category)
+
+    async def run_search():
+        events, has_next = await search.asearch_events(query, offset=offset, limit=SEARCH_PAGE_SIZE)
+        return {'events': events, 'has_next': has_next}
+
+    def run_search_sync():
+        events, has_next = search.search_events(query, offset=offset, limit=SEARCH_PAGE_SIZE)
+        return {'events': events, 'has_next': has_next}
+
+    results = await _unless_cached(
+        'search_results', [query, page_number, fragment_version], run_search, run_search_sync
+    )
+    return await arender(request, 'core/search_results.html', {
+        'results': results,
+        'query': query,
+        'page_number': page_number,
+        'has_previous': page_number > 1,
+        'fragment_version': fragment_version,
+    })
+
+
+@query_budget(4)
+@login_required
+async def profile_view(request):
+    user = await request.auser()
+    participant = await aget_object_or_404(Participant.objects.select_related('user'), user=user)
+    return await arender(request, 'core/profile.html', {
+        'participant': participant,
+        'feed_token': feeds.make_feed_token(user, participant),
+    })
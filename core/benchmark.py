@@ -0,0 +1,480 @@
+import asyncio
+import json
+import multiprocessing
+import random
+import re
+import time
+from contextlib import contextmanager
+from datetime import date, time as dt_time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import cache
+from django.db import OperationalError, connection, connections, transaction
+from django.db.models.sql.compiler import SQLCompiler
+from django.db.models.sql.constants import MULTI, SINGLE
+from django.test import Client
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from . import recurrence, search
+from .feeds import make_feed_token
+from .imports import import_participants
+from .models import Category, Event, EventSeries, Participant, RSVP
+from .roles import ADMIN, ORGANIZER
+from .sqlite import is_lock_error, retry_on_lock, write_transaction
+from .tallies import recount_participant_events, recount_tallies
+
+
+# Which seeded user requests each route; anything not listed runs as a
+# plain participant. None means an anonymous client.
+ROUTE_USERS = {
+    'event_create': 'organizer',
+    'event_update': 'admin',
+    'event_delete': 'admin',
+    'category_create': 'admin',
+    'category_update': 'admin',
+    'category_delete': 'admin',
+    'participant_create': 'organizer',
+    'rsvp_bulk': 'organizer',
+    'autocomplete': 'organizer',
+    'export_data': 'organizer',
+    'series_create': 'organizer',
+    'occurrence_update': 'admin',
+    'signup': None,
+    'login': None,
+}
+
+POST_ROUTES = {'logout', 'rsvp_bulk'}
+
+RESOURCES = {'events': 'event', 'categories': 'category', 'participants': 'participant'}
+
+# Path parameters that aren't ids of the seeded rows
+ROUTE_PARAMS = {
+    'autocomplete': {'kind': 'events'},
+    'export_data': {'kind': 'rsvps', 'fmt': 'csv'},
+}
+
+FEED_ROUTES = {'event_feed', 'category_feed', 'participant_feed'}
+
+
+def seed_dataset(categories=20, events=2000, participants=2000, rsvps=10000, seed=1):
+    """
+    Fills the current database with a synthetic dataset. Events per category
+    and RSVPs per event follow a Zipf-like skew so a few categories and
+    events are much busier than the rest.
+    """
+    rng = random.Random(seed)
+    today = date.today()
+
+    category_objs = Category.objects.bulk_create([
+        Category(name=f'Category {index}', description=f'Synthetic category {index}')
+        for index in range(categories)
+    ])
+    category_weights = [1 / (rank + 1) for rank in range(len(category_objs))]
+
+    event_objs = []
+    for index in range(events):
+        day = today + timedelta(days=rng.randint(-365, 365))
+        at = dt_time(rng.randint(8, 21), rng.choice([0, 15, 30, 45]))
+        event_objs.append(Event(
+            name=f'Event {index} {rng.choice(["Meetup", "Workshop", "Conference", "Concert", "Hackathon"])}',
+            description=f'Synthetic event number {index} about {rng.choice(["python", "music", "art", "startups", "sports"])}.',
+            date=day,
+            time=at,
+            location=rng.choice(['Dhaka', 'Chittagong', 'Sylhet', 'Khulna', 'Rajshahi']),
+            category=rng.choices(category_objs, weights=category_weights)[0],
+        ))
+    event_objs = Event.objects.bulk_create(event_objs, batch_size=1000)
+    EventSeries.objects.create(
+        name='Weekly meetup', description='A synthetic recurring event', time=dt_time(19), location='Dhaka',
+        category=category_objs[0], frequency=EventSeries.WEEKLY,
+        starts_on=today - timedelta(weeks=8), until=today + timedelta(weeks=52),
+    )
+
+    import_participants(
+        ({'email': f'attendee{index}@example.com', 'name': f'Attendee {index}'} for index in range(participants)),
+        chunk_size=1000,
+    )
+
+    participant_ids = list(Participant.objects.values_list('pk', flat=True))
+    event_weights = [1 / (rank + 1) ** 0.8 for rank in range(len(event_objs))]
+    statuses = [RSVP.ATTENDING, RSVP.MAYBE, RSVP.NOT_ATTENDING]
+    pairs = set()
+    attempts = 0
+    while len(pairs) < min(rsvps, len(participant_ids) * len(event_objs)) and attempts < rsvps * 5:
+        attempts += 1
+        event = rng.choices(event_objs, weights=event_weights)[0]
+        pairs.add((rng.choice(participant_ids), event.pk))
+    RSVP.objects.bulk_create([
+        RSVP(participant_id=participant_id, event_id=event_id, status=rng.choices(statuses, weights=[6, 3, 1])[0])
+        for participant_id, event_id in pairs
+    ], batch_size=1000)
+    Participant.events.through.objects.bulk_create([
+        Participant.events.through(participant_id=participant_id, event_id=event_id)
+        for participant_id, event_id in pairs
+    ], batch_size=1000)
+
+    recount_tallies()
+    recount_participant_events()
+    if connection.vendor == 'sqlite':
+        search.rebuild_search_index()
+    cache.clear()
+
+    return {
+        'categories': categories,
+        'events': events,
+        'participants': participants,
+        'rsvps': len(pairs),
+        'series': 1,
+    }
+
+
+def create_bench_users():
+    User = get_user_model()
+    admin = User.objects.create_superuser('bench-admin', 'bench-admin@example.com', 'bench')
+    admin.groups.add(Group.objects.get_or_create(name=ADMIN)[0])
+    organizer = User.objects.create_user('bench-organizer', 'bench-organizer@example.com', 'bench')
+    organizer.groups.add(Group.objects.get_or_create(name=ORGANIZER)[0])
+    participant = User.objects.create_user('bench-participant', 'bench-participant@example.com', 'bench')
+    pending = User.objects.create_user('bench-pending', 'bench-pending@example.com', 'bench', is_active=False)
+    return {'admin': admin, 'organizer': organizer, 'participant': participant, 'pending': pending}
+
+
+@contextmanager
+def count_rows(counter):
+    """
+    Counts rows fetched by ORM SELECTs while active. Raw SQL is not counted.
+    """
+    original = SQLCompiler.execute_sql
+
+    def execute_sql(self, result_type=MULTI, *args, **kwargs):
+        result = original(self, result_type, *args, **kwargs)
+        if result_type == SINGLE and result is not None:
+            counter['rows'] += 1
+        elif result_type == MULTI and result is not None:
+            return _counted_chunks(result, counter)
+        return result
+
+    SQLCompiler.execute_sql = execute_sql
+    try:
+        yield counter
+    finally:
+        SQLCompiler.execute_sql = original
+
+
+def _counted_chunks(chunks, counter):
+    for chunk in chunks:
+        counter['rows'] += len(chunk)
+        yield chunk
+
+
+def route_urls(urlpatterns, users):
+    """
+    Yields (name, route, url) for every distinct route, filling path parameters
+    with ids from the seeded data and tokens that the views accept.
+    """
+    event = Event.objects.order_by('-participant_count').first()
+    samples = {
+        'event': event.pk,
+        'category': event.category_id,
+        'participant': Participant.objects.order_by('pk').values_list('pk', flat=True).first(),
+    }
+    series = EventSeries.objects.order_by('pk').first()
+    today = date.today()
+    pending = users['pending']
+    feed_token = make_feed_token(users['participant'], Participant.objects.get(user=users['participant']))
+    values = {
+        'event_id': event.pk,
+        'category_id': event.category_id,
+        'series_id': series.pk,
+        'day': next(recurrence.occurrence_dates(series, today, today + timedelta(weeks=1))).isoformat(),
+        'uidb64': urlsafe_base64_encode(force_bytes(pending.pk)),
+    }
+    route_values = {
+        **ROUTE_PARAMS,
+        **{name: {'token': feed_token} for name in FEED_ROUTES},
+        'activate': {'token': default_token_generator.make_token(pending)},
+    }
+    seen = set()
+    for pattern in urlpatterns:
+        route = str(pattern.pattern)
+        if route in seen:
+            continue
+        seen.add(route)
+        resource = RESOURCES.get(route.split('/')[0], 'event')
+        params = {**values, **route_values.get(pattern.name, {})}
+
+        def fill(match):
+            name = match.group(1)
+            if name in params:
+                return str(params[name])
+            return str(samples[resource])
+
+        yield pattern.name, route, '/' + re.sub(r'<(?:\w+:)?(\w+)>', fill, route)
+
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(percent / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def _client_for(role, users):
+    client = Client(raise_request_exception=False)
+    if role is not None:
+        client.force_login(users[role])
+    return client
+
+
+def bench_routes(urlpatterns, users, repeat=20, cold=False):
+    results = {}
+    rsvp_payload = json.dumps({'rsvps': [
+        {'participant': participant_id, 'event': event_id, 'status': RSVP.MAYBE}
+        for participant_id, event_id in RSVP.objects.values_list('participant_id', 'event_id')[:100]
+    ]})
+    for name, route, url in route_urls(urlpatterns, users):
+        role = ROUTE_USERS.get(name, 'participant')
+        client = _client_for(role, users)
+        timings, queries, rows, statuses = [], [], [], set()
+
+        for iteration in range(repeat + 1):
+            if name == 'logout':
+                client = _client_for(role, users)
+            if cold:
+                cache.clear()
+            captured = []
+            counter = {'rows': 0}
+
+            def capture(execute, sql, params, many, context):
+                captured.append(sql)
+                return execute(sql, params, many, context)
+
+            with connection.execute_wrapper(capture), count_rows(counter):
+                started = time.perf_counter()
+                if name == 'rsvp_bulk':
+                    response = client.post(url, rsvp_payload, content_type='application/json')
+                elif name in POST_ROUTES:
+                    response = client.post(url)
+                else:
+                    response = client.get(url)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                elapsed = (time.perf_counter() - started) * 1000
+
+            if iteration == 0:
+                continue  # warm-up
+            timings.append(elapsed)
+            queries.append(len(captured))
+            rows.append(counter['rows'])
+            statuses.add(response.status_code)
+
+        results[f'{name} /{route}'] = {
+            'user': role or 'anonymous',
+            'status': sorted(statuses),
+            'p50_ms': round(_percentile(timings, 50), 3),
+            'p90_ms': round(_percentile(timings, 90), 3),
+            'p99_ms': round(_percentile(timings, 99), 3),
+            'max_ms': round(max(timings), 3),
+            'queries': max(queries),
+            'rows': max(rows),
+        }
+    return results
+
+
+def route_errors(routes):
+    """
+    Returns a message per route that answered with a 4xx or 5xx. Their
+    timings measure an error page, not the route, so they fail the run.
+    """
+    return [
+        f"{route}: status {', '.join(map(str, result['status']))}"
+        for route, result in routes.items()
+        if any(status >= 400 for status in result['status'])
+    ]
+
+
+def compare_reports(current, baseline, tolerance=0.25, min_ms=2.0):
+    """
+    Returns a list of human-readable regressions of ``current`` against
+    ``baseline``: error responses, slower p50 beyond ``tolerance`` (ignoring
+    changes under ``min_ms``), or more queries or rows fetched than before.
+    """
+    regressions = route_errors(current['routes'])
+    for route, before in baseline.get('routes', {}).items():
+        after = current['routes'].get(route)
+        if after is None:
+            regressions.append(f'{route}: missing from current run')
+            continue
+        if after['status'] != before['status']:
+            regressions.append(f"{route}: status {before['status']} -> {after['status']}")
+        if after['p50_ms'] > before['p50_ms'] * (1 + tolerance) and after['p50_ms'] - before['p50_ms'] > min_ms:
+            regressions.append(f"{route}: p50 {before['p50_ms']}ms -> {after['p50_ms']}ms")
+        if after['queries'] > before['queries']:
+            regressions.append(f"{route}: queries {before['queries']} -> {after['queries']}")
+        if after['rows'] > before['rows'] * (1 + tolerance):
+            regressions.append(f"{route}: rows {before['rows']} -> {after['rows']}")
+    return regressions
+
+
+# Connection settings for load_test_writes. 'baseline' is what the project
+# ran with before the production SQLite profile; None keeps the settings.
+WRITE_PROFILES = {
+    'baseline': {
+        'options': {},
+        'pragmas': {'journal_mode': 'DELETE', 'synchronous': 'FULL'},
+        'write_view': False,
+    },
+    'production': {
+        'options': None,
+        'pragmas': None,
+        'write_view': True,
+    },
+}
+
+
+def _rsvp(participant_id, event_id, status):
+    # The steps rsvp_create_or_update takes for a submitted form
+    rsvp = RSVP.objects.filter(participant_id=participant_id, event_id=event_id).first()
+    if rsvp is None:
+        rsvp = RSVP(participant_id=participant_id, event_id=event_id)
+    rsvp.status = status
+    with transaction.atomic():
+        rsvp.save()
+
+
+def _signup(username):
+    get_user_model().objects.create_user(username, f'{username}@example.com', is_active=False)
+
+
+def _write_worker(args):
+    jobs, use_write_view = args
+    # A forked worker must not share the parent's SQLite handle
+    connections.close_all()
+    done = locked = 0
+    for func, job_args in jobs:
+        if use_write_view:
+            def write():
+                with write_transaction():
+                    func(*job_args)
+            call = lambda: retry_on_lock(write)
+        else:
+            call = lambda: func(*job_args)
+        try:
+            call()
+            done += 1
+        except OperationalError as exc:
+            if not is_lock_error(exc):
+                raise
+            locked += 1
+    connections.close_all()
+    return done, locked
+
+
+def run_write_load(workers=8, writes=200, signup_every=10, use_write_view=True, seed=1):
+    """
+    Runs ``writes`` RSVP submissions per worker process against the current
+    database, with every ``signup_every``-th write being a signup instead.
+    Returns throughput and the number of writes lost to lock errors.
+    """
+    rng = random.Random(seed)
+    participant_ids = list(Participant.objects.values_list('pk', flat=True))
+    event_ids = list(Event.objects.values_list('pk', flat=True))
+    statuses = [RSVP.ATTENDING, RSVP.MAYBE, RSVP.NOT_ATTENDING]
+    batches = []
+    for worker in range(workers):
+        jobs = []
+        for index in range(writes):
+            if signup_every and index % signup_every == signup_every - 1:
+                jobs.append((_signup, (f'load-{seed}-{worker}-{index}',)))
+            else:
+                jobs.append((_rsvp, (rng.choice(participant_ids), rng.choice(event_ids), rng.choice(statuses))))
+        batches.append((jobs, use_write_view))
+
+    connections.close_all()
+    started = time.perf_counter()
+    with multiprocessing.get_context('fork').Pool(workers) as pool:
+        results = pool.map(_write_worker, batches)
+    elapsed = time.perf_counter() - started
+
+    done = sum(result[0] for result in results)
+    locked = sum(result[1] for result in results)
+    return {
+        'workers': workers,
+        'attempted': workers * writes,
+        'done': done,
+        'locked': locked,
+        'seconds': round(elapsed, 3),
+        'writes_per_second': round(done / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+SERVER_PATHS = ['/dashboard/', '/events/', '/events/search/?q=event', '/categories/']
+
+
+async def _slow_request(host, port, path, cookie, client_delay):
+    # Sends the request line and headers in pieces, like a client on a slow
+    # link, so a server that reads requests in blocking workers is held up
+    # for the whole send.
+    started = time.perf_counter()
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        request = (
+            f'GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\nCookie: {cookie}\r\n'
+            'Connection: close\r\n\r\n'
+        ).encode()
+        pieces = 4
+        size = -(-len(request) // pieces)
+        for offset in range(0, len(request), size):
+            writer.write(request[offset:offset + size])
+            await writer.drain()
+            await asyncio.sleep(client_delay / pieces)
+        status_line = await reader.readline()
+        await reader.read()
+    finally:
+        writer.close()
+    status = int(status_line.split()[1]) if status_line else 0
+    return status, time.perf_counter() - started
+
+
+async def _http_load(host, port, paths, cookie, clients, requests, client_delay):
+    latencies = []
+    errors = 0
+
+    async def client(index):
+        nonlocal errors
+        for number in range(requests):
+            path = paths[(index + number) % len(paths)]
+            try:
+                status, elapsed = await _slow_request(host, port, path, cookie, client_delay)
+            except OSError:
+                status, elapsed = 0, 0.0
+            if status == 200:
+                latencies.append(elapsed)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(index) for index in range(clients)))
+    return latencies, errors, time.perf_counter() - started
+
+
+def run_http_load(host, port, cookie, clients=100, requests=5, client_delay=0.2, paths=SERVER_PATHS):
+    """
+    Drives ``clients`` concurrent slow clients, each making ``requests``
+    GETs of ``paths`` over fresh connections, against a running server.
+    Returns throughput and latency percentiles of the successful requests.
+    """
+    latencies, errors, elapsed = asyncio.run(
+        _http_load(host, port, paths, cookie, clients, requests, client_delay)
+    )
+    return {
+        'clients': clients,
+        'requests': len(latencies) + errors,
+        'errors': errors,
+        'seconds': round(elapsed, 3),
+        'requests_per_second': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(_percentile(latencies, 50) * 1000, 1) if latencies else None,
+        'p95_ms': round(_percentile(latencies, 95) * 1000, 1) if latencies else None,
+    }
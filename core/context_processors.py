@@ -0,0 +1,5 @@
+from .roles import Roles
+
+
+def roles(request):
+    return {'roles': Roles(request.user)}
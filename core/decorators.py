@@ -1,5 +1,19 @@
+import hashlib
+from datetime import date
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+
 from django.contrib.auth.decorators import user_passes_test
+from django.contrib.messages import get_messages
 from django.core.exceptions import PermissionDenied
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .models import start_of_day
+from .roles import get_group_names, in_any_group
+from .sqlite import retry_on_lock, write_transaction
+from .versions import atable_state, table_state
 
 def group_required(*group_names):
     """
@@ -8,7 +22,112 @@ def group_required(*group_names):
     """
     def in_groups(user):
         if user.is_authenticated:
-            if user.is_superuser or user.groups.filter(name__in=group_names).exists():
+            if user.is_superuser or in_any_group(user, *group_names):
                 return True
         raise PermissionDenied
     return user_passes_test(in_groups)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_budget(max_queries):
+    """
+    Declares how many SQL queries a view may run per request, counting the
+    session and user lookups. QueryInstrumentationMiddleware logs requests
+    that go over it, or raises QueryBudgetExceeded when the
+    QUERY_BUDGET_RAISE setting is on.
+    """
+    def decorator(view_func):
+        view_func.query_budget = max_queries
+        return view_func
+    return decorator
+
+
+def replica_reads(view_func):
+    """
+    Marks a view that only reads, so ReplicaRoutingMiddleware may serve its
+    queries from a read replica.
+    """
+    view_func.replica_reads = True
+    return view_func
+
+
+def conditional_page(*models, daily=False):
+    """
+    Answers If-None-Match and If-Modified-Since for a page built from
+    ``models`` with a 304 before the view runs. The validators come from the
+    latest updated_at and row count of each table, the viewer and their
+    roles, and any pending flash messages; ``daily`` pages also change at
+    midnight.
+    """
+    def page_state(request):
+        state = getattr(request, '_page_state', None)
+        if state is None:
+            state = request._page_state = table_state(*models)
+        return state
+
+    def etag(request, *args, **kwargs):
+        parts = [
+            f'{changed.timestamp() if changed else 0}:{rows}'
+            for changed, rows in page_state(request)
+        ]
+        parts += [str(request.user.pk), str(len(get_messages(request)))]
+        # Pages show different links to admins and organizers
+        parts.append(str(request.user.is_superuser))
+        parts.extend(sorted(get_group_names(request.user)))
+        if daily:
+            parts.append(date.today().isoformat())
+        return hashlib.md5(':'.join(parts).encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        stamps = [changed for changed, rows in page_state(request) if changed]
+        if daily:
+            stamps.append(start_of_day(date.today()))
+        return max(stamps, default=None)
+
+    def decorator(view_func):
+        view = condition(etag_func=etag, last_modified_func=last_modified)(view_func)
+
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                # Load what the validators need up front; condition() calls
+                # them synchronously
+                request.user = await request.auser()
+                await sync_to_async(get_group_names)(request.user)
+                request._page_state = await atable_state(*models)
+                response = await view(request, *args, **kwargs)
+                patch_cache_control(response, private=True, no_cache=True)
+                return response
+            return async_wrapper
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            response = view(request, *args, **kwargs)
+            # Browsers may keep the page but must check back on every visit
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
+
+
+def write_view(attempts=5, base_delay=0.05):
+    """
+    Runs unsafe requests to the view in one transaction (BEGIN IMMEDIATE on
+    SQLite, so the write lock is taken up front) and retries the whole view
+    with backoff when the database is locked. Safe methods run as usual.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method in ('GET', 'HEAD', 'OPTIONS'):
+                return view_func(request, *args, **kwargs)
+
+            def run():
+                with write_transaction():
+                    return view_func(request, *args, **kwargs)
+            return retry_on_lock(run, attempts=attempts, base_delay=base_delay)
+        return wrapper
+    return decorator
@@ -0,0 +1,153 @@
+import logging
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import notifications, recurrence, search, tallies
+from .jobs import enqueue, job_handler
+from .models import Category, Event, EventNotification, Participant, RSVP
+from .sqlite import retry_on_lock
+from .stats import invalidate_dashboard_stats
+from .versions import touch, touch_models
+
+
+logger = logging.getLogger('core.jobs')
+
+PURGE_BATCH_SIZE = 500
+
+_state = threading.local()
+
+
+@contextmanager
+def purging():
+    """
+    Marks the current thread as purging soft-deleted rows, so the RSVP
+    signal receivers skip tallies and waitlist promotion for events that
+    are about to go.
+    """
+    previous = getattr(_state, 'active', False)
+    _state.active = True
+    try:
+        yield
+    finally:
+        _state.active = previous
+
+
+def purge_active():
+    return getattr(_state, 'active', False)
+
+
+def _hidden(*category_ids):
+    # Soft deletes are plain UPDATEs, so do what the save signals would
+    touch_models(Event, Category)
+    invalidate_dashboard_stats()
+    touch('feed:events', *(f'feed:category:{pk}' for pk in category_ids))
+
+
+def soft_delete_event(event):
+    """
+    Hides ``event`` straight away and queues the purge of its RSVPs and
+    the event itself.
+    """
+    now = timezone.now()
+    Event.all_objects.filter(pk=event.pk).update(deleted_at=now, updated_at=now)
+    search.unindex_event(event.pk)
+    if event.series is not None:
+        # Otherwise the series would show the occurrence again once purged
+        recurrence.skip(event.series, event.occurrence_date)
+    _hidden(event.category_id)
+    enqueue('purge', {'model': 'event', 'pk': event.pk}, key=f'purge:event:{event.pk}')
+
+
+def soft_delete_category(category):
+    """
+    Hides ``category`` and all of its events with two UPDATEs and queues
+    the purge, however many events and RSVPs it holds.
+    """
+    now = timezone.now()
+    Category.all_objects.filter(pk=category.pk).update(deleted_at=now, updated_at=now)
+    Event.objects.filter(category_id=category.pk).update(deleted_at=now, updated_at=now)
+    search.unindex_category(category.pk)
+    _hidden(category.pk)
+    enqueue('purge', {'model': 'category', 'pk': category.pk}, key=f'purge:category:{category.pk}')
+
+
+def _delete_in_batches(queryset, progress=None, label='', before_delete=None):
+    deleted = 0
+    while True:
+        ids = list(queryset.order_by('pk').values_list('pk', flat=True)[:PURGE_BATCH_SIZE])
+        if not ids:
+            return deleted
+
+        def delete_batch():
+            with transaction.atomic():
+                if before_delete:
+                    before_delete(ids)
+                queryset.model._base_manager.filter(pk__in=ids).delete()
+        retry_on_lock(delete_batch)
+        deleted += len(ids)
+        if progress:
+            progress(f'{label}: {deleted} deleted')
+
+
+def purge_event(event, progress=None):
+    """
+    Deletes a soft-deleted event's RSVPs and participant links in short
+    batched transactions, then the event. Cancellation notices are queued
+    first, once, while the RSVPs still say who to tell.
+    """
+    if not EventNotification.objects.filter(event=event, kind=EventNotification.CANCELLED).exists():
+        notifications.notify_event_cancelled(event)
+    label = f'Event {event.pk}'
+    with purging():
+        rsvps = _delete_in_batches(RSVP.objects.filter(event_id=event.pk), progress, f'{label} RSVPs')
+        links = _delete_in_batches(
+            Participant.events.through.objects.filter(event_id=event.pk), progress, f'{label} participant links',
+            before_delete=tallies.participant_links_deleted,
+        )
+        retry_on_lock(lambda: Event.all_objects.filter(pk=event.pk).delete())
+    touch_models(RSVP, Participant)
+    return rsvps + links + 1
+
+
+def purge_category(category, progress=None):
+    deleted = 0
+    events = Event.all_objects.filter(category_id=category.pk)
+    while True:
+        batch = list(events.order_by('pk')[:PURGE_BATCH_SIZE])
+        if not batch:
+            break
+        for event in batch:
+            deleted += purge_event(event)
+        if progress:
+            progress(f'Category {category.pk}: {deleted} rows deleted')
+    retry_on_lock(lambda: Category.all_objects.filter(pk=category.pk).delete())
+    return deleted + 1
+
+
+PURGES = {
+    'event': (Event, purge_event),
+    'category': (Category, purge_category),
+}
+
+
+def purge(model_name, pk, progress=None):
+    model, purge_rows = PURGES[model_name]
+    instance = model.all_objects.filter(pk=pk, deleted_at__isnull=False).first()
+    if instance is None:
+        return 0
+    return purge_rows(instance, progress)
+
+
+@job_handler('purge')
+def run_purges(jobs):
+    failures = {}
+    for job in jobs:
+        try:
+            deleted = purge(job.payload['model'], job.payload['pk'], progress=logger.info)
+            logger.info(f'Purged {job.payload["model"]} {job.payload["pk"]}: {deleted} rows deleted')
+        except Exception as exc:
+            failures[job.pk] = exc
+    return failures
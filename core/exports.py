@@ -0,0 +1,127 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+
+from .models import Event, Participant, RSVP, day_range, start_of_day
+
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+def _event_filters(prefix, event=None, category=None, start_date=None, end_date=None):
+    filters = {}
+    if event:
+        filters[f'{prefix}id'] = event
+    if category:
+        filters[f'{prefix}category_id'] = category
+    if start_date:
+        filters[f'{prefix}start_at__gte'] = start_of_day(start_date)
+    if end_date:
+        filters[f'{prefix}start_at__lt'] = day_range(end_date)[1]
+    return filters
+
+
+def export_events(**filters):
+    columns = [
+        'id', 'name', 'category', 'date', 'time', 'location',
+        'attending', 'maybe', 'not_attending', 'participants',
+    ]
+    rows = (
+        Event.objects.filter(**_event_filters('', **filters))
+        .order_by('start_at', 'id')
+        .values_list(
+            'id', 'name', 'category__name', 'date', 'time', 'location',
+            'attending_count', 'maybe_count', 'not_attending_count', 'participant_count',
+        )
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    return columns, rows
+
+
+def export_participants(**filters):
+    columns = ['id', 'name', 'email', 'phone', 'events']
+    participants = Participant.objects.order_by('id').only('id', 'name', 'email', 'phone')
+    event_filters = _event_filters('events__', **filters)
+    if event_filters:
+        participants = participants.filter(**event_filters).distinct()
+    # iterator() prefetches events one chunk of participants at a time
+    participants = participants.prefetch_related(
+        Prefetch('events', queryset=Event.objects.only('id', 'name').order_by('start_at'))
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    rows = (
+        (p.id, p.name, p.email, p.phone or '', '; '.join(event.name for event in p.events.all()))
+        for p in participants
+    )
+    return columns, rows
+
+
+def export_rsvps(**filters):
+    columns = [
+        'id', 'participant_id', 'participant', 'email', 'event_id', 'event',
+        'status', 'comment', 'responded_at',
+    ]
+    rows = (
+        RSVP.objects.filter(**_event_filters('event__', **filters))
+        .order_by('id')
+        .values_list(
+            'id', 'participant_id', 'participant__name', 'participant__email',
+            'event_id', 'event__name', 'status', 'comment', 'responded_at',
+        )
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    return columns, rows
+
+
+EXPORTS = {
+    'events': export_events,
+    'participants': export_participants,
+    'rsvps': export_rsvps,
+}
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def _lines(rows, fmt, columns):
+    if fmt == 'csv':
+        writer = csv.writer(_Echo())
+        for row in rows:
+            yield writer.writerow(['' if value is None else value for value in row])
+    else:
+        for row in rows:
+            yield json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def stream_export(kind, fmt, buffer_size=64 * 1024, **filters):
+    """
+    Yields the export as CSV or JSON lines in chunks of about
+    ``buffer_size`` characters. The CSV header goes out on its own before
+    the query runs so the response starts immediately.
+    """
+    columns, rows = EXPORTS[kind](**filters)
+    return stream_rows(columns, rows, fmt, buffer_size)
+
+
+def stream_rows(columns, rows, fmt, buffer_size=64 * 1024):
+    if fmt == 'csv':
+        yield csv.writer(_Echo()).writerow(columns)
+
+    buffer = []
+    size = 0
+    for line in _lines(rows, fmt, columns):
+        buffer.append(line)
+        size += len(line)
+        if size >= buffer_size:
+            yield ''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer)
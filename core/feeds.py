@@ -0,0 +1,139 @@
+import heapq
+from datetime import datetime, timedelta, timezone as dt_timezone
+from operator import attrgetter
+
+from django.core import signing
+from django.utils import timezone
+
+from .models import Event, RSVP
+from .recurrence import horizon, occurrences
+from .versions import get_stamps
+
+
+FEED_SALT = 'core.feeds'
+FEED_HISTORY_DAYS = 365
+
+
+def make_feed_token(user, participant=None):
+    return signing.dumps(
+        {'u': user.pk, 'p': participant.pk if participant else None},
+        salt=FEED_SALT, compress=True,
+    )
+
+
+def read_feed_token(token):
+    """
+    Returns (user_id, participant_id) from a feed token, or None if it was
+    not issued by us. No database access, so 304s stay free.
+    """
+    try:
+        data = signing.loads(token, salt=FEED_SALT)
+    except signing.BadSignature:
+        return None
+    return data.get('u'), data.get('p')
+
+
+def all_events_stamp_names():
+    return ['feed:events']
+
+
+def category_stamp_names(category_id):
+    return [f'feed:category:{category_id}']
+
+
+def participant_stamp_names(participant_id):
+    # Attended events can change without the participant's RSVPs changing
+    return [f'feed:participant:{participant_id}', 'feed:events']
+
+
+def feed_stamp(names):
+    return max(get_stamps(*names))
+
+
+def feed_last_modified(names):
+    return datetime.fromtimestamp(feed_stamp(names), dt_timezone.utc)
+
+
+def feed_etag(names):
+    return '-'.join(f'{stamp:.6f}' for stamp in get_stamps(*names))
+
+
+def _escape(value):
+    return (
+        str(value).replace('\\', '\\\\').replace(';', '\\;')
+        .replace(',', '\\,').replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def _fold(line):
+    # RFC 5545 3.1: lines longer than 75 octets continue after CRLF + space
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts = []
+    while encoded:
+        limit = 75 if not parts else 74
+        cut = min(limit, len(encoded))
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode('utf-8'))
+        encoded = encoded[cut:]
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def _utc(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def feed_events(category_id=None, participant_id=None):
+    """
+    The events of a feed in start_at order. Series occurrences from the
+    history window up to a year ahead are merged in, except into a
+    participant's feed, whose events all have RSVPs and so are saved.
+    """
+    since = timezone.now() - timedelta(days=FEED_HISTORY_DAYS)
+    events = Event.objects.select_related('category').filter(start_at__gte=since)
+    if category_id is not None:
+        events = events.filter(category_id=category_id)
+    if participant_id is not None:
+        events = events.filter(rsvps__participant_id=participant_id, rsvps__status=RSVP.ATTENDING)
+    events = events.order_by('start_at', 'id').iterator(chunk_size=500)
+    if participant_id is not None:
+        return events
+    today = timezone.localdate()
+    series_events = occurrences(timezone.localdate(since), horizon(today), category_id)
+    return heapq.merge(events, series_events, key=attrgetter('start_at'))
+
+
+def _uid(event, host):
+    # Saved occurrences keep the UID they had before they were saved
+    if event.series_id is not None:
+        return f'series-{event.series_id}-{event.occurrence_date:%Y%m%d}@{host}'
+    return f'event-{event.pk}@{host}'
+
+
+def stream_calendar(name, events, host, stamp):
+    """
+    Yields an iCalendar document one VEVENT at a time.
+    """
+    dtstamp = _utc(datetime.fromtimestamp(stamp, dt_timezone.utc))
+    yield (
+        'BEGIN:VCALENDAR\r\n'
+        'VERSION:2.0\r\n'
+        'PRODID:-//Event System//Event Feeds//EN\r\n'
+        'CALSCALE:GREGORIAN\r\n'
+        + _fold(f'X-WR-CALNAME:{_escape(name)}')
+    )
+    for event in events:
+        yield ''.join([
+            'BEGIN:VEVENT\r\n',
+            f'UID:{_uid(event, host)}\r\n',
+            f'DTSTAMP:{dtstamp}\r\n',
+            f'DTSTART:{_utc(event.start_at)}\r\n',
+            _fold(f'SUMMARY:{_escape(event.name)}'),
+            _fold(f'DESCRIPTION:{_escape(event.description)}'),
+            _fold(f'LOCATION:{_escape(event.location)}'),
+            _fold(f'CATEGORIES:{_escape(event.category.name)}'),
+            'END:VEVENT\r\n',
+        ])
+    yield 'END:VCALENDAR\r\n'
@@ -1,15 +1,50 @@
+from datetime import date
 
 from django import forms
-from .models import Event, Category, Participant
+from .models import Event, EventSeries, Category, Participant
+from django.contrib.auth import get_user_model
 from django.contrib.auth.models import User
 from django.contrib.auth.forms import UserCreationForm
 from .models import RSVP
+from .widgets import AutocompleteSelect, AutocompleteSelectMultiple
 
 
 class EventForm(forms.ModelForm):
     class Meta:
         model = Event
         fields = '__all__'
+        widgets = {
+            'category': AutocompleteSelect('categories'),
+        }
+
+class EventSeriesForm(forms.ModelForm):
+    exceptions = forms.CharField(
+        required=False, help_text='Dates to skip, as YYYY-MM-DD separated by commas.',
+    )
+
+    class Meta:
+        model = EventSeries
+        fields = '__all__'
+        widgets = {
+            'category': AutocompleteSelect('categories'),
+            'starts_on': forms.DateInput(attrs={'type': 'date'}),
+            'until': forms.DateInput(attrs={'type': 'date'}),
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.initial['exceptions'] = ', '.join(self.instance.exceptions or [])
+
+    def clean_exceptions(self):
+        days = []
+        for value in self.cleaned_data['exceptions'].split(','):
+            value = value.strip()
+            if value:
+                try:
+                    days.append(date.fromisoformat(value).isoformat())
+                except ValueError:
+                    raise forms.ValidationError(f'{value} is not a YYYY-MM-DD date.')
+        return sorted(set(days))
 
 class CategoryForm(forms.ModelForm):
     class Meta:
@@ -20,6 +55,10 @@ class ParticipantForm(forms.ModelForm):
     class Meta:
         model = Participant
         fields = '__all__'
+        widgets = {
+            'user': AutocompleteSelect('users'),
+            'events': AutocompleteSelectMultiple('events'),
+        }
 
 
 
@@ -30,20 +69,27 @@ class SignupForm(UserCreationForm):
     last_name = forms.CharField(max_length=30, required=True)
 
     class Meta:
-        model = User
+        model = get_user_model()
         fields = ['username', 'email', 'first_name', 'last_name', 'password1', 'password2']
 
 
 
 class RSVPForm(forms.ModelForm):
+    status = forms.ChoiceField(choices=RSVP.RESPONSE_CHOICES, widget=forms.RadioSelect)
+
     class Meta:
         model = RSVP
         fields = ['status', 'comment']
         widgets = {
-            'status': forms.RadioSelect,
             'comment': forms.Textarea(attrs={'rows': 3}),
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Someone on the waitlist is still asking for a seat
+        if self.instance.status == RSVP.WAITLISTED:
+            self.initial['status'] = RSVP.ATTENDING
+
 
 
 class UserUpdateForm(forms.ModelForm):
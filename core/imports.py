@@ -0,0 +1,238 @@
+import csv
+import json
+import threading
+import time
+from contextlib import contextmanager
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from .models import Participant
+from .roles import PARTICIPANT, invalidate_group_names
+from .stats import invalidate_dashboard_stats
+from .versions import touch_models
+
+
+_state = threading.local()
+
+
+@contextmanager
+def bulk_import():
+    """
+    Marks the current thread as running a bulk import so the per-user
+    signal receivers leave participant and group creation to the importer.
+    """
+    previous = getattr(_state, 'active', False)
+    _state.active = True
+    try:
+        yield
+    finally:
+        _state.active = previous
+
+
+def bulk_import_active():
+    return getattr(_state, 'active', False)
+
+
+def read_rows(stream, fmt):
+    """
+    Yields one dict per record from a text stream in 'csv' or 'jsonl'
+    format without reading the whole file into memory. Raises ValueError
+    naming the line of the first record that can't be read.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        try:
+            yield from reader
+        except csv.Error as exc:
+            raise ValueError(f'Line {reader.line_num}: {exc}') from exc
+    elif fmt == 'jsonl':
+        for number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as exc:
+                raise ValueError(f'Line {number}: invalid JSON ({exc.msg})') from exc
+            if not isinstance(row, dict):
+                raise ValueError(f'Line {number}: expected a JSON object')
+            yield row
+    else:
+        raise ValueError(f'Unsupported format: {fmt}')
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.skipped = 0
+        self.invalid = 0
+        self.started = time.monotonic()
+
+    @property
+    def processed(self):
+        return self.created + self.skipped + self.invalid
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    @property
+    def rate(self):
+        return self.processed / self.elapsed if self.elapsed else 0.0
+
+
+def _clean(row):
+    email = (row.get('email') or '').strip().lower()
+    if not email or '@' not in email:
+        return None
+    first_name = (row.get('first_name') or '').strip()
+    last_name = (row.get('last_name') or '').strip()
+    name = (row.get('name') or '').strip() or f'{first_name} {last_name}'.strip() or email.split('@')[0]
+    return {
+        'email': email,
+        'username': (row.get('username') or '').strip() or email,
+        'first_name': first_name[:150],
+        'last_name': last_name[:150],
+        'name': name[:100],
+        'phone': (row.get('phone') or '').strip()[:20] or None,
+        'address': (row.get('address') or '').strip() or None,
+        'password': row.get('password') or None,
+    }
+
+
+def _hash(password, hashes):
+    if password not in hashes:
+        hashes[password] = make_password(password)
+    return hashes[password]
+
+
+def _taken_usernames(User, usernames):
+    """
+    The subset of ``usernames`` already in use, plus every suffixed
+    variant (``name-2``, ``name-3``, ...) of those that are, so the next
+    free suffix can be picked without another query.
+    """
+    taken = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+    clashes = sorted(taken)
+    # A few prefixes per query keeps the OR chain short of SQLite's limit
+    for start in range(0, len(clashes), 100):
+        prefixes = Q()
+        for username in clashes[start:start + 100]:
+            prefixes |= Q(username__startswith=f'{username[:140]}-')
+        taken.update(User.objects.filter(prefixes).values_list('username', flat=True))
+    return taken
+
+
+def _import_chunk(rows, group, result):
+    User = get_user_model()
+
+    records = {}
+    for row in rows:
+        record = _clean(row)
+        if record is None:
+            result.invalid += 1
+        elif record['email'] in records:
+            result.skipped += 1
+        else:
+            records[record['email']] = record
+
+    # Emails are compared lowercased; signup keeps whatever case was typed
+    emails = list(records)
+    existing = set()
+    for model in (User, Participant):
+        existing.update(
+            model.objects.annotate(email_lower=Lower('email'))
+            .filter(email_lower__in=emails).values_list('email_lower', flat=True)
+        )
+    for email in existing:
+        if records.pop(email, None) is not None:
+            result.skipped += 1
+    if not records:
+        return
+
+    taken = _taken_usernames(User, {record['username'] for record in records.values()})
+    unusable_password = make_password(None)
+    # Hashing takes most of a second by design, so rows sharing a password
+    # (often a default one) share its hash instead of paying for it each
+    hashes = {}
+
+    users = []
+    for record in records.values():
+        username = record['username']
+        suffix = 1
+        while username in taken:
+            suffix += 1
+            username = f"{record['username'][:140]}-{suffix}"
+        taken.add(username)
+        users.append(User(
+            username=username,
+            email=record['email'],
+            first_name=record['first_name'],
+            last_name=record['last_name'],
+            password=_hash(record['password'], hashes) if record['password'] else unusable_password,
+        ))
+
+    with transaction.atomic():
+        users = User.objects.bulk_create(users)
+        if users and users[0].pk is None:
+            # Backends that can't return ids from a bulk insert
+            ids = dict(User.objects.filter(
+                username__in=[user.username for user in users]
+            ).values_list('username', 'pk'))
+            for user in users:
+                user.pk = ids[user.username]
+
+        Participant.objects.bulk_create([
+            Participant(
+                user_id=user.pk,
+                name=records[user.email]['name'],
+                email=user.email,
+                phone=records[user.email]['phone'],
+                address=records[user.email]['address'],
+            )
+            for user in users
+        ])
+
+        groups_field = User.groups.field
+        Membership = User.groups.through
+        Membership.objects.bulk_create([
+            Membership(**{
+                f'{groups_field.m2m_field_name()}_id': user.pk,
+                f'{groups_field.m2m_reverse_field_name()}_id': group.pk,
+            })
+            for user in users
+        ], ignore_conflicts=True)
+
+    invalidate_group_names([user.pk for user in users])
+    result.created += len(users)
+
+
+def import_participants(rows, chunk_size=1000, group_name=PARTICIPANT, progress=None):
+    """
+    Creates users, participants and group memberships from an iterable of
+    dicts in chunks of ``chunk_size``, one transaction per chunk. Rows whose
+    email already belongs to a user or participant are skipped.
+
+    ``progress`` is called with the running ImportResult after each chunk.
+    """
+    result = ImportResult()
+    group, _ = Group.objects.get_or_create(name=group_name)
+    rows = iter(rows)
+    with bulk_import():
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            _import_chunk(chunk, group, result)
+            if progress:
+                progress(result)
+    if result.created:
+        invalidate_dashboard_stats()
+        touch_models(Participant)
+    return result
@@ -0,0 +1,165 @@
+import logging
+import random
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.mail import EmailMessage, get_connection
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+from .sqlite import retry_on_lock
+
+
+logger = logging.getLogger('core.jobs')
+
+BATCH_SIZE = 50
+RETRY_BASE_DELAY = 30  # seconds, doubled on every attempt
+# A job still running after this long belonged to a worker that died
+STALE_AFTER = timedelta(minutes=10)
+
+HANDLERS = {}
+
+
+def job_handler(kind):
+    """
+    Registers the function that runs jobs of ``kind``. It gets every due
+    job of that kind in the batch and returns a dict of job pk to the
+    exception that job failed with; jobs not in it count as done.
+    """
+    def decorator(func):
+        HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+def enqueue(kind, payload, key=None, run_after=None, max_attempts=5):
+    """
+    Queues a job and returns it. When ``key`` is given and a job was already
+    queued under it, that job is returned instead, so repeating a request
+    doesn't repeat its side effects. Called inside a transaction, the job
+    only becomes visible to workers once the transaction commits.
+    """
+    if key is not None:
+        existing = Job.objects.filter(idempotency_key=key).first()
+        if existing is not None:
+            return existing
+    try:
+        with transaction.atomic():
+            return Job.objects.create(
+                kind=kind, payload=payload, idempotency_key=key,
+                run_after=run_after or timezone.now(), max_attempts=max_attempts,
+            )
+    except IntegrityError:
+        if key is None:
+            raise
+        return Job.objects.get(idempotency_key=key)
+
+
+def queue_email(subject, body, to, key=None, from_email=None):
+    return enqueue('email', {
+        'subject': subject,
+        'body': body,
+        'to': list(to),
+        'from_email': from_email,
+    }, key=key)
+
+
+def claim_jobs(limit=BATCH_SIZE):
+    """
+    Marks up to ``limit`` due jobs as running and returns them. Each job is
+    claimed with a conditional UPDATE, so concurrent workers never run the
+    same job.
+    """
+    def claim():
+        now = timezone.now()
+        with transaction.atomic():
+            Job.objects.filter(status=Job.RUNNING, locked_at__lt=now - STALE_AFTER).update(status=Job.QUEUED)
+            due = list(
+                Job.objects.filter(status=Job.QUEUED, run_after__lte=now)
+                .order_by('run_after', 'id')
+                .values_list('pk', flat=True)[:limit]
+            )
+            claimed = [
+                pk for pk in due
+                if Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+                    status=Job.RUNNING, locked_at=now, attempts=F('attempts') + 1,
+                )
+            ]
+        return list(Job.objects.filter(pk__in=claimed).order_by('run_after', 'id'))
+    return retry_on_lock(claim)
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=RETRY_BASE_DELAY * 2 ** (attempts - 1) * random.uniform(0.5, 1.5))
+
+
+def _finish(jobs, failures):
+    now = timezone.now()
+    counts = {'done': 0, 'retried': 0, 'failed': 0}
+    with transaction.atomic():
+        done = [job.pk for job in jobs if job.pk not in failures]
+        Job.objects.filter(pk__in=done).update(status=Job.DONE, finished_at=now, locked_at=None, last_error='')
+        counts['done'] = len(done)
+        for job in jobs:
+            if job.pk not in failures:
+                continue
+            error = f'{type(failures[job.pk]).__name__}: {failures[job.pk]}'
+            if job.attempts >= job.max_attempts:
+                Job.objects.filter(pk=job.pk).update(
+                    status=Job.FAILED, finished_at=now, locked_at=None, last_error=error,
+                )
+                counts['failed'] += 1
+                logger.error(f'{job} failed for good after {job.attempts} attempts: {error}')
+            else:
+                Job.objects.filter(pk=job.pk).update(
+                    status=Job.QUEUED, run_after=now + retry_delay(job.attempts), locked_at=None, last_error=error,
+                )
+                counts['retried'] += 1
+                logger.warning(f'{job} failed (attempt {job.attempts}), will retry: {error}')
+    return counts
+
+
+def run_due_jobs(limit=BATCH_SIZE):
+    """
+    Claims a batch of due jobs, runs them grouped by kind and records the
+    outcome. Failed jobs are retried with exponential backoff until they
+    run out of attempts. Returns how many jobs finished, will be retried
+    and failed for good.
+    """
+    jobs = claim_jobs(limit)
+    batches = defaultdict(list)
+    for job in jobs:
+        batches[job.kind].append(job)
+
+    failures = {}
+    for kind, batch in batches.items():
+        handler = HANDLERS.get(kind)
+        try:
+            if handler is None:
+                raise LookupError(f'No handler for {kind} jobs')
+            failures.update(handler(batch) or {})
+        except Exception as exc:
+            failures.update((job.pk, exc) for job in batch)
+    return retry_on_lock(lambda: _finish(jobs, failures))
+
+
+@job_handler('email')
+def send_emails(jobs):
+    """
+    Sends every email in the batch over one mail connection. If the
+    connection can't be opened the whole batch is retried.
+    """
+    failures = {}
+    with get_connection() as connection:
+        for job in jobs:
+            message = EmailMessage(
+                job.payload['subject'], job.payload['body'], job.payload.get('from_email'),
+                job.payload['to'], connection=connection,
+            )
+            try:
+                message.send()
+            except Exception as exc:
+                failures[job.pk] = exc
+    return failures
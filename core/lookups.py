@@ -0,0 +1,47 @@
+from django.contrib.auth import get_user_model
+from django.db.models.functions import Collate
+
+from .models import Category, Event
+
+
+def _name_prefix(queryset, query):
+    # istartswith is a LIKE 'q%', which SQLite answers from the NOCASE
+    # index on name; ordering by the same collation reads it in order too
+    return (
+        queryset.filter(name__istartswith=query)
+        .order_by(Collate('name', 'nocase'), 'pk')
+        .values_list('pk', 'name')
+    )
+
+
+def events(query):
+    return _name_prefix(Event.objects, query)
+
+
+def categories(query):
+    return _name_prefix(Category.objects, query)
+
+
+def users(query):
+    # A range on the unique username index; unlike the others this prefix
+    # match is case-sensitive
+    users = get_user_model().objects.filter(is_active=True)
+    if query:
+        users = users.filter(username__gte=query, username__lt=query + '\U0010ffff')
+    return users.order_by('username').values_list('pk', 'username')
+
+
+LOOKUPS = {
+    'events': events,
+    'categories': categories,
+    'users': users,
+}
+
+
+def autocomplete(kind, query, limit):
+    """
+    Returns up to ``limit`` (id, label) pairs whose label starts with
+    ``query``, and whether there are more.
+    """
+    rows = list(LOOKUPS[kind](query)[:limit + 1])
+    return rows[:limit], len(rows) > limit
@@ -0,0 +1,79 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from core import urls
+from core.benchmark import bench_routes, compare_reports, create_bench_users, route_errors, seed_dataset
+
+
+class Command(BaseCommand):
+    help = (
+        'Seeds a synthetic dataset into a throwaway test database, requests every '
+        'route in core.urls and writes timings, query counts and rows fetched as JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--categories', type=int, default=20)
+        parser.add_argument('--events', type=int, default=2000)
+        parser.add_argument('--participants', type=int, default=2000)
+        parser.add_argument('--rsvps', type=int, default=10000)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--repeat', type=int, default=20, help='Timed requests per route.')
+        parser.add_argument('--cold', action='store_true', help='Clear the cache before every request.')
+        parser.add_argument('--output', default='bench_output.json')
+        parser.add_argument('--baseline', help='Fail if the run regresses against this report.')
+        parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed p50/rows growth (0.25 = 25%%).')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            dataset = seed_dataset(
+                categories=options['categories'],
+                events=options['events'],
+                participants=options['participants'],
+                rsvps=options['rsvps'],
+                seed=options['seed'],
+            )
+            users = create_bench_users()
+            routes = bench_routes(urls.urlpatterns, users, repeat=options['repeat'], cold=options['cold'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        report = {
+            'dataset': dataset,
+            'repeat': options['repeat'],
+            'cold': options['cold'],
+            'vendor': connection.vendor,
+            'routes': routes,
+        }
+        with open(options['output'], 'w', encoding='utf-8') as output:
+            json.dump(report, output, indent=2, sort_keys=True)
+
+        for route, result in routes.items():
+            self.stdout.write(
+                f"{route:<55} {','.join(map(str, result['status'])):>7} "
+                f"p50 {result['p50_ms']:>8.2f}ms  p99 {result['p99_ms']:>8.2f}ms  "
+                f"{result['queries']:>4} queries  {result['rows']:>6} rows"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as stream:
+                baseline = json.load(stream)
+            regressions = compare_reports(report, baseline, tolerance=options['tolerance'])
+            if regressions:
+                for regression in regressions:
+                    self.stderr.write(regression)
+                raise CommandError(f'{len(regressions)} regressions against {options["baseline"]}')
+            self.stdout.write(self.style.SUCCESS('No regressions against the baseline.'))
+        else:
+            errors = route_errors(routes)
+            if errors:
+                for error in errors:
+                    self.stderr.write(error)
+                raise CommandError(f'{len(errors)} routes answered with an error')
@@ -0,0 +1,82 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+
+from core import search
+from core.models import Category, Event, Participant, RSVP, day_range
+from core.pagination import KeysetPage
+from core.stats import compute_dashboard_stats
+from core.views import PARTICIPANT_PAGE_SIZE, PARTICIPANT_RECENT_EVENTS, PARTICIPANT_SORTS
+
+
+def _hot_queries():
+    today = date.today()
+    day_start, day_end = day_range(today)
+    category_id = Category.objects.values_list('pk', flat=True).first() or 0
+    event_id = Event.objects.values_list('pk', flat=True).first() or 0
+    events = Event.objects.select_related('category')
+    participants = Participant.objects.with_recent_events(PARTICIPANT_RECENT_EVENTS)
+
+    return [
+        ('dashboard_view: headline counters', lambda: compute_dashboard_stats(today)),
+        ('dashboard_view: today', lambda: list(
+            Event.objects.filter(start_at__gte=day_start, start_at__lt=day_end).order_by('start_at')
+        )),
+        ('dashboard_view: upcoming table', lambda: list(
+            Event.objects.filter(start_at__gte=day_end).order_by('start_at').values('id', 'category__name')
+        )),
+        ('event_list: first page', lambda: KeysetPage(
+            events, ('start_at', 'id'), 50, []
+        ).object_list()),
+        ('event_list: category + date range', lambda: KeysetPage(
+            events.filter(category_id=category_id, start_at__gte=day_start, start_at__lt=day_end),
+            ('start_at', 'id'), 50, [],
+        ).object_list()),
+        ('search_events', lambda: search.search_events('event')),
+        ('participant_list: by name', lambda: KeysetPage(
+            participants, PARTICIPANT_SORTS['name'], PARTICIPANT_PAGE_SIZE, [],
+        ).object_list()),
+        ('participant_list: most events', lambda: KeysetPage(
+            participants, PARTICIPANT_SORTS['-events'], PARTICIPANT_PAGE_SIZE, [],
+        ).object_list()),
+        ('participant_list: prefix search', lambda: KeysetPage(
+            participants.filter(Q(name__istartswith='a') | Q(email__istartswith='a')),
+            PARTICIPANT_SORTS['name'], PARTICIPANT_PAGE_SIZE, [],
+        ).object_list()),
+        ('event attendees', lambda: list(
+            RSVP.objects.filter(event_id=event_id, status=RSVP.ATTENDING).values('participant_id')
+        )),
+    ]
+
+
+class Command(BaseCommand):
+    help = "Prints the database query plan for every query the hot views run."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', help='Only explain queries whose label contains this text.')
+
+    def handle(self, *args, **options):
+        prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+
+        for label, run in _hot_queries():
+            if options['only'] and options['only'] not in label:
+                continue
+            captured = []
+
+            def capture(execute, sql, params, many, context):
+                captured.append((sql, params))
+                return execute(sql, params, many, context)
+
+            with connection.execute_wrapper(capture):
+                run()
+
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            for sql, params in captured:
+                self.stdout.write(f'  {sql}')
+                with connection.cursor() as cursor:
+                    cursor.execute(prefix + sql, params)
+                    for row in cursor.fetchall():
+                        self.stdout.write('    ' + ' '.join(str(column) for column in row))
+            self.stdout.write('')
@@ -0,0 +1,40 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from core.exports import EXPORTS, EXPORT_FORMATS, stream_export
+
+
+class Command(BaseCommand):
+    help = 'Streams events, participants or RSVPs as CSV or JSONL.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(EXPORTS))
+        parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--output', help='File to write; defaults to stdout.')
+        parser.add_argument('--event', type=int)
+        parser.add_argument('--category', type=int)
+        parser.add_argument('--start-date', help='YYYY-MM-DD')
+        parser.add_argument('--end-date', help='YYYY-MM-DD')
+
+    def handle(self, *args, **options):
+        filters = {}
+        for name in ('event', 'category'):
+            if options[name]:
+                filters[name] = options[name]
+        for name in ('start_date', 'end_date'):
+            if options[name]:
+                value = parse_date(options[name])
+                if value is None:
+                    raise CommandError(f'Invalid date: {options[name]}')
+                filters[name] = value
+
+        chunks = stream_export(options['kind'], options['format'], **filters)
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+                for chunk in chunks:
+                    output.write(chunk)
+        else:
+            for chunk in chunks:
+                sys.stdout.write(chunk)
@@ -0,0 +1,50 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.imports import import_participants, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Imports attendees from a CSV or JSONL file as users with participant profiles.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV (with a header row) or JSONL file; "-" reads stdin.')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Defaults to the file extension.')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--group', default='Participant', help='Group every imported user joins.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+
+        def progress(result):
+            self.stdout.write(
+                f'{result.processed} rows: {result.created} created, {result.skipped} skipped, '
+                f'{result.invalid} invalid ({result.rate:.0f} rows/s)'
+            )
+
+        try:
+            if path == '-':
+                result = self._import(sys.stdin, fmt, options, progress)
+            else:
+                with open(path, newline='', encoding='utf-8') as stream:
+                    result = self._import(stream, fmt, options, progress)
+        except OSError as exc:
+            raise CommandError(exc)
+        except ValueError as exc:
+            # Earlier chunks are already in; running again skips them
+            raise CommandError(f'{exc}; any earlier chunks were imported.')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {result.created} participants in {result.elapsed:.1f}s '
+            f'({result.rate:.0f} rows/s); {result.skipped} duplicates skipped, {result.invalid} invalid.'
+        ))
+
+    def _import(self, stream, fmt, options, progress):
+        return import_participants(
+            read_rows(stream, fmt),
+            chunk_size=options['chunk_size'],
+            group_name=options['group'],
+            progress=progress,
+        )
@@ -0,0 +1,48 @@
+import json
+import sys
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.imports import read_rows
+from core.rsvps import apply_rsvps
+
+
+class Command(BaseCommand):
+    help = 'Upserts RSVPs (participant, event, status, comment) from a CSV or JSONL file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV (with a header row) or JSONL file; "-" reads stdin.')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Defaults to the file extension.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--results', help='Write one JSON result per input row to this file.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+
+        started = time.monotonic()
+        try:
+            if path == '-':
+                results = apply_rsvps(read_rows(sys.stdin, fmt), batch_size=options['batch_size'])
+            else:
+                with open(path, newline='', encoding='utf-8') as stream:
+                    results = apply_rsvps(read_rows(stream, fmt), batch_size=options['batch_size'])
+        except OSError as exc:
+            raise CommandError(exc)
+        except ValueError as exc:
+            raise CommandError(f'{exc}; any earlier batches were applied.')
+        elapsed = time.monotonic() - started
+
+        if options['results']:
+            with open(options['results'], 'w', encoding='utf-8') as output:
+                for line, result in enumerate(results, start=1):
+                    output.write(json.dumps(dict(result, row=line)) + '\n')
+
+        summary = Counter(result['status'] for result in results)
+        rate = len(results) / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Applied {len(results)} RSVPs in {elapsed:.1f}s ({rate:.0f} rows/s): '
+            + ', '.join(f'{count} {status}' for status, count in sorted(summary.items()))
+        ))
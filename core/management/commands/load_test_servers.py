@@ -0,0 +1,125 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from core.benchmark import create_bench_users, run_http_load, seed_dataset
+
+
+SERVERS = {
+    # Blocking workers: each one handles a single connection at a time
+    'gunicorn': lambda port, workers: [
+        sys.executable, '-m', 'gunicorn', 'event_system.wsgi:application',
+        '--bind', f'127.0.0.1:{port}', '--workers', str(workers), '--worker-class', 'sync',
+    ],
+    # Event loop workers serving the async views
+    'uvicorn': lambda port, workers: [
+        sys.executable, '-m', 'uvicorn', 'event_system.asgi:application',
+        '--host', '127.0.0.1', '--port', str(port), '--workers', str(workers), '--no-access-log',
+    ],
+}
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for_port(port, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            return False
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+class Command(BaseCommand):
+    help = (
+        'Seeds a throwaway SQLite database, serves it with gunicorn (sync views) '
+        'and uvicorn (async views) in turn, and drives both with the same crowd '
+        'of slow concurrent clients, reporting throughput and latency.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Server worker processes.')
+        parser.add_argument('--clients', type=int, default=100, help='Concurrent clients.')
+        parser.add_argument('--requests', type=int, default=5, help='Requests per client.')
+        parser.add_argument(
+            '--client-delay', type=float, default=0.2,
+            help='Seconds each client takes to send its request.',
+        )
+        parser.add_argument('--events', type=int, default=500)
+        parser.add_argument('--server', choices=[*SERVERS, 'both'], default='both')
+        parser.add_argument('--output', help='Also write the results as JSON to this file.')
+
+    def handle(self, *args, **options):
+        servers = list(SERVERS) if options['server'] == 'both' else [options['server']]
+        old_name = connection.settings_dict['NAME']
+        setup_test_environment()
+        try:
+            connection.close()
+            database = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                seed_dataset(categories=10, events=options['events'], participants=500, rsvps=2000)
+                users = create_bench_users()
+                client = Client()
+                client.force_login(users['admin'])
+                cookie = f"{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}"
+                connection.close()
+
+                results = {}
+                for name in servers:
+                    results[name] = self.run_server(name, database, cookie, options)
+                    result = results[name]
+                    self.stdout.write(
+                        f"{name:<9} {result['requests'] - result['errors']:>6}/{result['requests']} ok  "
+                        f"{result['seconds']:>7.2f}s  {result['requests_per_second']:>7.1f} req/s  "
+                        f"p50 {result['p50_ms']}ms  p95 {result['p95_ms']}ms"
+                    )
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+        finally:
+            teardown_test_environment()
+
+        if len(results) == 2 and results['gunicorn']['requests_per_second']:
+            speedup = results['uvicorn']['requests_per_second'] / results['gunicorn']['requests_per_second']
+            self.stdout.write(self.style.SUCCESS(f'uvicorn: {speedup:.1f}x the gunicorn throughput'))
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(results, output, indent=2)
+
+    def run_server(self, name, database, cookie, options):
+        port = _free_port()
+        env = dict(os.environ, SQLITE_DATABASE=str(database), DJANGO_SETTINGS_MODULE='event_system.settings')
+        # event_system.asgi sets this for uvicorn; gunicorn must not inherit it
+        env.pop('DJANGO_SERVER_MODE', None)
+        process = subprocess.Popen(
+            SERVERS[name](port, options['workers']), cwd=settings.BASE_DIR, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            if not _wait_for_port(port, process):
+                raise CommandError(f'{name} did not start; is it installed?')
+            # One pass per path first, so each worker has its caches warm
+            run_http_load('127.0.0.1', port, cookie, clients=options['workers'] * 4, requests=4, client_delay=0)
+            return run_http_load(
+                '127.0.0.1', port, cookie, clients=options['clients'],
+                requests=options['requests'], client_delay=options['client_delay'],
+            )
+        finally:
+            process.terminate()
+            process.wait()
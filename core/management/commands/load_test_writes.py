@@ -0,0 +1,70 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from core.benchmark import WRITE_PROFILES, run_write_load, seed_dataset
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs concurrent RSVP and signup writes from several processes against a '
+        'throwaway SQLite database, once per connection profile, and reports '
+        'throughput and writes lost to "database is locked".'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8, help='Concurrent processes, like gunicorn workers.')
+        parser.add_argument('--writes', type=int, default=200, help='Writes per worker.')
+        parser.add_argument('--events', type=int, default=50)
+        parser.add_argument('--participants', type=int, default=500)
+        parser.add_argument('--profile', choices=[*WRITE_PROFILES, 'both'], default='both')
+        parser.add_argument('--output', help='Also write the results as JSON to this file.')
+
+    def handle(self, *args, **options):
+        profiles = list(WRITE_PROFILES) if options['profile'] == 'both' else [options['profile']]
+        results = {}
+        for name in profiles:
+            results[name] = self.run_profile(WRITE_PROFILES[name], options)
+            result = results[name]
+            self.stdout.write(
+                f"{name:<11} {result['done']:>6}/{result['attempted']} writes  "
+                f"{result['locked']:>5} locked  {result['seconds']:>7.2f}s  "
+                f"{result['writes_per_second']:>8.1f} writes/s"
+            )
+
+        if len(results) == 2 and results['baseline']['writes_per_second']:
+            speedup = results['production']['writes_per_second'] / results['baseline']['writes_per_second']
+            self.stdout.write(self.style.SUCCESS(f'Production profile: {speedup:.1f}x the baseline throughput'))
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(results, output, indent=2)
+
+    def run_profile(self, profile, options):
+        old_name = connection.settings_dict['NAME']
+        old_options = connection.settings_dict['OPTIONS']
+        pragmas = settings.SQLITE_PRAGMAS if profile['pragmas'] is None else profile['pragmas']
+        setup_test_environment()
+        try:
+            with override_settings(SQLITE_PRAGMAS=pragmas):
+                if profile['options'] is not None:
+                    connection.settings_dict['OPTIONS'] = profile['options']
+                connection.close()
+                connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+                try:
+                    seed_dataset(
+                        categories=5, events=options['events'],
+                        participants=options['participants'], rsvps=0,
+                    )
+                    return run_write_load(
+                        workers=options['workers'], writes=options['writes'],
+                        use_write_view=profile['write_view'],
+                    )
+                finally:
+                    connection.creation.destroy_test_db(old_name, verbosity=0)
+        finally:
+            connection.settings_dict['OPTIONS'] = old_options
+            connection.close()
+            teardown_test_environment()
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from core.deletion import purge
+from core.models import Category, Event
+
+
+class Command(BaseCommand):
+    help = (
+        'Purges soft-deleted categories and events in small batches, reporting '
+        'progress. The run_jobs worker does this on its own after each delete; '
+        'this catches up on anything left behind.'
+    )
+
+    def handle(self, *args, **options):
+        total = 0
+        for model_name, model in (('category', Category), ('event', Event)):
+            for pk in model.all_objects.filter(deleted_at__isnull=False).values_list('pk', flat=True):
+                deleted = purge(model_name, pk, progress=self.stdout.write)
+                total += deleted
+                self.stdout.write(f'Purged {model_name} {pk}: {deleted} rows deleted')
+        self.stdout.write(self.style.SUCCESS(f'{total} rows deleted'))
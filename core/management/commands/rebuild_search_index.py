@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the SQLite FTS5 index used by event search.'
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('The full-text search index is only available on SQLite.')
+        total = rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {total} events.'))
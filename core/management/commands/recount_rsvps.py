@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from core.tallies import recount_participant_events, recount_tallies
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the denormalized RSVP and participant counters on events, and event counts on participants.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('event_ids', nargs='*', type=int, help='Only recount these events.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        updated = recount_tallies(batch_size=options['batch_size'], event_ids=options['event_ids'])
+        self.stdout.write(self.style.SUCCESS(f'Recounted tallies for {updated} events.'))
+        if not options['event_ids']:
+            updated = recount_participant_events(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Recounted events for {updated} participants.'))
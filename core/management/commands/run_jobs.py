@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.jobs import BATCH_SIZE, run_due_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs queued background jobs such as activation emails. Keeps polling '
+        'for new jobs until stopped, or exits once nothing is due with --once.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Run whatever is due, then exit.')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds to wait when the queue is empty.')
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                counts = run_due_jobs(options['batch_size'])
+                if any(counts.values()):
+                    self.stdout.write(
+                        f"{counts['done']} done, {counts['retried']} to retry, {counts['failed']} failed"
+                    )
+                    # A full batch means more may be waiting
+                    continue
+                if options['once']:
+                    break
+                # Don't hold a connection open while idle
+                connections.close_all()
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,274 @@
+import json
+import logging
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import Template
+
+from .decorators import QueryBudgetExceeded
+from .routers import RoutingState, _state as _routing_state, use_replica
+
+
+logger = logging.getLogger('core.performance')
+
+_current = ContextVar('request_timings', default=None)
+
+# Marks the end of a streamed body
+_END = object()
+
+
+class RequestTimings:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.view_name = None
+        self.budget = None
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - started
+
+    @property
+    def total_time(self):
+        return time.perf_counter() - self.started
+
+
+def _timed_render(render):
+    def wrapper(self, *args, **kwargs):
+        timings = _current.get()
+        if timings is None:
+            return render(self, *args, **kwargs)
+        # Only the outermost render is timed; includes rendered through
+        # render_to_string inside a template would otherwise count twice.
+        timings.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            timings.template_depth -= 1
+            if timings.template_depth == 0:
+                timings.template_time += time.perf_counter() - started
+    wrapper.timed = True
+    return wrapper
+
+
+if not getattr(Template.render, 'timed', False):
+    Template.render = _timed_render(Template.render)
+
+
+def _record_query(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    return timings.record_query(execute, sql, params, many, context)
+
+
+def install_query_recorder(connection):
+    # Installed on every connection (see core.signals) rather than per
+    # request: async views run their queries on other threads, each with its
+    # own connections, and the request's timings reach them through the
+    # context variable.
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def _is_staff(request):
+    # Only a user the request already loaded: looking one up just for the
+    # header would add session queries to feeds and 304s
+    user = getattr(request, '_cached_user', None) or getattr(request, '_acached_user', None)
+    return bool(user is not None and user.is_staff)
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Records query count, database time, template render time and the
+    remaining Python time for every request. The numbers are logged to
+    ``core.performance`` at DEBUG and, with DEBUG on or for staff, sent back
+    in a Server-Timing header. Views marked with ``query_budget`` are
+    checked against their budget. Streamed responses are measured until
+    their body is sent, including the queries it runs, and so are logged
+    and checked then, without the header.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        for connection in connections.all():
+            install_query_recorder(connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings = RequestTimings()
+        token = _current.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timings)
+
+    async def __acall__(self, request):
+        timings = RequestTimings()
+        token = _current.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timings)
+
+    def finish(self, request, response, timings):
+        if response.streaming:
+            # The body runs its queries after the headers are sent, so a
+            # streamed response gets no Server-Timing header; it is logged
+            # and checked against its budget once the body has been sent
+            response.streaming_content = self._measured(request, response, timings)
+            return response
+        # The header tells anyone how much work a page does, so in
+        # production only staff get it
+        if settings.DEBUG or _is_staff(request):
+            total = timings.total_time
+            python_time = max(total - timings.db_time - timings.template_time, 0.0)
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={timings.db_time * 1000:.1f};desc="{timings.queries} queries"',
+                f'tpl;dur={timings.template_time * 1000:.1f}',
+                f'app;dur={python_time * 1000:.1f}',
+                f'total;dur={total * 1000:.1f}',
+            ])
+        self.report(request, response, timings)
+        return response
+
+    def _measured(self, request, response, timings):
+        content = response.streaming_content
+        if response.is_async:
+            async def stream():
+                iterator = aiter(content)
+                while True:
+                    token = _current.set(timings)
+                    try:
+                        chunk = await anext(iterator, _END)
+                    finally:
+                        _current.reset(token)
+                    if chunk is _END:
+                        break
+                    yield chunk
+                self.report(request, response, timings)
+            return stream()
+
+        def stream():
+            iterator = iter(content)
+            while True:
+                token = _current.set(timings)
+                try:
+                    chunk = next(iterator, _END)
+                finally:
+                    _current.reset(token)
+                if chunk is _END:
+                    break
+                yield chunk
+            self.report(request, response, timings)
+        return stream()
+
+    def report(self, request, response, timings):
+        total = timings.total_time
+        python_time = max(total - timings.db_time - timings.template_time, 0.0)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'view': timings.view_name,
+                'status': response.status_code,
+                'queries': timings.queries,
+                'db_ms': round(timings.db_time * 1000, 2),
+                'template_ms': round(timings.template_time * 1000, 2),
+                'python_ms': round(python_time * 1000, 2),
+                'total_ms': round(total * 1000, 2),
+            }))
+
+        if timings.budget is not None and timings.queries > timings.budget:
+            message = (
+                f'{timings.view_name} ran {timings.queries} queries, '
+                f'over its budget of {timings.budget} ({request.path})'
+            )
+            if getattr(settings, 'QUERY_BUDGET_RAISE', False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timings = _current.get()
+        if timings is not None:
+            view = getattr(view_func, 'view_class', view_func)
+            timings.view_name = f'{view.__module__}.{view.__name__}'
+            timings.budget = getattr(view_func, 'query_budget', None)
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Lets views marked with ``replica_reads`` read from a replica unless the
+    user wrote something in the last REPLICA_STICKY_SECONDS, so people
+    always see their own changes. Any request that writes starts or extends
+    that window with a cookie.
+    """
+
+    cookie_name = 'primary_until'
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = RoutingState()
+        token = _routing_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing_state.reset(token)
+        return self.finish(response, state)
+
+    async def __acall__(self, request):
+        state = RoutingState()
+        token = _routing_state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _routing_state.reset(token)
+        return self.finish(response, state)
+
+    def finish(self, response, state):
+        if state.wrote and getattr(settings, 'DATABASE_REPLICAS', []):
+            seconds = settings.REPLICA_STICKY_SECONDS
+            response.set_cookie(
+                self.cookie_name, str(int(time.time()) + seconds),
+                max_age=seconds, httponly=True, samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if getattr(view_func, 'replica_reads', False) and not self.sticky(request):
+            use_replica(_routing_state.get())
+        return None
+
+    def sticky(self, request):
+        try:
+            return int(request.COOKIES.get(self.cookie_name, 0)) > time.time()
+        except ValueError:
+            return False
@@ -0,0 +1,61 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_tallies(apps, schema_editor):
+    Event = apps.get_model('core', 'Event')
+    RSVP = apps.get_model('core', 'RSVP')
+    Participant = apps.get_model('core', 'Participant')
+
+    rsvps = RSVP.objects.filter(event_id=OuterRef('pk')).order_by().values('event_id')
+
+    def rsvp_count(status):
+        counts = rsvps.filter(status=status).annotate(total=Count('*')).values('total')
+        return Coalesce(Subquery(counts), 0)
+
+    participants = (
+        Participant.events.through.objects
+        .filter(event_id=OuterRef('pk'))
+        .order_by()
+        .values('event_id')
+        .annotate(total=Count('*'))
+        .values('total')
+    )
+    Event.objects.update(
+        attending_count=rsvp_count('attending'),
+        maybe_count=rsvp_count('maybe'),
+        not_attending_count=rsvp_count('not_attending'),
+        participant_count=Coalesce(Subquery(participants), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_event_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='attending_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='maybe_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='not_attending_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='participant_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_tallies, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+import datetime
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def populate_start_at(apps, schema_editor):
+    Event = apps.get_model('core', 'Event')
+    batch = []
+    for event in Event.objects.only('id', 'date', 'time').iterator(chunk_size=2000):
+        event.start_at = timezone.make_aware(datetime.datetime.combine(event.date, event.time))
+        batch.append(event)
+        if len(batch) == 2000:
+            Event.objects.bulk_update(batch, ['start_at'])
+            batch = []
+    if batch:
+        Event.objects.bulk_update(batch, ['start_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_event_rsvp_tallies'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='start_at',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.RunPython(populate_start_at, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='event',
+            name='start_at',
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['category', 'start_at'], name='event_category_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['start_at'], name='event_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rsvp',
+            index=models.Index(fields=['event', 'status'], name='rsvp_event_status_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_name_nocase_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventSeries',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('description', models.TextField()),
+                ('time', models.TimeField()),
+                ('location', models.CharField(max_length=200)),
+                ('capacity', models.PositiveIntegerField(blank=True, help_text='Leave empty for unlimited seats.', null=True)),
+                ('frequency', models.CharField(choices=[('daily', 'Daily'), ('weekly', 'Weekly'), ('monthly', 'Monthly')], default='weekly', max_length=10)),
+                ('interval', models.PositiveSmallIntegerField(default=1, help_text='Repeat every this many days, weeks or months.', validators=[django.core.validators.MinValueValidator(1)])),
+                ('starts_on', models.DateField()),
+                ('until', models.DateField(blank=True, help_text='Last possible date, if any.', null=True)),
+                ('count', models.PositiveIntegerField(blank=True, help_text='Number of occurrences, if limited.', null=True)),
+                ('exceptions', models.JSONField(blank=True, default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='series', to='core.category')),
+            ],
+            options={
+                'verbose_name_plural': 'event series',
+                'indexes': [models.Index(fields=['starts_on', 'until'], name='series_window_idx')],
+            },
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='series',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='events', to='core.eventseries'),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='occurrence_date',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='event',
+            constraint=models.UniqueConstraint(fields=('series', 'occurrence_date'), name='event_series_occurrence_uniq'),
+        ),
+    ]
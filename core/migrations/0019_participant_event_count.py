@@ -0,0 +1,45 @@
+import django.db.models.functions.comparison
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_event_counts(apps, schema_editor):
+    Participant = apps.get_model('core', 'Participant')
+    counts = (
+        Participant.events.through.objects
+        .filter(participant_id=OuterRef('pk'))
+        .order_by()
+        .values('participant_id')
+        .annotate(total=Count('*'))
+        .values('total')
+    )
+    Participant.objects.update(event_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_event_created_by'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='participant',
+            name='event_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_event_counts, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='participant',
+            index=models.Index(fields=['event_count', 'id'], name='participant_event_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='participant',
+            index=models.Index(django.db.models.functions.comparison.Collate('name', 'nocase'), name='participant_name_nocase_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='participant',
+            index=models.Index(django.db.models.functions.comparison.Collate('email', 'nocase'), name='participant_email_nocase_idx'),
+        ),
+    ]
@@ -1,6 +1,11 @@
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.core.validators import MinValueValidator
+from django.db import models, transaction
+from django.db.models.functions import Coalesce, Collate
 from django.contrib.auth.models import AbstractUser
 from django.conf import settings
+from django.utils import timezone
+from datetime import datetime, time, timedelta
 
 
 class CustomUser(AbstractUser):
@@ -8,13 +13,177 @@ class CustomUser(AbstractUser):
     pass
 
 
+class LiveManager(models.Manager):
+    """
+    Leaves out soft-deleted rows, which core.deletion hides until a
+    background purge removes them. ``all_objects`` still sees them.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class Category(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = LiveManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        indexes = [
+            # Case-insensitive prefix lookups for autocomplete
+            models.Index(Collate('name', 'nocase'), name='category_name_nocase_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+def start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def day_range(day):
+    """Aware [start, end) bounds of a calendar day, for start_at lookups."""
+    return start_of_day(day), start_of_day(day + timedelta(days=1))
+
+
+def event_start(day, at):
+    return timezone.make_aware(datetime.combine(day, at))
+
+
+class EventQuerySet(models.QuerySet):
+    """
+    Keeps start_at in step with date and time on the bulk paths that skip
+    Event.save(): update(), bulk_create() and bulk_update().
+    """
+
+    def update(self, **kwargs):
+        if 'date' not in kwargs and 'time' not in kwargs:
+            return super().update(**kwargs)
+        with transaction.atomic(using=self.db):
+            # The filter may no longer match once the rows are updated
+            pks = list(self.values_list('pk', flat=True))
+            rows = super().update(**kwargs)
+            for start in range(0, len(pks), 500):
+                self.model.all_objects.filter(pk__in=pks[start:start + 500]).sync_start_at()
+        return rows
+
+    def sync_start_at(self, batch_size=500):
+        events = list(self.only('pk', 'date', 'time'))
+        for event in events:
+            event.start_at = event_start(event.date, event.time)
+        return super().bulk_update(events, ['start_at'], batch_size=batch_size)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for event in objs:
+            event.start_at = event_start(event.date, event.time)
+        update_fields = kwargs.get('update_fields')
+        if update_fields and {'date', 'time'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'start_at'}
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        if {'date', 'time'} & set(fields):
+            objs = list(objs)
+            for event in objs:
+                event.start_at = event_start(event.date, event.time)
+            fields = {*fields, 'start_at'}
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
+    def recount_tallies(self):
+        """
+        Recomputes the denormalized RSVP and participant counters for every
+        event in the queryset with a single UPDATE.
+        """
+        rsvps = RSVP.objects.filter(event_id=models.OuterRef('pk')).order_by().values('event_id')
+
+        def rsvp_count(status):
+            counts = rsvps.filter(status=status).annotate(total=models.Count('*')).values('total')
+            return Coalesce(models.Subquery(counts), 0)
+
+        participants = (
+            Participant.events.through.objects
+            .filter(event_id=models.OuterRef('pk'))
+            .order_by()
+            .values('event_id')
+            .annotate(total=models.Count('*'))
+            .values('total')
+        )
+        return self.update(
+            attending_count=rsvp_count(RSVP.ATTENDING),
+            maybe_count=rsvp_count(RSVP.MAYBE),
+            not_attending_count=rsvp_count(RSVP.NOT_ATTENDING),
+            participant_count=Coalesce(models.Subquery(participants), 0),
+            updated_at=timezone.now(),
+        )
+
+
+class EventSeries(models.Model):
+    """
+    A recurring event, stored once. core.recurrence expands its occurrences
+    for whatever dates a page shows; one only becomes an Event row, with
+    ``series`` and ``occurrence_date`` set, when someone RSVPs to it or
+    edits it.
+    """
+    DAILY = 'daily'
+    WEEKLY = 'weekly'
+    MONTHLY = 'monthly'
+    FREQUENCY_CHOICES = [
+        (DAILY, 'Daily'),
+        (WEEKLY, 'Weekly'),
+        (MONTHLY, 'Monthly'),
+    ]
+
+    name = models.CharField(max_length=200)
+    description = models.TextField()
+    time = models.TimeField()
+    location = models.CharField(max_length=200)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='series')
+    capacity = models.PositiveIntegerField(null=True, blank=True, help_text='Leave empty for unlimited seats.')
+    frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES, default=WEEKLY)
+    interval = models.PositiveSmallIntegerField(
+        default=1, validators=[MinValueValidator(1)], help_text='Repeat every this many days, weeks or months.',
+    )
+    starts_on = models.DateField()
+    until = models.DateField(null=True, blank=True, help_text='Last possible date, if any.')
+    count = models.PositiveIntegerField(null=True, blank=True, help_text='Number of occurrences, if limited.')
+    # ISO dates of skipped occurrences, like EXDATE
+    exceptions = models.JSONField(default=list, blank=True)
+    # Set when an organizer creates the series; its occurrences are theirs too
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, editable=False,
+        related_name='created_series',
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'event series'
+        indexes = [
+            models.Index(fields=['starts_on', 'until'], name='series_window_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    def clean(self):
+        if self.until and self.starts_on and self.until < self.starts_on:
+            raise ValidationError({'until': 'The series cannot end before it starts.'})
+
+    def occurrence(self, day):
+        """An unsaved Event for the occurrence on ``day``."""
+        event = Event(
+            series=self, occurrence_date=day, name=self.name, description=self.description,
+            date=day, time=self.time, location=self.location, category=self.category,
+            capacity=self.capacity, created_by_id=self.created_by_id,
+        )
+        event.start_at = event_start(day, self.time)
+        return event
+
+
 class Event(models.Model):
     name = models.CharField(max_length=200)
     description = models.TextField()
@@ -22,10 +191,81 @@ class Event(models.Model):
     time = models.TimeField()
     location = models.CharField(max_length=200)
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='events')
+    capacity = models.PositiveIntegerField(null=True, blank=True, help_text='Leave empty for unlimited seats.')
+    # date + time as one aware datetime, kept in sync by save() and by
+    # EventQuerySet's bulk methods
+    start_at = models.DateTimeField(editable=False)
+
+    # Denormalized tallies, maintained by core.tallies
+    attending_count = models.PositiveIntegerField(default=0, editable=False)
+    maybe_count = models.PositiveIntegerField(default=0, editable=False)
+    not_attending_count = models.PositiveIntegerField(default=0, editable=False)
+    participant_count = models.PositiveIntegerField(default=0, editable=False)
+    # Set on occurrences of a series that were saved as rows of their own;
+    # occurrence_date stays the scheduled date if the event is moved
+    series = models.ForeignKey(
+        EventSeries, on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name='events',
+    )
+    occurrence_date = models.DateField(null=True, blank=True, editable=False)
+    # Set when an organizer creates the event; organizers only manage their own
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, editable=False,
+        related_name='created_events',
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = LiveManager.from_queryset(EventQuerySet)()
+    all_objects = EventQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['category', 'start_at'], name='event_category_start_idx'),
+            models.Index(fields=['start_at'], name='event_start_idx'),
+            models.Index(fields=['updated_at'], name='event_updated_idx'),
+            models.Index(Collate('name', 'nocase'), name='event_name_nocase_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['series', 'occurrence_date'], name='event_series_occurrence_uniq'),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.start_at = event_start(self.date, self.time)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'updated_at'}
+            if {'date', 'time'} & set(update_fields):
+                kwargs['update_fields'].add('start_at')
+        super().save(*args, **kwargs)
+
+class ParticipantQuerySet(models.QuerySet):
+    def recount_events(self):
+        """
+        Recomputes the denormalized event_count of every participant in the
+        queryset with a single UPDATE.
+        """
+        counts = (
+            Participant.events.through.objects
+            .filter(participant_id=models.OuterRef('pk'))
+            .order_by()
+            .values('participant_id')
+            .annotate(total=models.Count('*'))
+            .values('total')
+        )
+        return self.update(event_count=Coalesce(models.Subquery(counts), 0), updated_at=timezone.now())
+
+    def with_recent_events(self, limit):
+        """
+        Prefetches only the id and name of each participant's ``limit`` most
+        recent events into ``recent_events``.
+        """
+        recent = Event.objects.only('id', 'name').order_by('-start_at', '-id')[:limit]
+        return self.prefetch_related(models.Prefetch('events', queryset=recent, to_attr='recent_events'))
+
+
 class Participant(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True)
 
@@ -34,6 +274,22 @@ class Participant(models.Model):
     events = models.ManyToManyField(Event, related_name='participants')
     phone = models.CharField(max_length=20, blank=True, null=True)
     address = models.TextField(blank=True, null=True)
+    # Denormalized number of linked events, maintained by core.tallies
+    event_count = models.PositiveIntegerField(default=0, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ParticipantQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['name', 'id'], name='participant_name_idx'),
+            models.Index(fields=['email', 'id'], name='participant_email_idx'),
+            models.Index(fields=['event_count', 'id'], name='participant_event_count_idx'),
+            models.Index(fields=['updated_at'], name='participant_updated_idx'),
+            # Case-insensitive prefix lookups for the directory search
+            models.Index(Collate('name', 'nocase'), name='participant_name_nocase_idx'),
+            models.Index(Collate('email', 'nocase'), name='participant_email_nocase_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -44,11 +300,14 @@ class RSVP(models.Model):
     ATTENDING = 'attending'
     NOT_ATTENDING = 'not_attending'
     MAYBE = 'maybe'
-    STATUS_CHOICES = [
+    WAITLISTED = 'waitlisted'
+    RESPONSE_CHOICES = [
         (ATTENDING, 'Attending'),
         (NOT_ATTENDING, 'Not Attending'),
         (MAYBE, 'Maybe'),
     ]
+    # Set by seat allocation when an event is full, never chosen directly
+    STATUS_CHOICES = RESPONSE_CHOICES + [(WAITLISTED, 'Waitlisted')]
 
     participant = models.ForeignKey(Participant, on_delete=models.CASCADE, related_name='rsvps')
     event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='rsvps')
@@ -56,10 +315,100 @@ class RSVP(models.Model):
     responded_at = models.DateTimeField(auto_now=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES)
     comment = models.TextField(blank=True, null=True) 
+    waitlisted_at = models.DateTimeField(null=True, blank=True, editable=False)
 
     class Meta:
         unique_together = ('participant', 'event')
+        indexes = [
+            models.Index(fields=['event', 'status'], name='rsvp_event_status_idx'),
+            models.Index(fields=['event', 'status', 'waitlisted_at'], name='rsvp_waitlist_idx'),
+        ]
 
     def __str__(self):
         return f"{self.participant.name} - {self.event.name} ({self.status})"
 
+
+
+class Job(models.Model):
+    """
+    A unit of background work run by the ``run_jobs`` worker; see core.jobs.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    # Enqueueing again with the same key returns the existing job
+    idempotency_key = models.CharField(max_length=200, unique=True, null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_due_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} #{self.pk} ({self.status})'
+
+
+class EventNotification(models.Model):
+    """
+    One fan-out of a change or cancellation notice to everyone who RSVPed
+    to an event, with its progress; see core.notifications.
+    """
+    CHANGED = 'changed'
+    CANCELLED = 'cancelled'
+    KIND_CHOICES = [
+        (CHANGED, 'Changed'),
+        (CANCELLED, 'Cancelled'),
+    ]
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+    ]
+
+    # Kept after the event is deleted, so cancellations can still go out
+    event = models.ForeignKey(Event, on_delete=models.SET_NULL, null=True, related_name='notifications')
+    event_name = models.CharField(max_length=200)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    # {field: [old, new]} for changes, formatted for the message
+    changes = models.JSONField(default=dict)
+    # Participant ids captured before a deleted event's RSVPs went with it
+    recipient_ids = models.JSONField(null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    total = models.PositiveIntegerField(default=0)
+    queued = models.PositiveIntegerField(default=0)
+    # Last RSVP id (or recipient_ids position) queued, to resume from
+    cursor = models.PositiveBigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f'{self.event_name} {self.kind} ({self.queued}/{self.total})'
+
+    @property
+    def per_second(self):
+        if not self.started_at:
+            return None
+        elapsed = ((self.finished_at or timezone.now()) - self.started_at).total_seconds()
+        return round(self.queued / elapsed, 1) if elapsed > 0 else None
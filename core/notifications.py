@@ -0,0 +1,157 @@
+import logging
+import time
+
+from django.db import transaction
+from django.template.loader import get_template
+from django.utils import timezone
+
+from .jobs import enqueue, job_handler
+from .models import EventNotification, Job, Participant, RSVP
+from .sqlite import retry_on_lock
+
+
+logger = logging.getLogger('core.jobs')
+
+# Changes to these fields are worth telling attendees about
+NOTIFY_FIELDS = ('date', 'time', 'location')
+NOTIFY_STATUSES = (RSVP.ATTENDING, RSVP.MAYBE)
+CHUNK_SIZE = 500
+
+
+def snapshot(event):
+    # Deferred fields are left out rather than loaded
+    return {field: event.__dict__[field] for field in NOTIFY_FIELDS if field in event.__dict__}
+
+
+def changed_fields(event, before):
+    return {
+        field: [str(old), str(getattr(event, field))]
+        for field, old in before.items()
+        if old != getattr(event, field)
+    }
+
+
+def _recipients(event_id):
+    return RSVP.objects.filter(event_id=event_id, status__in=NOTIFY_STATUSES)
+
+
+def notify_event_changed(event, changes):
+    """
+    Records a change notice for ``event`` and queues its fan-out. Only two
+    rows are written here, however many people RSVPed; the run_jobs worker
+    does the rest.
+    """
+    notification = EventNotification.objects.create(
+        event=event, event_name=event.name, kind=EventNotification.CHANGED, changes=changes,
+    )
+    enqueue('event_notification', {'notification': notification.pk})
+    return notification
+
+
+def notify_event_cancelled(event):
+    """
+    Like notify_event_changed for an event about to be deleted. The
+    recipients are captured first, as one list of ids, since their RSVPs
+    are deleted along with the event.
+    """
+    recipient_ids = list(_recipients(event.pk).order_by('pk').values_list('participant_id', flat=True))
+    if not recipient_ids:
+        return None
+    notification = EventNotification.objects.create(
+        event=event, event_name=event.name, kind=EventNotification.CANCELLED,
+        recipient_ids=recipient_ids, total=len(recipient_ids),
+    )
+    enqueue('event_notification', {'notification': notification.pk})
+    return notification
+
+
+def _changed_chunks(notification):
+    # Keyset chunks, so a resumed fan-out starts after the last RSVP queued
+    recipients = (
+        _recipients(notification.event_id)
+        .order_by('pk')
+        .values_list('pk', 'participant_id', 'participant__name', 'participant__email')
+    )
+    cursor = notification.cursor
+    while True:
+        chunk = list(recipients.filter(pk__gt=cursor)[:CHUNK_SIZE].iterator(chunk_size=CHUNK_SIZE))
+        if not chunk:
+            return
+        cursor = chunk[-1][0]
+        yield cursor, [row[1:] for row in chunk]
+
+
+def _cancelled_chunks(notification):
+    ids = notification.recipient_ids
+    for start in range(notification.cursor, len(ids), CHUNK_SIZE):
+        chunk = ids[start:start + CHUNK_SIZE]
+        people = Participant.objects.filter(pk__in=chunk).values_list('pk', 'name', 'email')
+        yield start + len(chunk), list(people.iterator(chunk_size=CHUNK_SIZE))
+
+
+def _message(template, notification, changes, name, email):
+    body = template.render({'name': name, 'notification': notification, 'changes': changes})
+    if notification.kind == EventNotification.CANCELLED:
+        subject = f'Cancelled: {notification.event_name}'
+    else:
+        subject = f'Updated: {notification.event_name}'
+    return {'subject': subject, 'body': body, 'to': [email], 'from_email': None}
+
+
+def fan_out(notification):
+    """
+    Queues one email job per recipient, a chunk at a time. Each chunk is
+    committed with the notification's progress, so an interrupted fan-out
+    picks up where it stopped and never queues anyone twice.
+    """
+    if notification.status == EventNotification.DONE:
+        return
+    if notification.started_at is None:
+        notification.started_at = timezone.now()
+        if notification.kind == EventNotification.CHANGED:
+            notification.total = _recipients(notification.event_id).count()
+    notification.status = EventNotification.RUNNING
+    notification.save(update_fields=['started_at', 'total', 'status'])
+
+    # Loaded once rather than per message
+    template = get_template('core/event_notification_email.html')
+    changes = [(field.replace('_', ' '), old, new) for field, (old, new) in notification.changes.items()]
+    chunks = _cancelled_chunks if notification.kind == EventNotification.CANCELLED else _changed_chunks
+    started = time.perf_counter()
+    for cursor, people in chunks(notification):
+        messages = [
+            Job(
+                kind='email', payload=_message(template, notification, changes, name, email),
+                idempotency_key=f'event-notification:{notification.pk}:{participant_id}',
+            )
+            for participant_id, name, email in people if email
+        ]
+
+        notification.queued += len(messages)
+        notification.cursor = cursor
+
+        def queue_chunk():
+            with transaction.atomic():
+                Job.objects.bulk_create(messages, ignore_conflicts=True)
+                notification.save(update_fields=['queued', 'cursor'])
+        retry_on_lock(queue_chunk)
+
+    notification.status = EventNotification.DONE
+    notification.finished_at = timezone.now()
+    notification.save(update_fields=['status', 'finished_at'])
+    elapsed = time.perf_counter() - started
+    logger.info(
+        f'{notification}: queued {notification.queued} messages in {elapsed:.2f}s '
+        f'({notification.per_second} per second overall)'
+    )
+
+
+@job_handler('event_notification')
+def run_fan_outs(jobs):
+    failures = {}
+    for job in jobs:
+        try:
+            fan_out(EventNotification.objects.get(pk=job.payload['notification']))
+        except Exception as exc:
+            failures[job.pk] = exc
+    return failures
@@ -0,0 +1,252 @@
+import heapq
+from datetime import date, timedelta
+from itertools import count
+from operator import attrgetter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from .models import Event, EventSeries
+from .sqlite import retry_on_lock
+
+
+# How far ahead pages with no end date show occurrences of open-ended series
+RECURRENCE_HORIZON_DAYS = 365
+
+
+def _add_months(day, months):
+    month = day.month - 1 + months
+    try:
+        return day.replace(year=day.year + month // 12, month=month % 12 + 1)
+    except ValueError:
+        # No such day that month (the 31st, Feb 29th); skipped like an RRULE
+        return None
+
+
+def _schedule(series, start):
+    """
+    Yields (index, date) for the scheduled occurrences of ``series``.
+    Daily and weekly series jump straight to ``start``; monthly ones walk
+    from the beginning, at twelve steps a year, since skipped days make
+    the index of a month unpredictable.
+    """
+    if series.frequency == EventSeries.MONTHLY:
+        index = 0
+        for step in count():
+            day = _add_months(series.starts_on, step * series.interval)
+            if day is not None:
+                yield index, day
+                index += 1
+    else:
+        days = _step_days(series)
+        first = max(0, -(-(start - series.starts_on).days // days))
+        for index in count(first):
+            yield index, series.starts_on + timedelta(days=index * days)
+
+
+def _step_days(series):
+    # Days between occurrences of a daily or weekly series
+    return series.interval * (7 if series.frequency == EventSeries.WEEKLY else 1)
+
+
+def _bounds(series, start, end):
+    # The first and last days an occurrence could fall on, or None if none can
+    start = max(start or series.starts_on, series.starts_on)
+    last = series.until
+    if end is not None:
+        last = min(last, end - timedelta(days=1)) if last else end - timedelta(days=1)
+    if last is not None and start > last:
+        return None
+    return start, last
+
+
+def occurrence_dates(series, start=None, end=None):
+    """
+    Lazily yields the dates of ``series`` on or after ``start`` and before
+    ``end``. Exceptions are left out but still use up ``count``, as EXDATE
+    does in RFC 5545.
+    """
+    bounds = _bounds(series, start, end)
+    if bounds is None:
+        return
+    start, last = bounds
+    skipped = set(series.exceptions or ())
+    for index, day in _schedule(series, start):
+        if series.count is not None and index >= series.count:
+            return
+        if last is not None and day > last:
+            return
+        if day >= start and day.isoformat() not in skipped:
+            yield day
+
+
+def occurrence_dates_before(series, end, start=None):
+    """
+    The dates of ``series`` before ``end`` (and on or after ``start``),
+    latest first. Daily and weekly series count back from ``end``; monthly
+    ones are listed forwards and reversed.
+    """
+    if series.frequency == EventSeries.MONTHLY:
+        yield from reversed(list(occurrence_dates(series, start, end)))
+        return
+    bounds = _bounds(series, start, end)
+    if bounds is None:
+        return
+    start, last = bounds
+    days = _step_days(series)
+    index = (last - series.starts_on).days // days
+    if series.count is not None:
+        index = min(index, series.count - 1)
+    skipped = set(series.exceptions or ())
+    for index in range(index, -1, -1):
+        day = series.starts_on + timedelta(days=index * days)
+        if day < start:
+            return
+        if day.isoformat() not in skipped:
+            yield day
+
+
+def count_occurrence_dates(series, start, end):
+    """
+    How many dates ``occurrence_dates`` would yield, worked out from the
+    rule for daily and weekly series rather than by listing them.
+    """
+    if series.frequency == EventSeries.MONTHLY:
+        return sum(1 for _ in occurrence_dates(series, start, end))
+    bounds = _bounds(series, start, end)
+    if bounds is None:
+        return 0
+    start, last = bounds
+    days = _step_days(series)
+    first = -(-(start - series.starts_on).days // days)
+    final = (last - series.starts_on).days // days
+    if series.count is not None:
+        final = min(final, series.count - 1)
+    if final < first:
+        return 0
+    offsets = {(date.fromisoformat(day) - series.starts_on).days for day in series.exceptions or ()}
+    skipped = sum(1 for offset in offsets if offset % days == 0 and first <= offset // days <= final)
+    return final - first + 1 - skipped
+
+
+def falls_on(series, day):
+    """Whether ``series`` has an occurrence on ``day``."""
+    return next(occurrence_dates(series, day, day + timedelta(days=1)), None) is not None
+
+
+def _series(start, end, category_id=None, created_by=None):
+    series = EventSeries.objects.select_related('category').filter(category__deleted_at__isnull=True)
+    if start is not None:
+        series = series.filter(Q(until__isnull=True) | Q(until__gte=start))
+    if end is not None:
+        series = series.filter(starts_on__lt=end)
+    if category_id:
+        series = series.filter(category_id=category_id)
+    if created_by is not None:
+        series = series.filter(created_by=created_by)
+    return series
+
+
+def _saved(series_ids, start, end):
+    # all_objects, so an occurrence waiting to be purged isn't shown again
+    saved = Event.all_objects.filter(series_id__in=series_ids)
+    if start is not None:
+        saved = saved.filter(occurrence_date__gte=start)
+    if end is not None:
+        saved = saved.filter(occurrence_date__lt=end)
+    return saved.values_list('series_id', 'occurrence_date')
+
+
+def expand(series_list, saved, start=None, end=None, reverse=False):
+    """
+    Merges the occurrences of ``series_list`` between ``start`` and ``end``
+    into one generator of unsaved Events in start_at order (latest first
+    with ``reverse``, which needs an ``end``), leaving out the (series id,
+    date) pairs in ``saved``.
+    """
+    def series_occurrences(series):
+        if reverse:
+            dates = occurrence_dates_before(series, end, start)
+        else:
+            dates = occurrence_dates(series, start, end)
+        for day in dates:
+            if (series.pk, day) not in saved:
+                yield series.occurrence(day)
+    return heapq.merge(
+        *(series_occurrences(series) for series in series_list), key=attrgetter('start_at'), reverse=reverse,
+    )
+
+
+def load_series(start=None, end=None, category_id=None, created_by=None):
+    """
+    The series with occurrences from the date ``start`` up to ``end`` (or
+    only those ``created_by`` a user), and the set of (series id, date)
+    pairs among them already saved as Events. Two queries, however long
+    the window.
+    """
+    series_list = list(_series(start, end, category_id, created_by))
+    if not series_list:
+        return [], set()
+    return series_list, set(_saved([series.pk for series in series_list], start, end))
+
+
+async def aload_series(start=None, end=None, category_id=None, created_by=None):
+    series_list = [series async for series in _series(start, end, category_id, created_by)]
+    if not series_list:
+        return [], set()
+    return series_list, {row async for row in _saved([series.pk for series in series_list], start, end)}
+
+
+def occurrences(start=None, end=None, category_id=None, created_by=None):
+    """
+    The occurrences of every series (or only those ``created_by`` a user)
+    from the date ``start`` up to ``end`` that aren't saved as Events, as a
+    generator. A series with no ``until`` or ``count`` needs an ``end``.
+    """
+    return expand(*load_series(start, end, category_id, created_by), start, end)
+
+
+async def aoccurrences(start=None, end=None, category_id=None, created_by=None):
+    return expand(*await aload_series(start, end, category_id, created_by), start, end)
+
+
+def horizon(start):
+    return start + timedelta(days=RECURRENCE_HORIZON_DAYS)
+
+
+def get_occurrence(series, day):
+    """
+    The saved Event for ``series`` on ``day`` if there is one, else an
+    unsaved occurrence, or None when the series doesn't fall on ``day``.
+    """
+    event = Event.objects.filter(series=series, occurrence_date=day).first()
+    if event is not None:
+        return event
+    if not falls_on(series, day):
+        return None
+    return series.occurrence(day)
+
+
+def materialize(occurrence):
+    """
+    Saves an occurrence as an Event row, or returns the row another request
+    saved first.
+    """
+    if occurrence.pk is not None:
+        return occurrence
+
+    def save():
+        try:
+            with transaction.atomic():
+                occurrence.save()
+            return occurrence
+        except IntegrityError:
+            return Event.objects.get(series_id=occurrence.series_id, occurrence_date=occurrence.occurrence_date)
+    return retry_on_lock(save)
+
+
+def skip(series, day):
+    """Adds ``day`` to the exceptions of ``series``."""
+    if day.isoformat() not in series.exceptions:
+        series.exceptions = [*series.exceptions, day.isoformat()]
+        series.save(update_fields=['exceptions', 'updated_at'])
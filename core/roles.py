@@ -0,0 +1,66 @@
+from django.core.cache import cache
+
+
+ADMIN = 'Admin'
+ORGANIZER = 'Organizer'
+PARTICIPANT = 'Participant'
+
+ROLE_CACHE_TIMEOUT = 60 * 60
+
+
+def _cache_key(user_id):
+    return f'user_groups:{user_id}'
+
+
+def get_group_names(user):
+    """
+    Returns the names of the user's groups. Loaded at most once per request
+    (memoized on the user object) and shared across requests via the cache.
+    """
+    if not getattr(user, 'is_authenticated', False):
+        return frozenset()
+    names = getattr(user, '_group_names', None)
+    if names is None:
+        names = cache.get(_cache_key(user.pk))
+        if names is None:
+            names = frozenset(user.groups.values_list('name', flat=True))
+            cache.set(_cache_key(user.pk), names, ROLE_CACHE_TIMEOUT)
+        user._group_names = names
+    return names
+
+
+def invalidate_group_names(user_ids):
+    cache.delete_many([_cache_key(user_id) for user_id in user_ids])
+
+
+def in_any_group(user, *group_names):
+    return bool(get_group_names(user).intersection(group_names))
+
+
+def is_organizer(user):
+    return ORGANIZER in get_group_names(user)
+
+
+class Roles:
+    """
+    Role flags for templates; nothing is loaded until a flag is read.
+    """
+
+    def __init__(self, user):
+        self.user = user
+
+    @property
+    def names(self):
+        return get_group_names(self.user)
+
+    @property
+    def is_admin(self):
+        return self.user.is_superuser or ADMIN in self.names
+
+    @property
+    def is_organizer(self):
+        return ORGANIZER in self.names
+
+    @property
+    def can_manage_events(self):
+        return self.is_admin or self.is_organizer
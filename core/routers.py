@@ -0,0 +1,72 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+
+# Set per request by ReplicaRoutingMiddleware
+_state = ContextVar('replica_routing', default=None)
+# Set by primary_reads()
+_primary = ContextVar('primary_reads', default=False)
+
+# Sessions and users are read on every request, including the one right
+# after login, so they always come from the primary.
+PRIMARY_ONLY_APPS = {'sessions', 'auth', 'contenttypes', 'admin'}
+
+
+class RoutingState:
+    def __init__(self):
+        self.read_from = None
+        self.wrote = False
+
+
+def use_replica(state):
+    replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+    if replicas:
+        state.read_from = random.choice(replicas)
+
+
+@contextmanager
+def primary_reads():
+    """
+    Reads from the primary for the duration, even in a replica_reads view.
+    Caches keyed by the current version are filled this way: rows from a
+    lagging replica would otherwise stay cached under that version until
+    the next write replaces it.
+    """
+    token = _primary.set(True)
+    try:
+        yield
+    finally:
+        _primary.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Sends reads of views marked with ``replica_reads`` to a replica and
+    everything else to the primary. Writes always go to the primary and
+    are recorded so the middleware can keep that user on the primary for a
+    while afterwards.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state.read_from is None or _primary.get():
+            return None
+        if model._meta.app_label in PRIMARY_ONLY_APPS or model._meta.model_name == 'customuser':
+            return None
+        return state.read_from
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None and model._meta.app_label != 'sessions':
+            state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary along with the data
+        return db not in getattr(settings, 'DATABASE_REPLICAS', [])
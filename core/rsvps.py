@@ -0,0 +1,178 @@
+from collections import Counter, defaultdict
+from itertools import islice
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Event, Participant, RSVP
+from .seats import claim_seat, promote_waitlist
+from .tallies import STATUS_FIELDS, apply_tally_changes
+from .versions import touch, touch_models
+
+
+VALID_STATUSES = {value for value, label in RSVP.RESPONSE_CHOICES}
+
+
+def _parse(row):
+    if not isinstance(row, dict):
+        return None, 'expected an object'
+    try:
+        participant_id = int(row['participant'])
+        event_id = int(row['event'])
+    except (KeyError, TypeError, ValueError):
+        return None, 'participant and event must be ids'
+    status = row.get('status') or RSVP.ATTENDING
+    if status not in VALID_STATUSES:
+        return None, f'invalid status {status!r}'
+    return (participant_id, event_id, status, row.get('comment') or None), None
+
+
+def _apply_batch(rows, created_by=None):
+    results = [None] * len(rows)
+    latest = {}
+    for index, row in enumerate(rows):
+        parsed, error = _parse(row)
+        if error:
+            results[index] = {'status': 'error', 'error': error}
+            continue
+        key = parsed[:2]
+        if key in latest:
+            results[latest[key][0]] = {'status': 'superseded'}
+        latest[key] = (index, parsed)
+    if not latest:
+        return results
+
+    participant_ids = {participant_id for participant_id, event_id in latest}
+    event_ids = {event_id for participant_id, event_id in latest}
+    known_participants = set(Participant.objects.filter(pk__in=participant_ids).values_list('pk', flat=True))
+    events = Event.objects.filter(pk__in=event_ids)
+    owned = set(event_ids)
+    if created_by is not None:
+        owned = set(events.filter(created_by=created_by).values_list('pk', flat=True))
+    capacities = dict(events.values_list('pk', 'capacity'))
+    known_events = set(capacities)
+    for (participant_id, event_id), (index, parsed) in list(latest.items()):
+        if participant_id not in known_participants or event_id not in known_events:
+            results[index] = {'status': 'error', 'error': 'unknown participant or event'}
+            del latest[(participant_id, event_id)]
+        elif event_id not in owned:
+            results[index] = {'status': 'error', 'error': 'not one of your events'}
+            del latest[(participant_id, event_id)]
+    if not latest:
+        return results
+
+    with transaction.atomic():
+        previous = {
+            (participant_id, event_id): (status, waitlisted_at)
+            for participant_id, event_id, status, waitlisted_at in RSVP.objects.filter(
+                participant_id__in=known_participants, event_id__in=known_events
+            ).values_list('participant_id', 'event_id', 'status', 'waitlisted_at')
+            if (participant_id, event_id) in latest
+        }
+
+        # New attendees of events with a capacity claim their seats one by
+        # one, the same way a single RSVP does; the rest join the waitlist.
+        rsvps = []
+        claimed = set()
+        for key, (index, (participant_id, event_id, status, comment)) in latest.items():
+            old_status, waitlisted_at = previous.get(key, (None, None))
+            if status == RSVP.ATTENDING and old_status != RSVP.ATTENDING and capacities[event_id] is not None:
+                if claim_seat(event_id):
+                    claimed.add(key)
+                else:
+                    status = RSVP.WAITLISTED
+                    if old_status != RSVP.WAITLISTED or waitlisted_at is None:
+                        waitlisted_at = timezone.now()
+            if status != RSVP.WAITLISTED:
+                waitlisted_at = None
+            latest[key] = (index, (participant_id, event_id, status, comment))
+            rsvps.append(RSVP(
+                participant_id=participant_id, event_id=event_id, status=status,
+                comment=comment, waitlisted_at=waitlisted_at,
+            ))
+        RSVP.objects.bulk_create(
+            rsvps,
+            update_conflicts=True,
+            unique_fields=['participant', 'event'],
+            update_fields=['status', 'comment', 'responded_at', 'waitlisted_at'],
+        )
+
+        changes = defaultdict(Counter)
+        changed_participants = set()
+        vacated = set()
+        for key, (index, (participant_id, event_id, status, comment)) in latest.items():
+            old_status = previous.get(key, (None, None))[0]
+            if key not in previous:
+                results[index] = {'status': 'created'}
+            elif old_status == status:
+                results[index] = {'status': 'unchanged'}
+            else:
+                results[index] = {'status': 'updated', 'previous': old_status}
+            if status == RSVP.WAITLISTED:
+                results[index]['waitlisted'] = True
+            if old_status != status:
+                changed_participants.add(participant_id)
+                if old_status in STATUS_FIELDS:
+                    changes[event_id][STATUS_FIELDS[old_status]] -= 1
+                if status in STATUS_FIELDS and key not in claimed:
+                    changes[event_id][STATUS_FIELDS[status]] += 1
+                if old_status == RSVP.ATTENDING and capacities[event_id] is not None:
+                    vacated.add(event_id)
+        for event_id, event_changes in changes.items():
+            apply_tally_changes(event_id, event_changes)
+        for event_id in vacated:
+            promote_waitlist(event_id)
+        # bulk_create skips the signals that keep the calendar feeds fresh
+        touch(*(f'feed:participant:{pk}' for pk in changed_participants))
+        if changed_participants:
+            touch_models(RSVP)
+
+    return results
+
+
+def apply_rsvps(rows, batch_size=1000, created_by=None):
+    """
+    Upserts RSVPs from dicts with participant, event, status and comment,
+    one transaction per batch, keeping the event tallies in step. With
+    ``created_by``, rows for events that user didn't create are refused.
+    Returns a result dict per input row, in input order.
+    """
+    rows = iter(rows)
+    results = []
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        results.extend(_apply_batch(batch, created_by))
+    return results
+
+
+def set_status(queryset, status):
+    """
+    Moves every RSVP in ``queryset`` to ``status`` with one UPDATE and
+    recounts the affected events with another, however many rows are
+    selected. Seats are claimed one at a time, so RSVPs to events with a
+    capacity are left alone when marking attendance. Returns the number of
+    RSVPs updated and skipped.
+    """
+    rsvps = RSVP.objects.filter(pk__in=queryset.values('pk')).exclude(status=status)
+    skipped = 0
+    if status == RSVP.ATTENDING:
+        skipped = rsvps.filter(event__capacity__isnull=False).count()
+        rsvps = rsvps.filter(event__capacity__isnull=True)
+
+    with transaction.atomic():
+        affected = list(rsvps.order_by().values_list('event_id', 'participant_id'))
+        if not affected:
+            return 0, skipped
+        updated = rsvps.update(status=status, waitlisted_at=None, responded_at=timezone.now())
+        event_ids = {event_id for event_id, participant_id in affected}
+        Event.objects.filter(pk__in=event_ids).recount_tallies()
+        if status != RSVP.ATTENDING:
+            capped = Event.objects.filter(pk__in=event_ids, capacity__isnull=False)
+            for event_id in capped.values_list('pk', flat=True):
+                promote_waitlist(event_id)
+        # Queryset updates skip the signals that keep caches and feeds fresh
+        touch_models(RSVP, Event)
+        touch(*{f'feed:participant:{participant_id}' for event_id, participant_id in affected})
+    return updated, skipped
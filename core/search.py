@@ -0,0 +1,205 @@
+import re
+
+from asgiref.sync import sync_to_async
+from django.db import connection, connections, router
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Event
+
+
+SEARCH_TABLE = 'core_event_fts'
+
+# Column weights for bm25(), in table column order: name, description,
+# location, category.
+SEARCH_WEIGHTS = (10.0, 1.0, 4.0, 2.0)
+
+CREATE_SEARCH_TABLE_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+    "name, description, location, category, "
+    "prefix='2 3', tokenize='unicode61 remove_diacritics 2')"
+)
+
+_SELECT_EVENT_ROWS = (
+    "SELECT e.id, e.name, e.description, e.location, COALESCE(c.name, '') "
+    "FROM core_event e LEFT JOIN core_category c ON c.id = e.category_id "
+    "WHERE e.deleted_at IS NULL"
+)
+
+# Private-use characters that never occur in event text, swapped for <mark>
+# tags after the snippet has been HTML-escaped.
+_MARK_START = '\ue000'
+_MARK_END = '\ue001'
+
+_index_ready = False
+
+
+def search_index_available():
+    global _index_ready
+    if connection.vendor != 'sqlite':
+        return False
+    if not _index_ready:
+        _index_ready = SEARCH_TABLE in connection.introspection.table_names()
+    return _index_ready
+
+
+def create_search_index():
+    global _index_ready
+    with connection.cursor() as cursor:
+        cursor.execute(CREATE_SEARCH_TABLE_SQL)
+    _index_ready = True
+
+
+def rebuild_search_index():
+    create_search_index()
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE}(rowid, name, description, location, category) "
+            + _SELECT_EVENT_ROWS
+        )
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('optimize')")
+        cursor.execute(f"SELECT count(*) FROM {SEARCH_TABLE}")
+        return cursor.fetchone()[0]
+
+
+def index_event(event_id):
+    if not search_index_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [event_id])
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE}(rowid, name, description, location, category) "
+            + _SELECT_EVENT_ROWS + " AND e.id = %s",
+            [event_id],
+        )
+
+
+def index_category(category_id):
+    if not search_index_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN "
+            "(SELECT id FROM core_event WHERE category_id = %s)",
+            [category_id],
+        )
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE}(rowid, name, description, location, category) "
+            + _SELECT_EVENT_ROWS + " AND e.category_id = %s",
+            [category_id],
+        )
+
+
+def unindex_category(category_id):
+    if not search_index_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN "
+            "(SELECT id FROM core_event WHERE category_id = %s)",
+            [category_id],
+        )
+
+
+def unindex_event(event_id):
+    if not search_index_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [event_id])
+
+
+def build_match_query(query):
+    """
+    Turns free text into an FTS5 query where every word must match as a
+    prefix. Words are quoted so FTS operators in user input are ignored.
+    """
+    terms = re.findall(r'\w+', query or '')
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def _highlight(snippet):
+    snippet = escape(snippet)
+    return mark_safe(snippet.replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>'))
+
+
+def _match_rows(match, offset, limit):
+    weights = ', '.join(str(weight) for weight in SEARCH_WEIGHTS)
+    # Read from wherever the Event rows will come from (a replica, if routed)
+    with connections[router.db_for_read(Event)].cursor() as cursor:
+        # Soft deletes unindex their events, so every match is a live event
+        # and a page is only short (and has_more false) at the real end
+        cursor.execute(
+            f"SELECT rowid, snippet({SEARCH_TABLE}, -1, %s, %s, '…', 16) "
+            f"FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s "
+            f"ORDER BY bm25({SEARCH_TABLE}, {weights}) LIMIT %s OFFSET %s",
+            [_MARK_START, _MARK_END, match, limit + 1, offset],
+        )
+        return cursor.fetchall()
+
+
+def _with_snippets(rows, events):
+    results = []
+    for event_id, snippet in rows:
+        event = events.get(event_id)
+        if event is not None:
+            event.snippet = _highlight(snippet)
+            results.append(event)
+    return results
+
+
+def search_events(query, offset=0, limit=20):
+    """
+    Returns up to ``limit`` events matching ``query`` best-first, each with a
+    ``snippet`` attribute, and whether more results follow. A query with
+    no words (blank, or only punctuation) is matched as a plain substring,
+    so a blank one lists every event by date.
+    """
+    match = build_match_query(query)
+    if not match or not search_index_available():
+        return _search_events_fallback(query, offset, limit)
+
+    rows = _match_rows(match, offset, limit)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    events = Event.objects.select_related('category').in_bulk([row[0] for row in rows])
+    return _with_snippets(rows, events), has_more
+
+
+async def asearch_events(query, offset=0, limit=20):
+    match = build_match_query(query)
+    # Raw cursors have no async API; only the FTS lookup runs in a thread
+    if not match or not await sync_to_async(search_index_available)():
+        return await _asearch_events_fallback(query, offset, limit)
+
+    rows = await sync_to_async(_match_rows)(match, offset, limit)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    events = await Event.objects.select_related('category').ain_bulk([row[0] for row in rows])
+    return _with_snippets(rows, events), has_more
+
+
+def _fallback_queryset(query):
+    events = Event.objects.select_related('category').order_by('start_at', 'id')
+    if query:
+        events = events.filter(
+            Q(name__icontains=query) |
+            Q(description__icontains=query) |
+            Q(location__icontains=query)
+        )
+    return events
+
+
+def _search_events_fallback(query, offset, limit):
+    results = list(_fallback_queryset(query)[offset:offset + limit + 1])
+    for event in results:
+        event.snippet = event.description[:200]
+    return results[:limit], len(results) > limit
+
+
+async def _asearch_events_fallback(query, offset, limit):
+    results = [event async for event in _fallback_queryset(query)[offset:offset + limit + 1]]
+    for event in results:
+        event.snippet = event.description[:200]
+    return results[:limit], len(results) > limit
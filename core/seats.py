@@ -0,0 +1,46 @@
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Event, RSVP
+from .tallies import apply_tally_changes
+from .versions import touch, touch_models
+
+
+def claim_seat(event_id):
+    """
+    Takes one attending seat with a single conditional UPDATE, so
+    concurrent RSVPs can never push an event past its capacity. Returns
+    False when the event is full.
+    """
+    return bool(
+        Event.objects.filter(pk=event_id)
+        .filter(Q(capacity__isnull=True) | Q(attending_count__lt=F('capacity')))
+        .update(attending_count=F('attending_count') + 1, updated_at=timezone.now())
+    )
+
+
+def release_seat(event_id):
+    apply_tally_changes(event_id, {'attending_count': -1})
+
+
+def promote_waitlist(event_id):
+    """
+    Moves waitlisted RSVPs to attending, oldest first, while seats are
+    free. Returns the participant ids that got a seat.
+    """
+    promoted = []
+    waitlist = RSVP.objects.filter(event_id=event_id, status=RSVP.WAITLISTED)
+    while True:
+        waiting = waitlist.order_by('waitlisted_at', 'id').values_list('pk', 'participant_id').first()
+        if waiting is None or not claim_seat(event_id):
+            break
+        # Another request may have promoted the same row in the meantime
+        if waitlist.filter(pk=waiting[0]).update(status=RSVP.ATTENDING, waitlisted_at=None):
+            promoted.append(waiting[1])
+        else:
+            release_seat(event_id)
+    if promoted:
+        # Queryset updates skip the signals that keep caches and feeds fresh
+        touch_models(RSVP)
+        touch(*(f'feed:participant:{pk}' for pk in promoted))
+    return promoted
@@ -1,21 +1,243 @@
 
 from django.contrib.auth.models import Group
-from django.db.models.signals import post_save
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_init, pre_save, post_save, pre_delete, post_delete, m2m_changed
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import User
-from .models import Participant
+from django.utils import timezone
+from .models import Category, Event, EventSeries, Participant, RSVP
+from .stats import invalidate_dashboard_stats
+from . import deletion, middleware, notifications, roles, search, seats, sqlite, tallies
+from .imports import bulk_import_active
+from .versions import touch, touch_models
 
 User = get_user_model()
 
 @receiver(post_save, sender=User)
 def assign_participant_group(sender, instance, created, **kwargs):
-    if created:
+    if created and not bulk_import_active():
         participant_group, _ = Group.objects.get_or_create(name='Participant')
         instance.groups.add(participant_group)
 
 
 @receiver(post_save, sender=User)
 def create_participant(sender, instance, created, **kwargs):
-    if created:
+    if created and not bulk_import_active():
         Participant.objects.create(user=instance)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+@receiver(post_save, sender=EventSeries)
+@receiver(post_delete, sender=EventSeries)
+@receiver(post_save, sender=Participant)
+@receiver(post_delete, sender=Participant)
+def invalidate_stats_on_change(sender, **kwargs):
+    invalidate_dashboard_stats()
+
+
+@receiver(m2m_changed, sender=Participant.events.through)
+def invalidate_stats_on_m2m_change(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_dashboard_stats()
+
+
+@receiver(post_save, sender=Event)
+def update_search_index(sender, instance, **kwargs):
+    search.index_event(instance.pk)
+
+
+@receiver(post_delete, sender=Event)
+def remove_from_search_index(sender, instance, **kwargs):
+    search.unindex_event(instance.pk)
+
+
+@receiver(post_save, sender=Category)
+def update_category_search_index(sender, instance, created, **kwargs):
+    if not created:
+        search.index_category(instance.pk)
+
+
+@receiver(post_init, sender=RSVP)
+def remember_rsvp_status(sender, instance, **kwargs):
+    # Read from __dict__ so deferred loads don't trigger a query
+    instance._tally_status = instance.__dict__.get('status')
+
+
+@receiver(pre_save, sender=RSVP)
+def allocate_seat(sender, instance, **kwargs):
+    old_status = None if instance._state.adding else instance._tally_status
+    instance._seat_claimed = False
+    if instance.status == RSVP.ATTENDING and old_status != RSVP.ATTENDING:
+        if seats.claim_seat(instance.event_id):
+            instance._seat_claimed = True
+            instance.waitlisted_at = None
+        else:
+            # Full: join the waitlist, keeping an earlier place in the queue
+            if old_status != RSVP.WAITLISTED or instance.waitlisted_at is None:
+                instance.waitlisted_at = timezone.now()
+            instance.status = RSVP.WAITLISTED
+    elif instance.status != RSVP.WAITLISTED:
+        instance.waitlisted_at = None
+
+
+@receiver(post_save, sender=RSVP)
+def update_rsvp_tallies(sender, instance, created, **kwargs):
+    old_status = None if created else instance._tally_status
+    tallies.rsvp_status_changed(
+        instance.event_id, old_status, instance.status,
+        seat_claimed=getattr(instance, '_seat_claimed', False),
+    )
+    instance._tally_status = instance.status
+    instance._seat_claimed = False
+    if old_status == RSVP.ATTENDING and instance.status != RSVP.ATTENDING:
+        seats.promote_waitlist(instance.event_id)
+
+
+@receiver(post_delete, sender=RSVP)
+def remove_rsvp_tally(sender, instance, origin=None, **kwargs):
+    # Counters of an event that is itself being deleted don't matter
+    origin_model = getattr(origin, 'model', type(origin))
+    if origin_model in (Event, Category) or deletion.purge_active():
+        return
+    tallies.rsvp_status_changed(instance.event_id, instance._tally_status, None)
+    if instance._tally_status == RSVP.ATTENDING:
+        seats.promote_waitlist(instance.event_id)
+
+
+@receiver(m2m_changed, sender=Participant.events.through)
+def update_participant_tallies(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        if reverse:
+            instance._cleared_event_ids = [instance.pk]
+            instance._cleared_participant_ids = list(instance.participants.values_list('pk', flat=True))
+        else:
+            instance._cleared_event_ids = list(instance.events.values_list('pk', flat=True))
+            instance._cleared_participant_ids = [instance.pk]
+    elif action == 'post_clear':
+        # Each cleared event lost every cleared participant, and vice versa
+        tallies.participants_changed(instance._cleared_event_ids, -len(instance._cleared_participant_ids))
+        tallies.participant_events_changed(instance._cleared_participant_ids, -len(instance._cleared_event_ids))
+    elif action in ('post_add', 'post_remove') and pk_set:
+        amount = 1 if action == 'post_add' else -1
+        if reverse:
+            tallies.participants_changed([instance.pk], amount * len(pk_set))
+            tallies.participant_events_changed(pk_set, amount)
+        else:
+            tallies.participants_changed(pk_set, amount)
+            tallies.participant_events_changed([instance.pk], amount * len(pk_set))
+
+
+@receiver(pre_delete, sender=Participant)
+def remove_participant_tallies(sender, instance, **kwargs):
+    tallies.participants_changed(instance.events.values_list('pk', flat=True), -1)
+
+
+@receiver(pre_delete, sender=Event)
+def remove_event_from_participants(sender, instance, **kwargs):
+    # The links go with the event, without m2m signals; purges have
+    # already removed them and counted that
+    tallies.participant_events_changed(instance.participants.values_list('pk', flat=True), -1)
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=EventSeries)
+@receiver(post_delete, sender=EventSeries)
+@receiver(post_save, sender=Participant)
+@receiver(post_delete, sender=Participant)
+@receiver(post_save, sender=RSVP)
+@receiver(post_delete, sender=RSVP)
+def touch_fragment_versions(sender, **kwargs):
+    touch_models(sender)
+
+
+@receiver(m2m_changed, sender=Participant.events.through)
+def touch_participant_events_version(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        touch_models(Participant)
+
+
+@receiver(post_init, sender=Event)
+def remember_event_category(sender, instance, **kwargs):
+    instance._feed_category_id = instance.__dict__.get('category_id')
+    instance._capacity = instance.__dict__.get('capacity')
+    instance._notify_values = notifications.snapshot(instance)
+
+
+@receiver(post_save, sender=Event)
+def promote_waitlist_on_capacity_change(sender, instance, created, **kwargs):
+    old_capacity, instance._capacity = instance._capacity, instance.capacity
+    if not created and instance.capacity != old_capacity:
+        seats.promote_waitlist(instance.pk)
+
+
+@receiver(post_save, sender=Event)
+def notify_event_changes(sender, instance, created, **kwargs):
+    changes = notifications.changed_fields(instance, instance._notify_values)
+    instance._notify_values = notifications.snapshot(instance)
+    if changes and not created:
+        notifications.notify_event_changed(instance, changes)
+
+
+@receiver(pre_delete, sender=Event)
+def notify_event_cancelled(sender, instance, **kwargs):
+    # Soft-deleted events are announced by their purge
+    if instance.deleted_at is None:
+        notifications.notify_event_cancelled(instance)
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+def touch_event_feeds(sender, instance, **kwargs):
+    category_ids = {instance._feed_category_id, instance.category_id} - {None}
+    touch('feed:events', *(f'feed:category:{pk}' for pk in category_ids))
+    instance._feed_category_id = instance.category_id
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def touch_category_feeds(sender, instance, **kwargs):
+    touch('feed:events', f'feed:category:{instance.pk}')
+
+
+@receiver(post_save, sender=EventSeries)
+@receiver(post_delete, sender=EventSeries)
+def touch_series_feeds(sender, instance, **kwargs):
+    touch('feed:events', f'feed:category:{instance.category_id}')
+
+
+@receiver(post_save, sender=RSVP)
+@receiver(post_delete, sender=RSVP)
+def touch_participant_feed(sender, instance, **kwargs):
+    touch(f'feed:participant:{instance.participant_id}')
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_group_cache(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        instance._cleared_user_ids = list(instance.user_set.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        if not reverse:
+            roles.invalidate_group_names([instance.pk])
+        elif action == 'post_clear':
+            roles.invalidate_group_names(instance._cleared_user_ids)
+        elif pk_set:
+            roles.invalidate_group_names(pk_set)
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def invalidate_group_members_cache(sender, instance, **kwargs):
+    roles.invalidate_group_names(instance.user_set.values_list('pk', flat=True))
+
+
+@receiver(connection_created)
+def configure_sqlite_connection(sender, connection, **kwargs):
+    sqlite.apply_pragmas(connection)
+    middleware.install_query_recorder(connection)
@@ -0,0 +1,72 @@
+import logging
+import random
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connection, connections, transaction
+
+
+logger = logging.getLogger('core.performance')
+
+LOCK_ERRORS = ('database is locked', 'database table is locked', 'database is busy')
+
+
+def apply_pragmas(connection):
+    """
+    Applies settings.SQLITE_PRAGMAS to a new SQLite connection. WAL lets
+    readers carry on while one writer commits; the rest trade a little
+    durability on power loss for much cheaper commits.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def is_lock_error(exc):
+    return isinstance(exc, OperationalError) and any(message in str(exc) for message in LOCK_ERRORS)
+
+
+@contextmanager
+def write_transaction(using=DEFAULT_DB_ALIAS):
+    """
+    transaction.atomic() that starts with BEGIN IMMEDIATE on SQLite, so the
+    write lock is waited for up front. A deferred transaction that reads
+    first can't wait for the lock when it later writes; SQLite fails it at
+    once instead. Read-only transactions keep the default, which doesn't
+    block other writers.
+    """
+    conn = connections[using]
+    if conn.vendor != 'sqlite' or conn.in_atomic_block:
+        with transaction.atomic(using=using):
+            yield
+        return
+    conn.ensure_connection()
+    mode, conn.transaction_mode = conn.transaction_mode, 'IMMEDIATE'
+    try:
+        with transaction.atomic(using=using):
+            yield
+    finally:
+        conn.transaction_mode = mode
+
+
+def retry_on_lock(func, attempts=5, base_delay=0.05):
+    """
+    Calls ``func`` and retries it with exponential backoff and jitter while
+    SQLite reports the database as locked. ``func`` must run its writes in
+    one transaction so a failed attempt leaves nothing behind. Inside an
+    outer transaction there is nothing safe to retry, so it runs once.
+    """
+    if connection.in_atomic_block:
+        return func()
+    for attempt in range(attempts):
+        try:
+            return func()
+        except OperationalError as exc:
+            if not is_lock_error(exc) or attempt == attempts - 1:
+                raise
+            delay = base_delay * 2 ** attempt * random.uniform(0.5, 1.5)
+            logger.warning(f'Database locked, retrying in {delay * 1000:.0f}ms (attempt {attempt + 1})')
+            time.sleep(delay)
@@ -0,0 +1,69 @@
+// Turns every <select data-autocomplete-url> into a type-to-search field.
+// The select only holds the chosen options; matches are fetched as JSON
+// from the autocomplete endpoint and added to it when picked.
+(function () {
+  function debounce(func, wait) {
+    var timer;
+    return function () {
+      var args = arguments;
+      clearTimeout(timer);
+      timer = setTimeout(function () { func.apply(null, args); }, wait);
+    };
+  }
+
+  function setup(select) {
+    var input = document.createElement('input');
+    input.type = 'search';
+    input.placeholder = 'Type to search…';
+    input.autocomplete = 'off';
+    input.className = 'border rounded px-2 py-1 w-full';
+    var list = document.createElement('ul');
+    list.className = 'border rounded bg-white shadow';
+    list.hidden = true;
+    select.parentNode.insertBefore(input, select);
+    select.parentNode.insertBefore(list, select);
+
+    function choose(result) {
+      var option = select.querySelector('option[value="' + result.id + '"]');
+      if (!option) {
+        option = new Option(result.text, result.id);
+        select.add(option);
+      }
+      option.selected = true;
+      select.dispatchEvent(new Event('change', {bubbles: true}));
+      input.value = '';
+      list.hidden = true;
+    }
+
+    var search = debounce(function (query) {
+      var url = select.dataset.autocompleteUrl + '?q=' + encodeURIComponent(query);
+      fetch(url, {credentials: 'same-origin'})
+        .then(function (response) { return response.json(); })
+        .then(function (data) {
+          if (input.value.trim() !== query) {
+            return;  // A newer search is on its way
+          }
+          list.innerHTML = '';
+          data.results.forEach(function (result) {
+            var item = document.createElement('li');
+            item.textContent = result.text;
+            item.className = 'px-2 py-1 cursor-pointer hover:bg-blue-100';
+            item.addEventListener('mousedown', function (event) {
+              event.preventDefault();
+              choose(result);
+            });
+            list.appendChild(item);
+          });
+          list.hidden = !data.results.length;
+        });
+    }, 200);
+
+    input.addEventListener('input', function () { search(input.value.trim()); });
+    input.addEventListener('focus', function () { search(input.value.trim()); });
+    input.addEventListener('blur', function () { list.hidden = true; });
+  }
+
+  document.addEventListener('DOMContentLoaded', function () {
+    document.querySelectorAll('select[data-autocomplete-url]').forEach(setup);
+  });
+})();
@@ -0,0 +1,253 @@
+import asyncio
+import heapq
+import time
+from datetime import date, timedelta
+from itertools import islice
+from operator import itemgetter
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .models import Event, Participant, day_range
+from .recurrence import RECURRENCE_HORIZON_DAYS, aload_series, count_occurrence_dates, expand, falls_on, load_series
+from .routers import primary_reads
+
+
+STATS_VERSION_KEY = 'dashboard_stats:version'
+STATS_TIMEOUT = 60 * 60 * 24
+
+# Rows each dashboard panel shows, and so the most any cached list holds
+DASHBOARD_PANEL_SIZE = 50
+
+
+def get_stats_version():
+    version = cache.get(STATS_VERSION_KEY)
+    if version is None:
+        # Seed from the clock so an evicted counter never reuses an old version
+        cache.add(STATS_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(STATS_VERSION_KEY)
+    return version
+
+
+def invalidate_dashboard_stats():
+    # A fresh value rather than incr(): the file cache's incr is a read and
+    # a write, so two workers bumping at once could both land on one value
+    cache.set(STATS_VERSION_KEY, time.time_ns(), None)
+
+
+async def aget_stats_version():
+    version = await cache.aget(STATS_VERSION_KEY)
+    if version is None:
+        await cache.aadd(STATS_VERSION_KEY, time.time_ns(), None)
+        version = await cache.aget(STATS_VERSION_KEY)
+    return version
+
+
+def _cache_key(name, today, version=None):
+    version = get_stats_version() if version is None else version
+    return f'dashboard_stats:{version}:{today.isoformat()}:{name}'
+
+
+def _event_counts(today):
+    day_start, day_end = day_range(today)
+    return {
+        'total_events': Count('id'),
+        'upcoming_events': Count('id', filter=Q(start_at__gte=day_end)),
+        'past_events': Count('id', filter=Q(start_at__lt=day_start)),
+        'today_count': Count('id', filter=Q(start_at__gte=day_start, start_at__lt=day_end)),
+    }
+
+
+def _occurrence_range(today):
+    # The panels list events in full, but open-ended series have to stop
+    # somewhere
+    horizon = timedelta(days=RECURRENCE_HORIZON_DAYS)
+    return today - horizon, today + timedelta(days=1) + horizon
+
+
+def _occurrence_rows(events):
+    # Occurrences look like the value rows they're merged into
+    return [
+        {
+            'id': None, 'name': event.name, 'description': event.description, 'time': event.time,
+            'date': event.date, 'category__name': event.category.name, 'participant_count': 0,
+            'start_at': event.start_at,
+        }
+        for event in events
+    ]
+
+
+def _summarize_occurrences(series_list, saved, today):
+    """
+    Builds only the occurrences each panel can show, and counts the ones
+    still to come from the recurrence rules, so the summary costs about
+    the same however many days the series cover.
+    """
+    start, end = _occurrence_range(today)
+    tomorrow = today + timedelta(days=1)
+
+    def panel(*window, reverse=False):
+        events = expand(series_list, saved, *window, reverse=reverse)
+        return _occurrence_rows(islice(events, DASHBOARD_PANEL_SIZE))
+
+    by_id = {series.pk: series for series in series_list}
+    scheduled = sum(count_occurrence_dates(series, today, end) for series in series_list)
+    # Saved occurrences are counted as the Events they now are
+    scheduled -= sum(1 for series_id, day in saved if day >= today and falls_on(by_id[series_id], day))
+    return {
+        'scheduled': scheduled,
+        'all': panel(start, end),
+        'today': panel(today, tomorrow),
+        'upcoming': panel(tomorrow, end),
+        'past': panel(start, today, reverse=True),
+    }
+
+
+def get_occurrence_summary(today):
+    """
+    Series occurrences within a year either side of ``today``: the rows
+    each panel merges in, and how many are still to come.
+    """
+    key = _cache_key('occurrences', today)
+    summary = cache.get(key)
+    if summary is None:
+        with primary_reads():
+            summary = _summarize_occurrences(*load_series(*_occurrence_range(today)), today)
+        cache.set(key, summary, STATS_TIMEOUT)
+    return summary
+
+
+def compute_dashboard_stats(today=None):
+    today = today or date.today()
+    stats = Event.objects.aggregate(**_event_counts(today))
+    stats['total_participants'] = Participant.objects.count()
+    # Projected occurrences aren't Events, so they're kept out of the totals
+    stats['scheduled_occurrences'] = get_occurrence_summary(today)['scheduled']
+    return stats
+
+
+async def acompute_dashboard_stats(today=None, version=None):
+    today = today or date.today()
+    stats, participants, summary = await asyncio.gather(
+        Event.objects.aaggregate(**_event_counts(today)),
+        Participant.objects.acount(),
+        aget_occurrence_summary(today, version),
+    )
+    stats['total_participants'] = participants
+    stats['scheduled_occurrences'] = summary['scheduled']
+    return stats
+
+
+def get_dashboard_stats(today=None):
+    """
+    Headline counters for the dashboard, cached until a Category, Event,
+    EventSeries or Participant changes or the day rolls over.
+    """
+    today = today or date.today()
+    key = _cache_key('counters', today)
+    stats = cache.get(key)
+    if stats is None:
+        with primary_reads():
+            stats = compute_dashboard_stats(today)
+        cache.set(key, stats, STATS_TIMEOUT)
+    return stats
+
+
+def _today_events(today):
+    day_start, day_end = day_range(today)
+    return (
+        Event.objects.filter(start_at__gte=day_start, start_at__lt=day_end)
+        .order_by('start_at')
+        .values('id', 'name', 'description', 'time', 'start_at')[:DASHBOARD_PANEL_SIZE]
+    )
+
+
+def _dashboard_events(filter_type, today):
+    day_start, day_end = day_range(today)
+    if filter_type == 'upcoming':
+        queryset = Event.objects.filter(start_at__gte=day_end).order_by('start_at')
+    elif filter_type == 'past':
+        queryset = Event.objects.filter(start_at__lt=day_start).order_by('-start_at')
+    else:
+        queryset = Event.objects.order_by('start_at')
+    values = queryset.values('id', 'name', 'date', 'category__name', 'participant_count', 'start_at')
+    return values[:DASHBOARD_PANEL_SIZE]
+
+
+def _with_occurrences(rows, summary, filter_type):
+    merged = heapq.merge(rows, summary[filter_type], key=itemgetter('start_at'), reverse=filter_type == 'past')
+    return list(islice(merged, DASHBOARD_PANEL_SIZE))
+
+
+def get_today_events(today=None):
+    today = today or date.today()
+    key = _cache_key('today', today)
+    events = cache.get(key)
+    if events is None:
+        with primary_reads():
+            events = _with_occurrences(_today_events(today), get_occurrence_summary(today), 'today')
+        cache.set(key, events, STATS_TIMEOUT)
+    return events
+
+
+def get_dashboard_events(filter_type, today=None):
+    today = today or date.today()
+    key = _cache_key(f'events:{filter_type}', today)
+    events = cache.get(key)
+    if events is None:
+        with primary_reads():
+            rows = _dashboard_events(filter_type, today)
+            events = _with_occurrences(rows, get_occurrence_summary(today), filter_type)
+        cache.set(key, events, STATS_TIMEOUT)
+    return events
+
+
+async def _alist(queryset):
+    return [row async for row in queryset.aiterator()]
+
+
+async def _acached(key, load):
+    value = await cache.aget(key)
+    if value is None:
+        with primary_reads():
+            value = await load()
+        await cache.aset(key, value, STATS_TIMEOUT)
+    return value
+
+
+async def aget_occurrence_summary(today, version=None):
+    version = version or await aget_stats_version()
+
+    async def load():
+        return _summarize_occurrences(*await aload_series(*_occurrence_range(today)), today)
+    return await _acached(_cache_key('occurrences', today, version), load)
+
+
+async def aget_dashboard_stats(today=None, version=None):
+    today = today or date.today()
+    version = version or await aget_stats_version()
+    return await _acached(_cache_key('counters', today, version), lambda: acompute_dashboard_stats(today, version))
+
+
+async def aget_today_events(today=None, version=None):
+    today = today or date.today()
+    version = version or await aget_stats_version()
+
+    async def load():
+        rows, summary = await asyncio.gather(
+            _alist(_today_events(today)), aget_occurrence_summary(today, version),
+        )
+        return _with_occurrences(rows, summary, 'today')
+    return await _acached(_cache_key('today', today, version), load)
+
+
+async def aget_dashboard_events(filter_type, today=None, version=None):
+    today = today or date.today()
+    version = version or await aget_stats_version()
+
+    async def load():
+        rows, summary = await asyncio.gather(
+            _alist(_dashboard_events(filter_type, today)), aget_occurrence_summary(today, version),
+        )
+        return _with_occurrences(rows, summary, filter_type)
+    return await _acached(_cache_key(f'events:{filter_type}', today, version), load)
@@ -0,0 +1,107 @@
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import Event, Participant, RSVP
+from .versions import touch_models
+
+
+STATUS_FIELDS = {
+    RSVP.ATTENDING: 'attending_count',
+    RSVP.MAYBE: 'maybe_count',
+    RSVP.NOT_ATTENDING: 'not_attending_count',
+}
+
+
+def _adjust(field, amount):
+    if amount >= 0:
+        return F(field) + amount
+    # Never let a drifted counter go negative; recount_rsvps repairs drift
+    return Greatest(F(field) + amount, 0)
+
+
+def apply_tally_changes(event_id, changes):
+    """
+    Applies ``{field: delta}`` to one event in a single UPDATE using F()
+    expressions, so concurrent RSVPs never overwrite each other's counts.
+    """
+    updates = {field: _adjust(field, amount) for field, amount in changes.items() if amount}
+    if updates:
+        Event.objects.filter(pk=event_id).update(**updates, updated_at=timezone.now())
+
+
+def rsvp_status_changed(event_id, old_status, new_status, seat_claimed=False):
+    """
+    ``seat_claimed`` means core.seats already counted the new attendee.
+    """
+    if old_status == new_status:
+        return
+    changes = {}
+    if old_status in STATUS_FIELDS:
+        changes[STATUS_FIELDS[old_status]] = -1
+    if new_status in STATUS_FIELDS and not seat_claimed:
+        changes[STATUS_FIELDS[new_status]] = changes.get(STATUS_FIELDS[new_status], 0) + 1
+    apply_tally_changes(event_id, changes)
+
+
+def participants_changed(event_ids, amount):
+    if event_ids and amount:
+        Event.objects.filter(pk__in=list(event_ids)).update(
+            participant_count=_adjust('participant_count', amount),
+            updated_at=timezone.now(),
+        )
+
+
+def participant_events_changed(participant_ids, amount):
+    if participant_ids and amount:
+        Participant.objects.filter(pk__in=list(participant_ids)).update(
+            event_count=_adjust('event_count', amount),
+            updated_at=timezone.now(),
+        )
+
+
+def participant_links_deleted(link_ids):
+    """
+    For purges, which delete participant-event links without the m2m
+    signals. A participant has at most one link to each event.
+    """
+    links = Participant.events.through.objects.filter(pk__in=link_ids).values_list('participant_id', flat=True)
+    participant_events_changed(links, -1)
+
+
+def _recount_in_batches(queryset, recount, batch_size):
+    queryset = queryset.order_by('pk')
+    updated = 0
+    last_pk = 0
+    while True:
+        pks = list(queryset.filter(pk__gt=last_pk).values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            break
+        updated += recount(queryset.model.objects.filter(pk__in=pks))
+        last_pk = pks[-1]
+    return updated
+
+
+def recount_tallies(batch_size=1000, event_ids=None):
+    """
+    Recomputes all counters from the RSVP and participant tables in
+    batches of ``batch_size`` events. Returns the number of events updated.
+    """
+    events = Event.objects.all()
+    if event_ids:
+        events = events.filter(pk__in=event_ids)
+    updated = _recount_in_batches(events, lambda batch: batch.recount_tallies(), batch_size)
+    if updated:
+        touch_models(Event)
+    return updated
+
+
+def recount_participant_events(batch_size=1000):
+    """
+    Recomputes every participant's event_count in batches of
+    ``batch_size``. Returns the number of participants updated.
+    """
+    updated = _recount_in_batches(Participant.objects.all(), lambda batch: batch.recount_events(), batch_size)
+    if updated:
+        touch_models(Participant)
+    return updated
@@ -1,3 +1,1233 @@
-from django.test import TestCase
+import io
+import json
+import re
+import tempfile
+import threading
+from datetime import date, time
+from smtplib import SMTPException
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.contrib.sessions.models import Session
+from django.core import mail, signing
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from . import (
+    async_views, benchmark, deletion, feeds, imports, jobs, notifications, recurrence, rsvps, search, stats, urls,
+    views,
+)
+from .decorators import QueryBudgetExceeded, replica_reads, write_view
+from .forms import ParticipantForm
+from .middleware import ReplicaRoutingMiddleware
+from .pagination import CURSOR_SALT, decode_cursor, encode_cursor
+from .models import Category, Event, EventNotification, EventSeries, Job, Participant, RSVP, event_start
+from .roles import ADMIN, ORGANIZER
+from .routers import ReplicaRouter
+from .sqlite import retry_on_lock, write_transaction
+from .tallies import recount_participant_events
+
+
+class EventTestMixin:
+    """
+    Fixtures shared by the test cases: an empty cache, a category, and
+    helpers for events, participants, logged-in users and the job queue.
+    """
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.category = Category.objects.create(name='Talks')
+
+    def make_event(self, name='Keynote', **fields):
+        fields = {
+            'description': 'A talk', 'date': date.today(), 'time': time(18), 'location': 'Hall A',
+            'category': self.category, **fields,
+        }
+        return Event.objects.create(name=name, **fields)
+
+    def make_participants(self, count):
+        return [
+            Participant.objects.create(name=f'Participant {i}', email=f'p{i}@example.com')
+            for i in range(count)
+        ]
+
+    def login_as(self, group_name):
+        username = group_name.lower()
+        user = get_user_model().objects.create_user(username, f'{username}@example.com', 'pw')
+        user.groups.add(Group.objects.get_or_create(name=group_name)[0])
+        self.client.force_login(user)
+        return user
+
+    def login_superuser(self):
+        user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.force_login(user)
+        return user
+
+    def run_jobs(self):
+        while any(jobs.run_due_jobs().values()):
+            pass
+
+
+class RoleTests(EventTestMixin, TestCase):
+    def test_demotion_takes_effect_on_the_next_request(self):
+        user = self.login_as(ORGANIZER)
+        group = Group.objects.get(name=ORGANIZER)
+        self.assertEqual(self.client.get('/events/create/').status_code, 200)
+        self.assertIn(ORGANIZER, cache.get(f'user_groups:{user.pk}'))
+
+        user.groups.remove(group)
+        self.assertIsNone(cache.get(f'user_groups:{user.pk}'))
+        self.assertEqual(self.client.get('/events/create/').status_code, 403)
+
+    def test_role_change_revalidates_pages(self):
+        event = self.make_event()
+        user = self.login_as(ADMIN)
+        response = self.client.get('/events/')
+        self.assertContains(response, f'/events/{event.pk}/edit/')
+        etag = response['ETag']
+        self.assertEqual(self.client.get('/events/', headers={'if-none-match': etag}).status_code, 304)
+
+        user.groups.clear()
+        response = self.client.get('/events/', headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, f'/events/{event.pk}/edit/')
+
+
+class InstrumentationTests(EventTestMixin, TestCase):
+    def test_going_over_the_budget_raises(self):
+        self.login_as(ORGANIZER)
+        with mock.patch.object(views.category_list, 'query_budget', 2):
+            with self.assertRaisesMessage(QueryBudgetExceeded, 'over its budget of 2 (/categories/)'):
+                self.client.get('/categories/')
+
+    def test_requests_are_logged_at_debug(self):
+        self.login_as(ORGANIZER)
+        with self.assertNoLogs('core.performance', 'INFO'):
+            self.client.get('/categories/')
+        with self.assertLogs('core.performance', 'DEBUG') as logs:
+            self.client.get('/categories/')
+        self.assertIn('"view": "core.views.category_list"', logs.output[0])
+
+    def test_streamed_bodies_are_measured_once_sent(self):
+        self.login_superuser()
+        self.make_event()
+        response = self.client.get('/events/', {'per_page': 200})
+        self.assertNotIn('Server-Timing', response)
+        with self.assertLogs('core.performance', 'DEBUG') as logs:
+            b''.join(response.streaming_content)
+        queried = json.loads(logs.records[0].getMessage())['queries']
+
+        cache.clear()
+        with mock.patch.object(views.event_list, 'query_budget', queried - 1):
+            response = self.client.get('/events/', {'per_page': 200})
+            with self.assertRaisesMessage(QueryBudgetExceeded, f'ran {queried} queries'):
+                b''.join(response.streaming_content)
+
+    def test_only_staff_see_server_timing(self):
+        self.login_as(ORGANIZER)
+        self.assertNotIn('Server-Timing', self.client.get('/categories/'))
+        with override_settings(DEBUG=True):
+            self.assertIn('Server-Timing', self.client.get('/categories/'))
+        self.login_superuser()
+        self.assertRegex(self.client.get('/categories/')['Server-Timing'], r'db;dur=[\d.]+;desc="\d+ queries"')
+
+
+class SQLiteTests(TransactionTestCase):
+    def capture_sql(self):
+        statements = []
+
+        def capture(execute, sql, params, many, context):
+            statements.append(sql)
+            return execute(sql, params, many, context)
+        return statements, connection.execute_wrapper(capture)
+
+    def test_connections_get_the_pragmas(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+    def test_only_writes_take_the_lock_up_front(self):
+        statements, wrapper = self.capture_sql()
+        with wrapper:
+            with transaction.atomic():
+                Category.objects.exists()
+            with write_transaction():
+                Category.objects.create(name='Talks')
+        self.assertEqual([sql for sql in statements if sql.startswith('BEGIN')], ['BEGIN', 'BEGIN IMMEDIATE'])
+
+    @mock.patch('core.sqlite.time.sleep')
+    def test_retry_on_lock(self, sleep):
+        calls = []
+
+        def flaky():
+            calls.append(connection.in_atomic_block)
+            if len(calls) < 3:
+                raise OperationalError('database is locked')
+            return 'done'
+        self.assertEqual(retry_on_lock(flaky), 'done')
+        self.assertEqual(sleep.call_count, 2)
+
+        with self.assertRaises(OperationalError):
+            retry_on_lock(mock.Mock(side_effect=OperationalError('no such table: x')))
+        self.assertEqual(sleep.call_count, 2)
+
+    @mock.patch('core.sqlite.time.sleep')
+    def test_write_view_retries_the_whole_view(self, sleep):
+        statements, wrapper = self.capture_sql()
+        attempts = []
+        failures = [OperationalError('database is locked')]
+
+        @write_view()
+        def view(request):
+            attempts.append(connection.in_atomic_block)
+            Category.objects.create(name=f'Attempt {len(attempts)}')
+            if failures:
+                raise failures.pop()
+            return 'ok'
+
+        factory = RequestFactory()
+        with wrapper:
+            self.assertEqual(view(factory.post('/')), 'ok')
+        self.assertEqual(attempts, [True, True])
+        self.assertEqual(list(Category.objects.values_list('name', flat=True)), ['Attempt 2'])
+        self.assertEqual(statements.count('BEGIN IMMEDIATE'), 2)
+
+        # Safe methods run outside a transaction
+        self.assertEqual(view(factory.get('/')), 'ok')
+        self.assertEqual(attempts[2:], [False])
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRoutingTests(TestCase):
+    def request(self, view, cookies=None):
+        """
+        Runs ``view`` through ReplicaRoutingMiddleware and returns the
+        response with the database the view's Event reads went to.
+        """
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            response = view(request)
+            response.read_from = router.db_for_read(Event) or 'default'
+            return response
+
+        router = ReplicaRouter()
+        middleware = ReplicaRoutingMiddleware(get_response)
+        request = RequestFactory().get('/')
+        request.COOKIES.update(cookies or {})
+        return middleware(request)
+
+    def test_reads_stay_on_the_primary_after_a_write(self):
+        @replica_reads
+        def read(request):
+            return HttpResponse()
+
+        def write(request):
+            ReplicaRouter().db_for_write(Event)
+            return HttpResponse()
+
+        response = self.request(read)
+        self.assertEqual(response.read_from, 'replica1')
+        self.assertNotIn('primary_until', response.cookies)
+
+        response = self.request(write)
+        self.assertEqual(response.read_from, 'default')
+        cookie = response.cookies['primary_until']
+        self.assertEqual(cookie['max-age'], settings.REPLICA_STICKY_SECONDS)
+
+        self.assertEqual(self.request(read, {'primary_until': cookie.value}).read_from, 'default')
+        self.assertEqual(self.request(read, {'primary_until': '1'}).read_from, 'replica1')
+        self.assertEqual(self.request(read, {'primary_until': 'soon'}).read_from, 'replica1')
+
+    def test_caches_are_filled_from_the_primary(self):
+        @replica_reads
+        def read(request):
+            response = HttpResponse()
+            response.stats = stats.get_dashboard_stats()
+            return response
+
+        cache.clear()
+        fill = lambda today: {'read_from': ReplicaRouter().db_for_read(Event)}
+        with mock.patch('core.stats.compute_dashboard_stats', side_effect=fill):
+            response = self.request(read)
+        self.assertEqual(response.read_from, 'replica1')
+        self.assertEqual(response.stats, {'read_from': None})
+
+    def test_sessions_and_users_always_come_from_the_primary(self):
+        @replica_reads
+        def read(request):
+            response = HttpResponse()
+            response.reads = [ReplicaRouter().db_for_read(model) for model in (Session, get_user_model())]
+            return response
+
+        self.assertEqual(self.request(read).reads, [None, None])
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_cookie_without_replicas(self):
+        def write(request):
+            ReplicaRouter().db_for_write(Event)
+            return HttpResponse()
+
+        self.assertNotIn('primary_until', self.request(write).cookies)
+
+
+class SeatAllocationTests(EventTestMixin, TransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.event = self.make_event(capacity=10)
+
+    def rsvp_concurrently(self, participants, status=RSVP.ATTENDING):
+        barrier = threading.Barrier(len(participants))
+        errors = []
+
+        def rsvp(participant):
+            try:
+                # Same steps as rsvp_create_or_update
+                rsvp = RSVP.objects.filter(event=self.event, participant=participant).first()
+                if rsvp is None:
+                    rsvp = RSVP(event=self.event, participant=participant)
+                rsvp.status = status
+                barrier.wait()
+                with write_transaction():
+                    rsvp.save()
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=rsvp, args=(participant,)) for participant in participants]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def assertSeats(self, attending, waitlisted):
+        self.event.refresh_from_db()
+        rsvps = RSVP.objects.filter(event=self.event)
+        self.assertEqual(rsvps.filter(status=RSVP.ATTENDING).count(), attending)
+        self.assertEqual(rsvps.filter(status=RSVP.WAITLISTED).count(), waitlisted)
+        self.assertEqual(self.event.attending_count, attending)
+
+    def test_concurrent_rsvps_never_oversell(self):
+        participants = self.make_participants(60)
+        self.rsvp_concurrently(participants)
+        self.assertSeats(attending=10, waitlisted=50)
+
+        # Half the attendees cancel while the waitlist asks again
+        attending = list(RSVP.objects.filter(event=self.event, status=RSVP.ATTENDING).select_related('participant'))
+        waiting = list(RSVP.objects.filter(event=self.event, status=RSVP.WAITLISTED).select_related('participant'))
+        self.rsvp_concurrently([rsvp.participant for rsvp in attending[:5]], status=RSVP.NOT_ATTENDING)
+        self.rsvp_concurrently([rsvp.participant for rsvp in waiting[:20]])
+        self.assertSeats(attending=10, waitlisted=45)
+
+    def test_waitlist_is_promoted_in_order(self):
+        self.event.capacity = 1
+        self.event.save()
+        first, second, third = self.make_participants(3)
+        seat = RSVP.objects.create(event=self.event, participant=first, status=RSVP.ATTENDING)
+        RSVP.objects.create(event=self.event, participant=second, status=RSVP.ATTENDING)
+        RSVP.objects.create(event=self.event, participant=third, status=RSVP.ATTENDING)
+        self.assertSeats(attending=1, waitlisted=2)
+
+        seat.status = RSVP.NOT_ATTENDING
+        seat.save()
+        self.assertEqual(RSVP.objects.get(participant=second).status, RSVP.ATTENDING)
+        self.assertEqual(RSVP.objects.get(participant=third).status, RSVP.WAITLISTED)
+
+        self.event.capacity = 2
+        self.event.save()
+        self.assertSeats(attending=2, waitlisted=0)
+
+
+class JobQueueTests(EventTestMixin, TestCase):
+    def test_signup_queues_activation_email(self):
+        response = self.client.post('/signup/', {
+            'username': 'newcomer', 'email': 'newcomer@example.com',
+            'first_name': 'New', 'last_name': 'Comer',
+            'password1': 'a-long-passphrase', 'password2': 'a-long-passphrase',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(Job.objects.filter(kind='email').count(), 1)
+
+        self.assertEqual(jobs.run_due_jobs(), {'done': 1, 'retried': 0, 'failed': 0})
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['newcomer@example.com'])
+
+        link = re.search(r'http://[^/]+(/activate/\S+)', mail.outbox[0].body).group(1)
+        self.client.get(link)
+        self.assertTrue(get_user_model().objects.get(username='newcomer').is_active)
+
+    def test_enqueue_is_idempotent(self):
+        first = jobs.queue_email('Hi', 'Body', ['a@example.com'], key='greeting:1')
+        second = jobs.queue_email('Hi', 'Body', ['a@example.com'], key='greeting:1')
+        self.assertEqual(first.pk, second.pk)
+        jobs.run_due_jobs()
+        jobs.queue_email('Hi', 'Body', ['a@example.com'], key='greeting:1')
+        jobs.run_due_jobs()
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_batch_shares_one_connection(self):
+        for index in range(3):
+            jobs.queue_email('Hi', 'Body', [f'{index}@example.com'])
+        with mock.patch('core.jobs.get_connection', wraps=jobs.get_connection) as get_connection:
+            self.assertEqual(jobs.run_due_jobs()['done'], 3)
+        self.assertEqual(get_connection.call_count, 1)
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_failed_jobs_back_off_then_fail(self):
+        job = jobs.enqueue('email', {'subject': 'Hi', 'body': 'Body', 'to': ['a@example.com']}, max_attempts=2)
+        with mock.patch('core.jobs.EmailMessage.send', side_effect=SMTPException('unavailable')):
+            self.assertEqual(jobs.run_due_jobs()['retried'], 1)
+            job.refresh_from_db()
+            self.assertEqual(job.status, Job.QUEUED)
+            self.assertGreater(job.run_after, timezone.now())
+            # Not due again until the backoff has passed
+            self.assertEqual(jobs.run_due_jobs()['retried'], 0)
+
+            Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+            self.assertEqual(jobs.run_due_jobs()['failed'], 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIn('unavailable', job.last_error)
+
+
+class EventNotificationTests(EventTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.event = self.make_event()
+        statuses = [RSVP.ATTENDING, RSVP.MAYBE, RSVP.NOT_ATTENDING, RSVP.ATTENDING, RSVP.MAYBE]
+        for participant, status in zip(self.make_participants(len(statuses)), statuses):
+            RSVP.objects.create(event=self.event, participant=participant, status=status)
+
+    def event_form(self, **changes):
+        return {
+            'name': self.event.name, 'description': self.event.description, 'date': self.event.date,
+            'time': '18:00', 'location': self.event.location, 'category': self.category.pk, 'capacity': '',
+            **changes,
+        }
+
+    def test_edit_view_notifies_attendees(self):
+        self.event.created_by = self.login_as(ORGANIZER)
+        self.event.save()
+        response = self.client.post(f'/events/{self.event.pk}/edit/', self.event_form(location='Hall B'))
+        self.assertRedirects(response, '/events/', fetch_redirect_response=False)
+
+        self.run_jobs()
+        self.assertEqual(EventNotification.objects.get().changes, {'location': ['Hall A', 'Hall B']})
+        self.assertEqual(len(mail.outbox), 4)
+
+    def test_organizers_only_manage_their_own_events(self):
+        self.login_as(ORGANIZER)
+        self.assertEqual(self.client.get(f'/events/{self.event.pk}/edit/').status_code, 403)
+        response = self.client.post(f'/events/{self.event.pk}/edit/', self.event_form(location='Hall B'))
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.client.post(f'/events/{self.event.pk}/delete/').status_code, 403)
+        self.assertTrue(Event.objects.filter(location='Hall A').exists())
+
+        # Their event list only shows their own events
+        mine = self.make_event('Workshop', created_by=get_user_model().objects.get(username='organizer'))
+        response = self.client.get('/events/')
+        self.assertContains(response, f'/events/{mine.pk}/edit/')
+        self.assertNotContains(response, 'Keynote')
+
+    def test_unrelated_edits_notify_nobody(self):
+        self.event.description = 'Now with slides'
+        self.event.save()
+        self.assertFalse(EventNotification.objects.exists())
+
+    @mock.patch('core.notifications.CHUNK_SIZE', 2)
+    def test_changes_fan_out_in_chunks(self):
+        self.event.location = 'Hall B'
+        self.event.save()
+        # Saving only records the notice; nothing is sent yet
+        self.assertEqual(Job.objects.filter(kind='email').count(), 0)
+
+        self.run_jobs()
+        notification = EventNotification.objects.get()
+        self.assertEqual(notification.changes, {'location': ['Hall A', 'Hall B']})
+        self.assertEqual((notification.status, notification.total, notification.queued), ('done', 4, 4))
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), [
+            'p0@example.com', 'p1@example.com', 'p3@example.com', 'p4@example.com',
+        ])
+        self.assertIn('Location: Hall B (was Hall A)', mail.outbox[0].body)
+
+        # Running the fan-out again queues nobody twice
+        notification.status = EventNotification.RUNNING
+        notification.cursor = 0
+        notification.save()
+        notifications.fan_out(notification)
+        self.run_jobs()
+        self.assertEqual(len(mail.outbox), 4)
+
+    def test_deleting_an_event_sends_cancellations(self):
+        self.event.delete()
+        self.run_jobs()
+        notification = EventNotification.objects.get()
+        self.assertEqual((notification.kind, notification.queued), (EventNotification.CANCELLED, 4))
+        self.assertEqual(len(mail.outbox), 4)
+        self.assertTrue(all(message.subject == 'Cancelled: Keynote' for message in mail.outbox))
+
+
+class SoftDeleteTests(EventTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.events = [self.make_event(f'Talk {index}', capacity=2) for index in range(3)]
+        for participant in self.make_participants(4):
+            participant.events.add(*self.events)
+            for event in self.events:
+                RSVP.objects.create(event=event, participant=participant, status=RSVP.ATTENDING)
+
+    @mock.patch('core.deletion.PURGE_BATCH_SIZE', 2)
+    def test_category_is_hidden_then_purged(self):
+        deletion.soft_delete_category(self.category)
+        self.assertFalse(Category.objects.exists())
+        self.assertFalse(Event.objects.exists())
+        self.assertEqual(Event.all_objects.count(), 3)
+        self.assertEqual(RSVP.objects.count(), 12)
+
+        self.run_jobs()
+        self.assertFalse(Category.all_objects.exists())
+        self.assertFalse(Event.all_objects.exists())
+        self.assertFalse(RSVP.objects.exists())
+        self.assertFalse(Participant.events.through.objects.exists())
+        # Each event's two attendees hear about it once
+        self.assertEqual(EventNotification.objects.filter(kind=EventNotification.CANCELLED).count(), 3)
+        self.assertEqual(len(mail.outbox), 6)
+
+    def test_delete_view_hides_then_purges(self):
+        self.login_as(ADMIN)
+        self.assertContains(self.client.get(f'/events/{self.events[0].pk}/delete/'), 'Talk 0')
+        response = self.client.post(f'/events/{self.events[0].pk}/delete/')
+        self.assertRedirects(response, '/events/', fetch_redirect_response=False)
+        self.assertNotContains(self.client.get('/events/'), 'Talk 0')
+        self.assertEqual(RSVP.objects.count(), 12)
+
+        self.run_jobs()
+        self.assertFalse(Event.all_objects.filter(pk=self.events[0].pk).exists())
+        self.assertEqual(RSVP.objects.count(), 8)
+        self.assertEqual(sorted(message.subject for message in mail.outbox), ['Cancelled: Talk 0'] * 2)
+
+    def test_deleted_event_stays_out_of_lists(self):
+        deletion.soft_delete_event(self.events[0])
+        self.assertEqual(list(self.category.events.order_by('pk')), self.events[1:])
+        self.assertEqual(Event.objects.count(), 2)
+        self.run_jobs()
+        self.assertEqual(Event.all_objects.count(), 2)
+        self.assertEqual(RSVP.objects.count(), 8)
+
+
+class TallyTests(EventTestMixin, TestCase):
+    def tallies(self, event):
+        event.refresh_from_db()
+        return event.attending_count, event.maybe_count, event.not_attending_count, event.participant_count
+
+    def test_rsvps_move_the_counters(self):
+        event = self.make_event()
+        first, second = self.make_participants(2)
+        rsvp = RSVP.objects.create(event=event, participant=first, status=RSVP.ATTENDING)
+        RSVP.objects.create(event=event, participant=second, status=RSVP.MAYBE)
+        first.events.add(event)
+        self.assertEqual(self.tallies(event), (1, 1, 0, 1))
+
+        rsvp.status = RSVP.NOT_ATTENDING
+        rsvp.save()
+        self.assertEqual(self.tallies(event), (0, 1, 1, 1))
+        rsvp.delete()
+        self.assertEqual(self.tallies(event), (0, 1, 0, 1))
+
+    def test_stale_instances_do_not_overwrite_counts(self):
+        event = self.make_event()
+        stale = Event.objects.get(pk=event.pk)
+        for participant in self.make_participants(2):
+            RSVP.objects.create(event=event, participant=participant, status=RSVP.ATTENDING)
+        # An UPDATE of F() expressions, not a write of the loaded value
+        RSVP.objects.create(event=stale, participant=self.make_participants(1)[0], status=RSVP.MAYBE)
+        self.assertEqual(self.tallies(event), (2, 1, 0, 0))
+
+    def test_recount_repairs_drift(self):
+        event = self.make_event()
+        for participant in self.make_participants(3):
+            RSVP.objects.create(event=event, participant=participant, status=RSVP.ATTENDING)
+            participant.events.add(event)
+        Event.objects.update(attending_count=0, maybe_count=4, participant_count=9)
+        # Decrements stop at zero rather than going negative
+        RSVP.objects.filter(event=event).first().delete()
+        self.assertEqual(self.tallies(event), (0, 4, 0, 9))
+
+        output = io.StringIO()
+        call_command('recount_rsvps', stdout=output)
+        self.assertIn('Recounted tallies for 1 events.', output.getvalue())
+        self.assertEqual(self.tallies(event), (2, 0, 0, 3))
+
+
+class BulkRSVPTests(EventTestMixin, TestCase):
+    def post(self, rows):
+        return self.client.post('/rsvps/bulk/', {'rsvps': rows}, content_type='application/json')
+
+    def test_rows_are_upserted_in_order(self):
+        event = self.make_event(created_by=self.login_as('Organizer'))
+        first, second, third = self.make_participants(3)
+        RSVP.objects.create(event=event, participant=first, status=RSVP.MAYBE)
+        response = self.post([
+            {'participant': first.pk, 'event': event.pk, 'status': RSVP.ATTENDING},
+            {'participant': second.pk, 'event': event.pk, 'status': RSVP.MAYBE},
+            {'participant': second.pk, 'event': event.pk, 'status': RSVP.ATTENDING, 'comment': 'Changed my mind'},
+            {'participant': third.pk, 'event': event.pk, 'status': 'sometimes'},
+            {'participant': third.pk, 'event': 0},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            'summary': {'updated': 1, 'superseded': 1, 'created': 1, 'error': 2},
+            'results': [
+                {'status': 'updated', 'previous': RSVP.MAYBE},
+                {'status': 'superseded'},
+                {'status': 'created'},
+                {'status': 'error', 'error': "invalid status 'sometimes'"},
+                {'status': 'error', 'error': 'unknown participant or event'},
+            ],
+        })
+        self.assertEqual(RSVP.objects.get(participant=second).comment, 'Changed my mind')
+        event.refresh_from_db()
+        self.assertEqual((event.attending_count, event.maybe_count), (2, 0))
+
+        response = self.post([{'participant': first.pk, 'event': event.pk, 'status': RSVP.ATTENDING}])
+        self.assertEqual(response.json()['results'], [{'status': 'unchanged'}])
+
+    def test_full_events_waitlist_the_rest(self):
+        event = self.make_event(capacity=1, created_by=self.login_as('Organizer'))
+        first, second = self.make_participants(2)
+        response = self.post([
+            {'participant': first.pk, 'event': event.pk},
+            {'participant': second.pk, 'event': event.pk},
+        ])
+        self.assertEqual(response.json()['results'], [
+            {'status': 'created'}, {'status': 'created', 'waitlisted': True},
+        ])
+        event.refresh_from_db()
+        self.assertEqual(event.attending_count, 1)
+
+    def test_organizers_only_answer_for_their_own_events(self):
+        self.login_as('Organizer')
+        colleague = get_user_model().objects.create_user('colleague', 'colleague@example.com', 'pw')
+        theirs = self.make_event(created_by=colleague)
+        participant, = self.make_participants(1)
+        response = self.post([{'participant': participant.pk, 'event': theirs.pk}])
+        self.assertEqual(response.json()['results'], [{'status': 'error', 'error': 'not one of your events'}])
+        self.assertFalse(RSVP.objects.exists())
+
+        self.login_superuser()
+        response = self.post([{'participant': participant.pk, 'event': theirs.pk}])
+        self.assertEqual(response.json()['results'], [{'status': 'created'}])
+
+    def test_rejects_other_bodies_and_roles(self):
+        self.login_as('Organizer')
+        response = self.client.post('/rsvps/bulk/', 'not json', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.post({'participant': 1}).status_code, 400)
+
+        self.login_as('Participant')
+        self.assertEqual(self.post([]).status_code, 403)
+
+
+class ExportTests(EventTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.event = self.make_event(date=date(2026, 3, 1))
+        self.other = self.make_event('Workshop', date=date(2026, 4, 1))
+        self.participant, = self.make_participants(1)
+        self.participant.events.add(self.event, self.other)
+        RSVP.objects.create(event=self.event, participant=self.participant, status=RSVP.ATTENDING, comment='See you')
+
+    def export(self, path):
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_is_streamed_with_a_header(self):
+        self.login_as('Organizer')
+        self.assertEqual(self.export('/exports/events.csv').splitlines(), [
+            'id,name,category,date,time,location,attending,maybe,not_attending,participants',
+            f'{self.event.pk},Keynote,Talks,2026-03-01,18:00:00,Hall A,1,0,0,1',
+            f'{self.other.pk},Workshop,Talks,2026-04-01,18:00:00,Hall A,0,0,0,1',
+        ])
+        self.assertEqual(self.export('/exports/participants.csv?end_date=2026-03-31').splitlines(), [
+            'id,name,email,phone,events',
+            f'{self.participant.pk},Participant 0,p0@example.com,,Keynote; Workshop',
+        ])
+
+    def test_jsonl_has_one_object_per_row(self):
+        self.login_as('Admin')
+        lines = self.export(f'/exports/rsvps.jsonl?event={self.event.pk}').splitlines()
+        self.assertEqual(len(lines), 1)
+        row = json.loads(lines[0])
+        self.assertEqual(
+            {key: row[key] for key in ('participant', 'email', 'event', 'status', 'comment')},
+            {'participant': 'Participant 0', 'email': 'p0@example.com', 'event': 'Keynote',
+             'status': RSVP.ATTENDING, 'comment': 'See you'},
+        )
+        self.assertEqual(self.export(f'/exports/events.jsonl?category={self.category.pk + 1}'), '')
+
+    def test_unknown_exports_and_other_roles_are_refused(self):
+        self.login_as('Organizer')
+        self.assertEqual(self.client.get('/exports/secrets.csv').status_code, 404)
+        self.assertEqual(self.client.get('/exports/events.xml').status_code, 404)
+        self.login_as('Participant')
+        self.assertEqual(self.client.get('/exports/events.csv').status_code, 403)
+
+
+class FeedTests(EventTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.event = self.make_event()
+        self.participant, = self.make_participants(1)
+        self.user = get_user_model().objects.create_user('reader', 'reader@example.com', 'pw')
+        self.token = feeds.make_feed_token(self.user, self.participant)
+
+    def test_unchanged_feeds_answer_not_modified(self):
+        response = self.client.get(f'/feeds/{self.token}/events.ics')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('SUMMARY:Keynote\r\n', b''.join(response.streaming_content).decode())
+        etag = response['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(f'/feeds/{self.token}/events.ics', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        with mock.patch('core.versions.time.time', return_value=2_000_000_000):
+            self.event.name = 'Closing keynote'
+            self.event.save()
+        response = self.client.get(f'/feeds/{self.token}/events.ics', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_participant_feed_lists_attended_events(self):
+        self.make_event('Workshop')
+        RSVP.objects.create(event=self.event, participant=self.participant, status=RSVP.ATTENDING)
+        response = self.client.get(f'/feeds/{self.token}/mine.ics')
+        body = b''.join(response.streaming_content).decode()
+        self.assertIn('SUMMARY:Keynote', body)
+        self.assertNotIn('SUMMARY:Workshop', body)
+
+    def test_bad_tokens_are_not_found(self):
+        other_salt = signing.dumps({'u': self.user.pk, 'p': self.participant.pk}, compress=True)
+        for token in ('not-a-token', other_salt, self.token[:-1]):
+            self.assertEqual(self.client.get(f'/feeds/{token}/events.ics').status_code, 404)
+        token = feeds.make_feed_token(self.user)
+        self.assertEqual(self.client.get(f'/feeds/{token}/mine.ics').status_code, 404)
+
+
+class ParticipantDirectoryTests(EventTestMixin, TestCase):
+    def event_counts(self):
+        return list(Participant.objects.order_by('pk').values_list('event_count', flat=True))
+
+    def test_event_counts_follow_the_links(self):
+        events = [self.make_event(f'Talk {index}') for index in range(3)]
+        first, second, third = self.make_participants(3)
+        first.events.add(*events)
+        events[0].participants.add(second, third)
+        self.assertEqual(self.event_counts(), [3, 1, 1])
+
+        first.events.remove(events[1])
+        events[0].participants.remove(third)
+        self.assertEqual(self.event_counts(), [2, 1, 0])
+
+        events[0].participants.clear()
+        self.assertEqual(self.event_counts(), [1, 0, 0])
+        third.events.add(events[2])
+        events[2].delete()
+        self.assertEqual(self.event_counts(), [0, 0, 0])
+
+        first.events.add(events[1])
+        second.events.add(events[1])
+        deletion.soft_delete_event(events[1])
+        self.run_jobs()
+        self.assertEqual(self.event_counts(), [0, 0, 0])
+
+        Participant.objects.update(event_count=5)
+        first.events.add(events[0])
+        recount_participant_events()
+        self.assertEqual(self.event_counts(), [1, 0, 0])
+
+    def test_sorts_by_event_count(self):
+        events = [self.make_event(f'Talk {index}') for index in range(2)]
+        quiet, busy, regular = self.make_participants(3)
+        busy.events.add(*events)
+        regular.events.add(events[0])
+        self.login_as(ADMIN)  # whose own participant profile has no name
+        response = self.client.get('/participants/', {'sort': '-events'})
+        self.assertEqual(
+            [participant.name for participant in response.context['participants']],
+            ['Participant 1', 'Participant 2', '', 'Participant 0'],
+        )
+
+
+class AutocompleteTests(EventTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.events = [self.make_event(name) for name in ['Keynote', 'keyboard workshop', 'Closing panel']]
+        self.login_superuser()
+
+    def test_prefix_matches_ignore_case(self):
+        response = self.client.get('/autocomplete/events/', {'q': 'KEY', 'limit': 1})
+        self.assertEqual(response.json(), {'results': [{'id': self.events[1].pk, 'text': 'keyboard workshop'}], 'more': True})
+
+    def test_form_renders_only_chosen_options(self):
+        participant = Participant.objects.create(name='Ada', email='ada@example.com')
+        participant.events.add(self.events[2])
+        html = str(ParticipantForm(instance=participant)['events'])
+        self.assertIn('Closing panel', html)
+        self.assertNotIn('Keynote', html)
+        self.assertIn('data-autocomplete-url="/autocomplete/events/"', html)
+
+
+class StartAtTests(EventTestMixin, TestCase):
+    def assertStartsAt(self, event, day, at):
+        self.assertEqual(Event.all_objects.get(pk=event.pk).start_at, event_start(day, at))
+
+    def test_queryset_update_moves_start_at(self):
+        event = self.make_event(date=date(2026, 3, 2))
+        Event.objects.filter(date=date(2026, 3, 2)).update(date=date(2026, 4, 1))
+        self.assertStartsAt(event, date(2026, 4, 1), time(18))
+        Event.objects.filter(pk=event.pk).update(time=time(9, 30))
+        self.assertStartsAt(event, date(2026, 4, 1), time(9, 30))
+
+    def test_bulk_create_and_update_set_start_at(self):
+        [event] = Event.objects.bulk_create([Event(
+            name='Bulk', description='', date=date(2026, 5, 1), time=time(10), location='Hall A',
+            category=self.category,
+        )])
+        self.assertStartsAt(event, date(2026, 5, 1), time(10))
+        event.time = time(11)
+        Event.objects.bulk_update([event], ['time'])
+        self.assertStartsAt(event, date(2026, 5, 1), time(11))
+
+    def test_cursors_from_an_older_version_are_ignored(self):
+        filters = {'category': ''}
+        position = ['2026-05-01T10:00:00+00:00', 1]
+        self.assertEqual(decode_cursor(encode_cursor(position, filters), filters), position)
+        old = signing.dumps({'p': ['2026-05-01', '10:00:00', 1], 'f': filters}, salt=CURSOR_SALT, compress=True)
+        self.assertIsNone(decode_cursor(old, filters))
+
+
+class EventListTests(EventTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.login_superuser()
+        for day in range(1, 6):
+            self.make_event(f'Talk {day}', date=date(2026, 3, day))
+
+    def names(self, **params):
+        response = self.client.get('/events/', params)
+        return [event.name for event in response.context['events']], response.context['page']
+
+    def test_cursors_hold_their_place_when_events_are_added(self):
+        names, first = self.names(per_page=2)
+        self.assertEqual(names, ['Talk 1', 'Talk 2'])
+
+        self.make_event('Early bird', date=date(2026, 2, 1))
+        self.make_event('Evening talk', date=date(2026, 3, 3), time=time(19))
+        names, second = self.names(per_page=2, after=first.next_cursor)
+        self.assertEqual(names, ['Talk 3', 'Evening talk'])
+        names, _ = self.names(per_page=2, before=second.previous_cursor)
+        self.assertEqual(names, ['Talk 1', 'Talk 2'])
+
+    def test_query_count_does_not_grow_with_the_page(self):
+        for participant in self.make_participants(3):
+            participant.events.add(*Event.objects.all())
+        self.client.get('/events/', {'per_page': 3})
+        counts = []
+        for per_page in (1, 5):
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get('/events/', {'per_page': per_page})
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_large_pages_are_streamed(self):
+        response = self.client.get('/events/', {'per_page': 200})
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode()
+        self.assertEqual(re.findall(r'Talk \d', content), [f'Talk {day}' for day in range(1, 6)])
+
+
+@override_settings(ROOT_URLCONF='event_system.asgi_urls')
+class AsyncViewTests(EventTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.make_event('Keynote on caching')
+        self.user = self.login_as('Admin')
+
+    async def test_read_pages_are_served_by_the_async_views(self):
+        await self.async_client.aforce_login(self.user)
+        pages = {
+            '/': async_views.dashboard_view,
+            '/categories/': async_views.category_list,
+            '/events/': async_views.event_list,
+            '/events/search/?q=cach': async_views.search_events,
+            '/profile/': async_views.profile_view,
+        }
+        for path, view in pages.items():
+            with self.subTest(path=path):
+                response = await self.async_client.get(path)
+                self.assertEqual(response.status_code, 200)
+                self.assertIs(response.resolver_match.func, view)
+        response = await self.async_client.get('/events/search/?q=cach')
+        self.assertContains(response, 'Keynote on caching')
+
+    async def test_unchanged_pages_answer_not_modified(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get('/events/')
+        self.assertContains(response, 'Keynote on caching')
+        response = await self.async_client.get('/events/', headers={'if-none-match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    async def test_anonymous_users_are_sent_to_log_in(self):
+        response = await self.async_client.get('/events/')
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('/login/', response['Location'])
+
+
+class SearchTests(EventTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.basics = self.make_event('Python basics', description='An introduction')
+        self.workshop = self.make_event('Workshop', description='Python and python tooling', time=time(10))
+
+    def names(self, query, **kwargs):
+        events, has_more = search.search_events(query, **kwargs)
+        return [event.name for event in events], has_more
+
+    def test_name_matches_rank_first(self):
+        self.assertEqual(self.names('python'), (['Python basics', 'Workshop'], False))
+
+    def test_words_match_as_prefixes(self):
+        self.assertEqual(self.names('PYTH intro'), (['Python basics'], False))
+
+    def test_operators_are_plain_words(self):
+        self.assertEqual(search.build_match_query('name:py* OR (NEAR "x'), '"name"* "py"* "OR"* "NEAR"* "x"*')
+        self.assertEqual(self.names('python) OR ('), ([], False))
+
+    def test_snippets_escape_html(self):
+        self.make_event('Web', description='<script>alert(1)</script> django')
+        [event], _ = search.search_events('django')
+        self.assertEqual(event.snippet, '&lt;script&gt;alert(1)&lt;/script&gt; <mark>django</mark>')
+
+    def test_queries_without_words_match_substrings(self):
+        self.make_event('Q&A', time=time(9))
+        self.assertEqual(self.names(''), (['Q&A', 'Workshop', 'Python basics'], False))
+        self.assertEqual(self.names('&'), (['Q&A'], False))
+
+    def test_deleted_events_leave_no_gaps(self):
+        third = self.make_event('Python advanced', time=time(11))
+        deletion.soft_delete_event(third)
+        self.assertEqual(self.names('python', limit=2), (['Python basics', 'Workshop'], False))
+        self.assertEqual(self.names('python', limit=1), (['Python basics'], True))
+
+    def test_soft_deleted_events_stop_matching(self):
+        deletion.soft_delete_event(self.basics)
+        # Saving a hidden event must not put it back in the index
+        Event.all_objects.get(pk=self.basics.pk).save()
+        self.assertEqual(self.names('basics'), ([], False))
+
+        deletion.soft_delete_category(self.category)
+        self.assertEqual(self.names('python'), ([], False))
+
+
+class ImportTests(TestCase):
+    def test_shared_passwords_are_hashed_once(self):
+        rows = [{'email': f'guest{i}@example.com', 'password': 'letmein'} for i in range(3)]
+        rows += [{'email': 'guest3@example.com'}, {'email': 'GUEST0@example.com'}, {'email': 'nobody'}]
+        with mock.patch('core.imports.make_password', wraps=imports.make_password) as make_password:
+            result = imports.import_participants(rows)
+        self.assertEqual((result.created, result.skipped, result.invalid), (4, 1, 1))
+        self.assertEqual(make_password.call_count, 2)
+
+        users = get_user_model().objects.order_by('email')
+        self.assertEqual([user.check_password('letmein') for user in users], [True, True, True, False])
+        self.assertFalse(users[3].has_usable_password())
+        self.assertEqual(Participant.objects.filter(user__groups__name='Participant').count(), 4)
+
+    def test_existing_emails_and_usernames_are_respected(self):
+        User = get_user_model()
+        User.objects.create_user('ann', 'Ann@Example.com')
+        User.objects.create_user('ann-2', 'ann.two@example.com')
+        result = imports.import_participants([
+            {'email': 'ann@example.com'},
+            {'email': 'another.ann@example.com', 'username': 'ann'},
+        ])
+        self.assertEqual((result.created, result.skipped), (1, 1))
+        self.assertEqual(User.objects.get(email='another.ann@example.com').username, 'ann-3')
+
+    def test_unreadable_lines_are_reported(self):
+        for line, error in [
+            ('{"email": "b@example.com"', 'Line 3: invalid JSON'),
+            ('["b@example.com"]', 'Line 3: expected a JSON object'),
+        ]:
+            stream = io.StringIO('{"email": "a@example.com"}\n\n' + line + '\n')
+            with self.assertRaisesMessage(ValueError, error):
+                list(imports.read_rows(stream, 'jsonl'))
+
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl') as upload:
+            upload.write('{"email": "a@example.com"}\nnot json\n')
+            upload.flush()
+            with self.assertRaisesMessage(CommandError, 'Line 2: invalid JSON'):
+                call_command('import_participants', upload.name, chunk_size=1, stdout=io.StringIO())
+        self.assertEqual(Participant.objects.get().email, 'a@example.com')
+
+
+class AdminTests(EventTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.open_event = self.make_event()
+        self.full_event = self.make_event('Workshop', time=time(10), capacity=1)
+        for participant in self.make_participants(3):
+            RSVP.objects.create(participant=participant, event=self.open_event, status=RSVP.MAYBE)
+            RSVP.objects.create(participant=participant, event=self.full_event, status=RSVP.MAYBE)
+        self.login_superuser()
+
+    def test_bulk_status_change_keeps_tallies_and_seats(self):
+        updated, skipped = rsvps.set_status(RSVP.objects.all(), RSVP.ATTENDING)
+        self.assertEqual((updated, skipped), (3, 3))
+        self.open_event.refresh_from_db()
+        self.full_event.refresh_from_db()
+        self.assertEqual((self.open_event.attending_count, self.open_event.maybe_count), (3, 0))
+        self.assertEqual((self.full_event.attending_count, self.full_event.maybe_count), (0, 3))
+
+    def test_changelist_and_csv_export(self):
+        with self.assertNumQueries(5):
+            response = self.client.get('/admin/core/rsvp/')
+        self.assertContains(response, 'Participant 2 - Workshop (maybe)')
+
+        response = self.client.post('/admin/core/rsvp/', {
+            'action': 'export_csv', 'index': '0', 'select_across': '1', '_selected_action': ['1'],
+        })
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'id,participant_id,participant_name,participant_email,event_id,event_name,status,comment,responded_at')
+        self.assertEqual(len(lines), 7)
+
+    def test_status_action_over_the_whole_changelist(self):
+        response = self.client.post('/admin/core/rsvp/', {
+            'action': f'mark_{RSVP.ATTENDING}', 'index': '0', 'select_across': '1', '_selected_action': ['1'],
+        }, follow=True)
+        self.assertContains(response, '3 RSVPs marked as attending.')
+        self.assertContains(response, '3 RSVPs to events with a capacity were skipped')
+        self.open_event.refresh_from_db()
+        self.assertEqual((self.open_event.attending_count, self.open_event.maybe_count), (3, 0))
+
+        response = self.client.post('/admin/core/rsvp/', {
+            'action': f'mark_{RSVP.NOT_ATTENDING}', 'index': '0',
+            '_selected_action': list(self.open_event.rsvps.values_list('pk', flat=True)),
+        }, follow=True)
+        self.assertContains(response, '3 RSVPs marked as not attending.')
+        self.open_event.refresh_from_db()
+        self.assertEqual((self.open_event.attending_count, self.open_event.not_attending_count), (0, 3))
+
+
+class RecurrenceTests(EventTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.series = EventSeries.objects.create(
+            name='Weekly meetup', description='Drinks and demos', time=time(19), location='Loft',
+            category=self.category, frequency=EventSeries.WEEKLY,
+            starts_on=date(2026, 1, 5), until=date(2026, 12, 31),
+        )
+
+    def test_occurrence_dates(self):
+        self.assertEqual(len(list(recurrence.occurrence_dates(self.series))), 52)
+        self.assertEqual(
+            list(recurrence.occurrence_dates(self.series, date(2026, 3, 1), date(2026, 3, 20))),
+            [date(2026, 3, 2), date(2026, 3, 9), date(2026, 3, 16)],
+        )
+        monthly = EventSeries(
+            frequency=EventSeries.MONTHLY, interval=1, starts_on=date(2026, 1, 31), count=4,
+            exceptions=['2026-03-31'],
+        )
+        # Months without a 31st are skipped; exceptions still use up the count
+        self.assertEqual(
+            list(recurrence.occurrence_dates(monthly)), [date(2026, 1, 31), date(2026, 5, 31), date(2026, 7, 31)],
+        )
+
+    def test_counting_and_listing_backwards_match_the_schedule(self):
+        daily = EventSeries(
+            frequency=EventSeries.DAILY, interval=3, starts_on=date(2026, 1, 1), count=20,
+            exceptions=['2026-01-10', '2026-01-11', '2026-03-01'],
+        )
+        for series in (self.series, daily):
+            for start, end in ((date(2025, 12, 1), date(2027, 1, 1)), (date(2026, 1, 8), date(2026, 2, 3))):
+                dates = list(recurrence.occurrence_dates(series, start, end))
+                self.assertEqual(recurrence.count_occurrence_dates(series, start, end), len(dates))
+                self.assertEqual(list(recurrence.occurrence_dates_before(series, end, start)), dates[::-1])
+        self.assertTrue(recurrence.falls_on(daily, date(2026, 1, 4)))
+        self.assertFalse(recurrence.falls_on(daily, date(2026, 1, 10)))
+
+    def test_occurrences_are_saved_on_first_rsvp(self):
+        participant = Participant.objects.get(user=self.login_superuser())
+
+        response = self.client.get('/events/', {'start_date': '2026-03-01', 'end_date': '2026-03-31'})
+        self.assertContains(response, f'/series/{self.series.pk}/2026-03-02/rsvp/')
+        self.assertEqual(Event.objects.count(), 0)
+
+        self.client.post(f'/series/{self.series.pk}/2026-03-02/rsvp/', {'status': RSVP.ATTENDING})
+        event = Event.objects.get()
+        self.assertEqual((event.series, event.occurrence_date, event.attending_count), (self.series, date(2026, 3, 2), 1))
+        self.assertTrue(RSVP.objects.filter(event=event, participant=participant).exists())
+
+        response = self.client.get('/events/', {'start_date': '2026-03-01', 'end_date': '2026-03-31'})
+        self.assertNotContains(response, f'/series/{self.series.pk}/2026-03-02/rsvp/')
+        self.assertContains(response, f'/events/{event.pk}/rsvp/')
+        self.assertContains(response, f'/series/{self.series.pk}/2026-03-09/rsvp/')
+
+    def test_editing_an_occurrence_saves_it(self):
+        self.login_as('Admin')
+        path = f'/series/{self.series.pk}/2026-03-09/edit/'
+        response = self.client.get(path)
+        self.assertContains(response, 'Weekly meetup')
+        form = response.context['form']
+        data = {name: form[name].value() for name in form.fields if form[name].value() is not None}
+        data['location'] = 'Rooftop'
+
+        response = self.client.post(path, data)
+        self.assertRedirects(response, '/events/')
+        event = Event.objects.get()
+        self.assertEqual(
+            (event.series, event.occurrence_date, event.location), (self.series, date(2026, 3, 9), 'Rooftop'),
+        )
+        self.assertRedirects(self.client.get(path), f'/events/{event.pk}/edit/', fetch_redirect_response=False)
+
+        # Tuesdays are not part of the series
+        self.assertEqual(self.client.get(f'/series/{self.series.pk}/2026-03-10/edit/').status_code, 404)
+        self.login_as('Participant')
+        self.assertEqual(self.client.get(path).status_code, 403)
+
+    def test_organizers_only_edit_occurrences_of_their_series(self):
+        owner = self.login_as('Organizer')
+        self.client.post('/series/create/', {
+            'name': 'Office hours', 'description': 'Questions welcome', 'time': '16:00', 'location': 'Room 2',
+            'category': self.category.pk, 'frequency': EventSeries.WEEKLY, 'interval': 1, 'starts_on': '2026-03-03',
+        })
+        series = EventSeries.objects.get(name='Office hours')
+        self.assertEqual(series.created_by, owner)
+        path = f'/series/{series.pk}/2026-03-10/edit/'
+        self.assertEqual(self.client.get(path).status_code, 200)
+
+        colleague = get_user_model().objects.create_user('colleague', 'colleague@example.com', 'pw')
+        colleague.groups.add(Group.objects.get(name='Organizer'))
+        self.client.force_login(colleague)
+        self.assertEqual(self.client.get(path).status_code, 403)
+        self.assertEqual(self.client.get(f'/series/{self.series.pk}/2026-03-09/edit/').status_code, 403)
+
+        # Saved by someone's RSVP, the occurrence still belongs to the owner
+        self.client.post(f'/series/{series.pk}/2026-03-10/rsvp/', {'status': RSVP.ATTENDING})
+        self.assertEqual(Event.objects.get(series=series).created_by, owner)
+
+
+    def test_organizers_list_only_their_own_series(self):
+        owner = self.login_as('Organizer')
+        EventSeries.objects.create(
+            name='Office hours', description='Questions welcome', time=time(16), location='Room 2',
+            category=self.category, frequency=EventSeries.WEEKLY, starts_on=date(2026, 3, 3), created_by=owner,
+        )
+        response = self.client.get('/events/', {'start_date': '2026-03-01', 'end_date': '2026-03-31'})
+        self.assertContains(response, 'Office hours', count=5)
+        self.assertNotContains(response, 'Weekly meetup')
+
+        self.login_superuser()
+        response = self.client.get('/events/', {'start_date': '2026-03-01', 'end_date': '2026-03-31'})
+        self.assertContains(response, 'Weekly meetup', count=5)
+
+
+class DashboardTests(EventTestMixin, TestCase):
+    def test_category_rename_shows_up(self):
+        self.make_event()
+        self.login_superuser()
+        self.assertContains(self.client.get('/dashboard/'), '<td class="border border-gray-300 px-4 py-2">Talks</td>')
+
+        etag = self.client.get('/dashboard/')['ETag']
+        self.client.post(f'/categories/{self.category.pk}/edit/', {'name': 'Lectures', 'description': ''})
+        response = self.client.get('/dashboard/', headers={'if-none-match': etag})
+        self.assertContains(response, '<td class="border border-gray-300 px-4 py-2">Lectures</td>')
+        self.assertNotContains(response, '<td class="border border-gray-300 px-4 py-2">Talks</td>')
+
+    @mock.patch('core.views.DASHBOARD_PANEL_SIZE', 2)
+    @mock.patch('core.stats.DASHBOARD_PANEL_SIZE', 2)
+    def test_panels_are_limited_but_counts_are_not(self):
+        today = date.today()
+        for hour in (9, 10, 11):
+            self.make_event(f'Talk {hour}', time=time(hour))
+        series = EventSeries.objects.create(
+            name='Daily standup', description='', time=time(8), location='Loft', category=self.category,
+            frequency=EventSeries.DAILY, starts_on=today, count=5,
+        )
+        recurrence.materialize(series.occurrence(date.fromordinal(today.toordinal() + 2)))
+        self.login_superuser()
+
+        response = self.client.get('/dashboard/')
+        # The saved occurrence is an Event; the four projected ones are counted apart
+        self.assertEqual(response.context['total_events'], 4)
+        self.assertEqual(response.context['upcoming_events'], 1)
+        self.assertEqual(response.context['scheduled_occurrences'], 4)
+        self.assertContains(response, '+ 4 scheduled from recurring series')
+        self.assertEqual([event['name'] for event in response.context['today_events']], ['Daily standup', 'Talk 9'])
+        self.assertEqual(len(response.context['events_list']), 2)
+        self.assertContains(response, "See all of today's events")
+        self.assertContains(response, 'Showing the first 2.')
+
+
+class BenchmarkTests(TestCase):
+    def test_every_route_answers_without_errors(self):
+        benchmark.seed_dataset(categories=2, events=20, participants=20, rsvps=50)
+        routes = benchmark.bench_routes(urls.urlpatterns, benchmark.create_bench_users(), repeat=1)
+        self.assertEqual(benchmark.route_errors(routes), [])
+
+    def test_error_responses_fail_the_comparison(self):
+        result = {'status': [200], 'p50_ms': 5.0, 'queries': 3, 'rows': 10}
+        baseline = {'routes': {'feed': result, 'profile': result}}
+        current = {'routes': {'feed': {**result, 'status': [404]}, 'profile': result}}
+        self.assertEqual(
+            benchmark.compare_reports(current, baseline), ['feed: status 404', 'feed: status [200] -> [404]'],
+        )
+
+
+class MigrationTests(TransactionTestCase):
+    def migrate(self, target):
+        executor = MigrationExecutor(connection)
+        executor.migrate([('core', target)])
+        return executor.loader.project_state([('core', target)]).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes('core'))
+
+    def test_backfills_existing_rows(self):
+        apps = self.migrate('0006_alter_event_category')
+        category = apps.get_model('core', 'Category').objects.create(name='Talks')
+        event = apps.get_model('core', 'Event').objects.create(
+            name='Keynote', description='Opening talk', date=date(2026, 3, 2), time=time(18),
+            location='Hall A', category=category,
+        )
+        participant = apps.get_model('core', 'Participant').objects.create(name='Ada', email='ada@example.com')
+        participant.events.add(event)
+        apps.get_model('core', 'RSVP').objects.create(participant=participant, event=event, status='attending')
+
+        self.migrate('0009_event_start_at_indexes')
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT rowid FROM core_event_fts WHERE core_event_fts MATCH 'keyn*'")
+            self.assertEqual(cursor.fetchall(), [(event.pk,)])
+            cursor.execute(
+                'SELECT start_at, attending_count, participant_count FROM core_event WHERE id = %s', [event.pk]
+            )
+            start_at, attending, participants = cursor.fetchone()
+        self.assertEqual(str(start_at)[:19], '2026-03-02 18:00:00')
+        self.assertEqual((attending, participants), (1, 1))
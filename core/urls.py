@@ -18,11 +18,22 @@ urlpatterns = [
     path('events/search/', views.search_events, name='event_search'),
     path('events/<int:event_id>/rsvp/', views.rsvp_create_or_update, name='rsvp_create_or_update'),
     path('events/<int:event_id>/rsvp/', rsvp_create_or_update, name='rsvp'),
+    path('autocomplete/<slug:kind>/', views.autocomplete, name='autocomplete'),
+    path('rsvps/bulk/', views.rsvp_bulk, name='rsvp_bulk'),
+    path('exports/<slug:kind>.<slug:fmt>', views.export_data, name='export_data'),
+
+    path('feeds/<str:token>/events.ics', views.event_feed, name='event_feed'),
+    path('feeds/<str:token>/categories/<int:category_id>.ics', views.event_feed, name='category_feed'),
+    path('feeds/<str:token>/mine.ics', views.event_feed, {'mine': True}, name='participant_feed'),
 
     path('events/create/', views.event_create, name='event_create'),
     path('events/<int:pk>/edit/', views.event_update, name='event_update'),
     path('events/<int:pk>/delete/', views.event_delete, name='event_delete'),
 
+    path('series/create/', views.series_create, name='series_create'),
+    path('series/<int:series_id>/<str:day>/edit/', views.occurrence_update, name='occurrence_update'),
+    path('series/<int:series_id>/<str:day>/rsvp/', views.occurrence_rsvp, name='occurrence_rsvp'),
+
     path('categories/create/', views.category_create, name='category_create'),
     path('categories/<int:pk>/edit/', views.category_update, name='category_update'),
     path('categories/<int:pk>/delete/', views.category_delete, name='category_delete'),
@@ -0,0 +1,81 @@
+import asyncio
+import time
+
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+
+def _key(name):
+    return f'stamp:{name}'
+
+
+def get_stamp(name):
+    """
+    Returns the last-change time of ``name`` as a Unix timestamp. A stamp
+    that was never set (or was evicted) starts at the current time, which
+    only makes clients refetch once.
+    """
+    stamp = cache.get(_key(name))
+    if stamp is None:
+        cache.add(_key(name), time.time(), None)
+        stamp = cache.get(_key(name))
+    return stamp
+
+
+def get_stamps(*names):
+    stamps = cache.get_many([_key(name) for name in names])
+    return [stamps.get(_key(name)) or get_stamp(name) for name in names]
+
+
+async def aget_stamps(*names):
+    stamps = await cache.aget_many([_key(name) for name in names])
+    missing = [name for name in names if stamps.get(_key(name)) is None]
+    for name in missing:
+        await cache.aadd(_key(name), time.time(), None)
+    if missing:
+        stamps.update(await cache.aget_many([_key(name) for name in missing]))
+    return [stamps[_key(name)] for name in names]
+
+
+def touch(*names):
+    now = time.time()
+    cache.set_many({_key(name): now for name in names}, None)
+
+
+def _model_name(model):
+    return f'model:{model._meta.label_lower}'
+
+
+def touch_models(*models):
+    touch(*(_model_name(model) for model in models))
+
+
+def models_version(*models):
+    """
+    A version string that changes whenever any of ``models`` is saved or
+    deleted; used to key cached template fragments.
+    """
+    return '-'.join(f'{stamp:.6f}' for stamp in get_stamps(*(_model_name(model) for model in models)))
+
+
+async def amodels_version(*models):
+    return '-'.join(f'{stamp:.6f}' for stamp in await aget_stamps(*(_model_name(model) for model in models)))
+
+
+def table_state(*models):
+    """
+    Returns (latest updated_at, row count) for each model's table. Deletes
+    leave updated_at alone, which is why the count is part of the state.
+    """
+    return [
+        tuple(model._default_manager.aggregate(changed=Max('updated_at'), rows=Count('pk')).values())
+        for model in models
+    ]
+
+
+async def atable_state(*models):
+    states = await asyncio.gather(*(
+        model._default_manager.aaggregate(changed=Max('updated_at'), rows=Count('pk'))
+        for model in models
+    ))
+    return [tuple(state.values()) for state in states]
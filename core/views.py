@@ -1,23 +1,41 @@
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, get_object_or_404, redirect
+from django.db import transaction
 from django.db.models import Count, Q
 from django.contrib import messages
-from django.http import HttpResponse
-from datetime import datetime, date
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import condition, require_POST
+import json
+from collections import Counter
+from datetime import datetime, date, timedelta
 
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib.auth import authenticate, login
 
-from .models import Category, Event, Participant, RSVP
-from .forms import EventForm, CategoryForm, ParticipantForm, SignupForm, RSVPForm
-from .decorators import group_required
+from .models import Category, Event, EventSeries, Participant, RSVP, day_range, start_of_day
+from .forms import EventForm, EventSeriesForm, CategoryForm, ParticipantForm, SignupForm, RSVPForm
+from .decorators import conditional_page, group_required, query_budget, replica_reads, write_view
+from .stats import DASHBOARD_PANEL_SIZE, get_dashboard_stats, get_today_events, get_dashboard_events
+from .pagination import KeysetPage
+from . import search
+from .roles import Roles, is_organizer
+from .routers import primary_reads
+from .rsvps import apply_rsvps
+from .exports import EXPORTS, EXPORT_FORMATS, stream_export
+from . import deletion, feeds, jobs, lookups, recurrence
+from .versions import models_version
 
 from django.contrib.auth.models import Group
 from django.core.exceptions import PermissionDenied
 from .forms import UserUpdateForm, ParticipantUpdateForm
 
 from django.contrib.sites.shortcuts import get_current_site
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.utils.functional import SimpleLazyObject
 from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
 from django.contrib.auth.tokens import default_token_generator
@@ -30,96 +48,344 @@ from django.contrib.auth.models import User
 
 
 
+# 6 once the stats and panels are cached; the first request of the day
+# also counts, loads the series and fills both panels
+@replica_reads
+@query_budget(13)
 @login_required
+@conditional_page(Event, EventSeries, Category, Participant, daily=True)
 def dashboard_view(request):
-    total_events = Event.objects.count()
-    total_participants = Participant.objects.count()
-    upcoming_events = Event.objects.filter(date__gt=date.today()).count()
-    past_events = Event.objects.filter(date__lt=date.today()).count()
-    today_events = Event.objects.filter(date=date.today())
-
     filter_type = request.GET.get('filter', 'all')
+    if filter_type not in ('upcoming', 'past'):
+        filter_type = 'all'
 
-    if filter_type == 'upcoming':
-        events_list = Event.objects.filter(date__gt=date.today()).order_by('date')
-    elif filter_type == 'past':
-        events_list = Event.objects.filter(date__lt=date.today()).order_by('-date')
-    else:
-        events_list = Event.objects.all().order_by('date')
-
-    events_list = events_list.annotate(participant_count=Count('participants')).select_related('category')
+    stats = get_dashboard_stats()
 
+    # The event panels are cached as rendered fragments, so the lists are
+    # only loaded when a fragment has to be rendered again.
     context = {
-        'total_events': total_events,
-        'total_participants': total_participants,
-        'upcoming_events': upcoming_events,
-        'past_events': past_events,
-        'today_events': today_events,
-        'events_list': events_list,
+        'total_events': stats['total_events'],
+        'total_participants': stats['total_participants'],
+        'upcoming_events': stats['upcoming_events'],
+        'past_events': stats['past_events'],
+        'scheduled_occurrences': stats['scheduled_occurrences'],
+        'today_events': SimpleLazyObject(get_today_events),
+        'events_list': SimpleLazyObject(lambda: get_dashboard_events(filter_type)),
         'filter_type': filter_type,
+        'panel_size': DASHBOARD_PANEL_SIZE,
+        'today': date.today(),
+        'fragment_version': models_version(Event, EventSeries, Category, Participant),
         'now': datetime.now(),
     }
     return render(request, 'core/dashboard.html', context)
 
 
+@replica_reads
+@query_budget(6)
 @login_required
+@conditional_page(Category, Event)
 def category_list(request):
     categories = Category.objects.all()
-    return render(request, 'core/category_list.html', {'categories': categories})
+    return render(request, 'core/category_list.html', {
+        'categories': categories,
+        'feed_token': feeds.make_feed_token(request.user),
+    })
+
 
 
+EVENT_PAGE_SIZE = 50
+EVENT_MAX_PAGE_SIZE = 5000
+EVENT_STREAM_THRESHOLD = 200
+FRAGMENT_TIMEOUT = 60 * 60 * 24
+
+
+def _page_size(request, default, maximum):
+    try:
+        size = int(request.GET.get('per_page', default))
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, maximum))
+
+
+def _valid_date(value):
+    try:
+        return parse_date(value) is not None
+    except ValueError:
+        return False
 
+
+@replica_reads
+@query_budget(10)
 @login_required
+@conditional_page(Event, EventSeries, Category)
 def event_list(request):
-    events = Event.objects.all()
+    organizer = is_organizer(request.user)
+    version = models_version(Event, EventSeries, Category, Participant, RSVP)
+    page, context = _event_list_page(request, organizer, version)
+    context['categories'] = Category.objects.all()
+
+    if context['per_page'] >= EVENT_STREAM_THRESHOLD and page.before is None:
+        return StreamingHttpResponse(_stream_event_list(request, page, context))
+
+    # Only loaded to fill the fragment cache, so from the primary
+    @primary_reads()
+    def load_events():
+        return list(merge_occurrences(page, page.object_list(), _event_occurrences(page, context)))
+
+    context['events'] = SimpleLazyObject(load_events)
+    return render(request, 'core/event_list.html', context)
+
+
+def _occurrence_start(page, context):
+    start, end, category_id, created_by = context['occurrence_window']
+    if page.before is None and page.after is not None:
+        # Nothing before the previous page's last row can belong here
+        after = timezone.localdate(datetime.fromisoformat(page.after[0]))
+        start = max(start, after) if start else after
+    return start, end, category_id, created_by
+
+
+def _event_occurrences(page, context):
+    if context['occurrence_window'] is None:
+        return iter(())
+    return recurrence.occurrences(*_occurrence_start(page, context))
+
+
+def merge_occurrences(page, rows, occurrences):
+    """
+    Merges series occurrences, in start_at order, into a page of events.
+    A page gets the occurrences from its first row up to the first row of
+    the next page, so paging through a date range shows each one once.
+    """
+    occurrences = iter(occurrences)
+    upcoming = next(occurrences, None)
+    first = True
+    for row in rows:
+        if first and page.has_previous:
+            # Earlier ones were shown on the previous page
+            while upcoming is not None and upcoming.start_at < row.start_at:
+                upcoming = next(occurrences, None)
+        first = False
+        while upcoming is not None and upcoming.start_at < row.start_at:
+            yield upcoming
+            upcoming = next(occurrences, None)
+        yield row
+    if first and page.has_previous:
+        return
+    following = page.following_position
+    end = datetime.fromisoformat(following[0]) if following else None
+    while upcoming is not None and (end is None or upcoming.start_at < end):
+        yield upcoming
+        upcoming = next(occurrences, None)
+
+
+def _event_list_page(request, organizer, version):
+    """
+    The filtered KeysetPage for event_list and the template context that
+    goes with it; shared by the sync and async views.
+    """
+    events = Event.objects.select_related('category')
 
     # Filter by category and date
-    category_id = request.GET.get('category')
-    start_date = request.GET.get('start_date')
-    end_date = request.GET.get('end_date')
+    category_id = request.GET.get('category') or ''
+    start_date = request.GET.get('start_date') or ''
+    end_date = request.GET.get('end_date') or ''
 
-    if category_id:
+    if category_id.isdigit():
         events = events.filter(category_id=category_id)
-    if start_date:
-        events = events.filter(date__gte=start_date)
-    if end_date:
-        events = events.filter(date__lte=end_date)
+    else:
+        category_id = ''
+    if _valid_date(start_date):
+        events = events.filter(start_at__gte=start_of_day(parse_date(start_date)))
+    else:
+        start_date = ''
+    if _valid_date(end_date):
+        events = events.filter(start_at__lt=day_range(parse_date(end_date))[1])
+    else:
+        end_date = ''
 
     # Restrict organizers to only their own events
-    if request.user.groups.filter(name='Organizer').exists():
+    if organizer:
         events = events.filter(created_by=request.user)
 
-    categories = Category.objects.all()
+    # Series occurrences are only expanded for a date range, since
+    # open-ended series have no last one
+    occurrence_window = None
+    if start_date or end_date:
+        start = parse_date(start_date) if start_date else None
+        end = parse_date(end_date) + timedelta(days=1) if end_date else recurrence.horizon(start)
+        # Organizers only see their own series, as with their events
+        occurrence_window = (start, end, category_id or None, request.user if organizer else None)
+
+    per_page = _page_size(request, EVENT_PAGE_SIZE, EVENT_MAX_PAGE_SIZE)
+    filters = [category_id, start_date, end_date]
+    page = KeysetPage(
+        events, ('start_at', 'id'), per_page, filters,
+        after=request.GET.get('after'), before=request.GET.get('before'),
+    )
 
-    return render(request, 'core/event_list.html', {
-        'events': events,
-        'categories': categories,
+    context = {
         'selected_category': category_id,
         'start_date': start_date,
         'end_date': end_date,
-    })
-
+        'per_page': per_page,
+        'page': page,
+        'occurrence_window': occurrence_window,
+        'fragment_vary': [
+            version, filters, per_page, request.GET.get('after'), request.GET.get('before'),
+            request.user.pk if organizer else None,
+        ],
+    }
+    return page, context
+
+
+def _split_event_list(html):
+    # The page is rendered with markers where the rows and pagination go, so
+    # the surrounding layout can be sent before the rows are fetched.
+    head, rest = html.split('<!--event-rows-->', 1)
+    middle, tail = rest.split('<!--event-pagination-->', 1)
+    return head, middle, tail
+
+
+def _event_stream_key(context, can_manage_events):
+    return make_template_fragment_key('event_list_stream', [context['fragment_vary'], can_manage_events])
+
+
+def _stream_event_list(request, page, context):
+    html = render_to_string('core/event_list.html', dict(context, streaming=True), request=request)
+    head, middle, tail = _split_event_list(html)
+    yield head
+
+    key = _event_stream_key(context, Roles(request.user).can_manage_events)
+    cached = cache.get(key)
+    if cached is not None:
+        rows, pagination = cached
+        yield rows
+        yield middle
+        yield pagination
+        yield tail
+        return
+
+    # ReplicaRoutingMiddleware is done before the body runs, so these rows
+    # come from the primary and are safe to cache
+    rows = []
+    chunk = []
+    for event in merge_occurrences(page, page.iterator(), _event_occurrences(page, context)):
+        chunk.append(event)
+        if len(chunk) == 100:
+            rows.append(render_to_string('core/event_list_rows.html', {'events': chunk}, request=request))
+            yield rows[-1]
+            chunk = []
+    if chunk or not rows:
+        rows.append(render_to_string('core/event_list_rows.html', {'events': chunk}, request=request))
+        yield rows[-1]
+
+    yield middle
+    pagination = render_to_string('core/event_list_pagination.html', dict(context, page=page), request=request)
+    yield pagination
+    yield tail
+    cache.set(key, (''.join(rows), pagination), FRAGMENT_TIMEOUT)
+
+
+PARTICIPANT_PAGE_SIZE = 50
+PARTICIPANT_MAX_PAGE_SIZE = 500
+PARTICIPANT_RECENT_EVENTS = 5
+PARTICIPANT_SORTS = {
+    'name': ('name', 'id'),
+    '-name': ('-name', '-id'),
+    'email': ('email', 'id'),
+    '-email': ('-email', '-id'),
+    'events': ('event_count', 'id'),
+    '-events': ('-event_count', '-id'),
+}
+
+
+@replica_reads
+@query_budget(5)
 @login_required
 def participant_list(request):
-    participants = Participant.objects.prefetch_related('events')
-    return render(request, 'core/participant_list.html', {'participants': participants})
+    query = (request.GET.get('q') or '').strip()
+    sort = request.GET.get('sort', 'name')
+    if sort not in PARTICIPANT_SORTS:
+        sort = 'name'
 
+    participants = Participant.objects.with_recent_events(PARTICIPANT_RECENT_EVENTS)
+    if query:
+        participants = participants.filter(Q(name__istartswith=query) | Q(email__istartswith=query))
+
+    per_page = _page_size(request, PARTICIPANT_PAGE_SIZE, PARTICIPANT_MAX_PAGE_SIZE)
+    page = KeysetPage(
+        participants, PARTICIPANT_SORTS[sort], per_page, [query, sort],
+        after=request.GET.get('after'), before=request.GET.get('before'),
+    )
+    return render(request, 'core/participant_list.html', {
+        'participants': page.object_list(),
+        'page': page,
+        'query': query,
+        'sort': sort,
+        'per_page': per_page,
+    })
+
+
+SEARCH_PAGE_SIZE = 20
+
+
+def _search_params(request):
+    query = (request.GET.get('q') or '').strip()
+    try:
+        page_number = max(1, int(request.GET.get('page', 1)))
+    except (TypeError, ValueError):
+        page_number = 1
+    return query, page_number
 
+
+@replica_reads
+@query_budget(7)
 @login_required
+@conditional_page(Event, Category)
 def search_events(request):
-    query = request.GET.get('q')
-    events = Event.objects.all()
-    if query:
-        events = events.filter(
-            Q(name__icontains=query) |
-            Q(location__icontains=query)
-        ).select_related('category')
-    return render(request, 'core/search_results.html', {'events': events, 'query': query})
+    query, page_number = _search_params(request)
+
+    @primary_reads()
+    def run_search():
+        events, has_next = search.search_events(
+            query, offset=(page_number - 1) * SEARCH_PAGE_SIZE, limit=SEARCH_PAGE_SIZE
+        )
+        return {'events': events, 'has_next': has_next}
+
+    return render(request, 'core/search_results.html', {
+        'results': SimpleLazyObject(run_search),
+        'query': query,
+        'page_number': page_number,
+        'has_previous': page_number > 1,
+        'fragment_version': models_version(Event, Category),
+    })
+
+
+AUTOCOMPLETE_LIMIT = 20
+AUTOCOMPLETE_MAX_LIMIT = 50
+
+
+@replica_reads
+@query_budget(4)
+@login_required
+@group_required('Admin', 'Organizer')
+def autocomplete(request, kind):
+    if kind not in lookups.LOOKUPS:
+        raise Http404
+    query = (request.GET.get('q') or '').strip()
+    try:
+        limit = max(1, min(int(request.GET.get('limit', AUTOCOMPLETE_LIMIT)), AUTOCOMPLETE_MAX_LIMIT))
+    except (TypeError, ValueError):
+        limit = AUTOCOMPLETE_LIMIT
+    rows, more = lookups.autocomplete(kind, query, limit)
+    return JsonResponse({'results': [{'id': pk, 'text': text} for pk, text in rows], 'more': more})
 
 
 # Event CRUD
 @login_required
 @group_required('Admin', 'Organizer')
+@write_view()
 def event_create(request):
     if request.method == 'POST':
         form = EventForm(request.POST)
@@ -127,7 +393,7 @@ def event_create(request):
             event = form.save(commit=False)
 
             # Assign created_by only if user is an Organizer
-            if request.user.groups.filter(name='Organizer').exists():
+            if is_organizer(request.user):
                 event.created_by = request.user
 
             event.save()
@@ -140,11 +406,12 @@ def event_create(request):
 
 @login_required
 @group_required('Admin', 'Organizer')
+@write_view()
 def event_update(request, pk):
     event = get_object_or_404(Event, pk=pk)
 
     # Restrict access to only the creator or admin
-    if request.user != event.created_by and not request.user.is_superuser:
+    if event.created_by_id != request.user.pk and not Roles(request.user).is_admin:
         raise PermissionDenied
 
     if request.method == 'POST':
@@ -161,23 +428,90 @@ def event_update(request, pk):
 
 @login_required
 @group_required('Admin', 'Organizer')
+@write_view()
 def event_delete(request, pk):
     event = get_object_or_404(Event, pk=pk)
 
     # Restrict access to only the creator or admin
-    if request.user != event.created_by and not request.user.is_superuser:
+    if event.created_by_id != request.user.pk and not Roles(request.user).is_admin:
         raise PermissionDenied
 
     if request.method == 'POST':
-        event.delete()
+        # Hidden now; its RSVPs are purged in the background
+        deletion.soft_delete_event(event)
         messages.success(request, "Event deleted successfully.")
         return redirect('event_list')
     return render(request, 'core/event_confirm_delete.html', {'event': event})
 
 
+# Recurring events
+@login_required
+@group_required('Admin', 'Organizer')
+@write_view()
+def series_create(request):
+    if request.method == 'POST':
+        form = EventSeriesForm(request.POST)
+        if form.is_valid():
+            series = form.save(commit=False)
+            if is_organizer(request.user):
+                series.created_by = request.user
+            series.save()
+            messages.success(request, "Recurring event created successfully.")
+            return redirect('event_list')
+    else:
+        form = EventSeriesForm()
+    return render(request, 'core/event_form.html', {'form': form})
+
+
+def _occurrence_or_404(series_id, day):
+    series = get_object_or_404(EventSeries.objects.select_related('category'), pk=series_id)
+    try:
+        event = recurrence.get_occurrence(series, date.fromisoformat(day))
+    except ValueError:
+        raise Http404
+    if event is None:
+        raise Http404
+    return event
+
+
+@login_required
+@group_required('Admin', 'Organizer')
+@write_view()
+def occurrence_update(request, series_id, day):
+    event = _occurrence_or_404(series_id, day)
+    if event.pk is not None:
+        return redirect('event_update', pk=event.pk)
+
+    # Occurrences belong to whoever created the series, as in event_update
+    if event.created_by_id != request.user.pk and not Roles(request.user).is_admin:
+        raise PermissionDenied
+
+    if request.method == 'POST':
+        form = EventForm(request.POST, instance=event)
+        if form.is_valid():
+            event = form.save(commit=False)
+            # Saved as an Event of its own, which the series then leaves out
+            recurrence.materialize(event)
+            messages.success(request, "Event updated successfully.")
+            return redirect('event_list')
+    else:
+        form = EventForm(instance=event)
+    return render(request, 'core/event_form.html', {'form': form})
+
+
+@login_required
+@write_view()
+def occurrence_rsvp(request, series_id, day):
+    event = _occurrence_or_404(series_id, day)
+    if event.pk is not None:
+        return redirect('rsvp_create_or_update', event_id=event.pk)
+    return _rsvp(request, event)
+
+
 # Category CRUD
 @login_required
 @group_required('Admin')
+@write_view()
 def category_create(request):
     if request.method == 'POST':
         form = CategoryForm(request.POST)
@@ -192,6 +526,7 @@ def category_create(request):
 
 @login_required
 @group_required('Admin')
+@write_view()
 def category_update(request, pk):
     category = get_object_or_404(Category, pk=pk)
     if request.method == 'POST':
@@ -207,10 +542,12 @@ def category_update(request, pk):
 
 @login_required
 @group_required('Admin')
+@write_view()
 def category_delete(request, pk):
     category = get_object_or_404(Category, pk=pk)
     if request.method == 'POST':
-        category.delete()
+        # Hidden now with its events; the rows are purged in the background
+        deletion.soft_delete_category(category)
         messages.success(request, "Category deleted successfully.")
         return redirect('category_list')
     return render(request, 'core/category_confirm_delete.html', {'category': category})
@@ -219,6 +556,7 @@ def category_delete(request, pk):
 # Participant CRUD
 @login_required
 @group_required('Admin', 'Organizer')
+@write_view()
 def participant_create(request):
     if request.method == 'POST':
         form = ParticipantForm(request.POST)
@@ -232,6 +570,7 @@ def participant_create(request):
 
 
 @login_required
+@write_view()
 def participant_update(request, pk):
     participant = get_object_or_404(Participant, pk=pk)
     if request.method == 'POST':
@@ -246,6 +585,7 @@ def participant_update(request, pk):
 
 
 @login_required
+@write_view()
 def participant_delete(request, pk):
     participant = get_object_or_404(Participant, pk=pk)
     if request.method == 'POST':
@@ -258,6 +598,7 @@ def participant_delete(request, pk):
 # Auth Views
 
 
+@write_view()
 def signup_view(request):
     if request.method == 'POST':
         form = SignupForm(request.POST)
@@ -265,7 +606,7 @@ def signup_view(request):
             user = form.save(commit=False)
             user.is_active = False
             user.save()
-            # send activation email (your existing code)...
+            _queue_activation_email(request, user)
             messages.success(request, 'Account created! Please check your email to activate your account.')
             return redirect('login')
         else:
@@ -275,6 +616,16 @@ def signup_view(request):
     return render(request, 'core/signup.html', {'form': form})
 
 
+def _queue_activation_email(request, user):
+    # Sent by the run_jobs worker, so signup doesn't wait on the mail server
+    body = render_to_string('core/account_activation_email.html', {
+        'user': user,
+        'domain': get_current_site(request).domain,
+        'uid': urlsafe_base64_encode(force_bytes(user.pk)),
+        'token': default_token_generator.make_token(user),
+    })
+    jobs.queue_email('Activate your account', body, [user.email], key=f'activation:{user.pk}')
+
 
 def login_view(request):
     if request.method == 'POST':
@@ -298,21 +649,37 @@ def login_view(request):
 
 # RSVP
 @login_required
+@write_view()
 def rsvp_create_or_update(request, event_id):
-    event = get_object_or_404(Event, id=event_id)
+    return _rsvp(request, get_object_or_404(Event, id=event_id))
+
+
+def _rsvp(request, event):
     try:
         participant = Participant.objects.get(user=request.user)
     except Participant.DoesNotExist:
         messages.error(request, "You are not registered as a participant.")
         return redirect('event_list')
 
-    rsvp, created = RSVP.objects.get_or_create(event=event, participant=participant)
+    # Only saved once the form is submitted, so each POST writes the row once
+    rsvp = None
+    if event.pk is not None:
+        rsvp = RSVP.objects.filter(event=event, participant=participant).first()
+    if rsvp is None:
+        rsvp = RSVP(event=event, participant=participant)
 
     if request.method == 'POST':
         form = RSVPForm(request.POST, instance=rsvp)
         if form.is_valid():
-            form.save()
-            messages.success(request, "Your RSVP has been submitted.")
+            # An occurrence of a series becomes a real event on its first RSVP
+            rsvp.event = recurrence.materialize(event)
+            # The RSVP row and the event's tallies change together
+            with transaction.atomic():
+                rsvp = form.save()
+            if rsvp.status == RSVP.WAITLISTED:
+                messages.info(request, "This event is full, so you have been added to the waitlist.")
+            else:
+                messages.success(request, "Your RSVP has been submitted.")
             return redirect('event_list')
     else:
         form = RSVPForm(instance=rsvp)
@@ -322,16 +689,115 @@ def rsvp_create_or_update(request, event_id):
 
 
 
+def _export_filters(params):
+    filters = {}
+    for name in ('event', 'category'):
+        value = params.get(name) or ''
+        if value.isdigit():
+            filters[name] = int(value)
+    for name in ('start_date', 'end_date'):
+        if _valid_date(params.get(name) or ''):
+            filters[name] = parse_date(params[name])
+    return filters
+
+
+@login_required
+@group_required('Admin', 'Organizer')
+def export_data(request, kind, fmt):
+    if kind not in EXPORTS or fmt not in EXPORT_FORMATS:
+        raise Http404
+    response = StreamingHttpResponse(
+        stream_export(kind, fmt, **_export_filters(request.GET)),
+        content_type=EXPORT_FORMATS[fmt],
+    )
+    response['Content-Disposition'] = f'attachment; filename="{kind}.{fmt}"'
+    return response
+
+
+BULK_RSVP_MAX_ROWS = 10000
+
+
+@require_POST
+@login_required
+@group_required('Admin', 'Organizer')
+@write_view()
+def rsvp_bulk(request):
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'error': 'Request body must be JSON.'}, status=400)
+    rows = payload.get('rsvps') if isinstance(payload, dict) else None
+    if not isinstance(rows, list):
+        return JsonResponse({'error': 'Expected {"rsvps": [...]}.'}, status=400)
+    if len(rows) > BULK_RSVP_MAX_ROWS:
+        return JsonResponse({'error': f'At most {BULK_RSVP_MAX_ROWS} RSVPs per request.'}, status=400)
+
+    # Organizers may only answer for their own events, as when editing them
+    results = apply_rsvps(rows, created_by=None if Roles(request.user).is_admin else request.user)
+    summary = Counter(result['status'] for result in results)
+    return JsonResponse({'summary': summary, 'results': results})
+
+
+def _feed_names(token, category_id=None, mine=False):
+    owner = feeds.read_feed_token(token)
+    if owner is None:
+        return None
+    if mine:
+        return feeds.participant_stamp_names(owner[1]) if owner[1] else None
+    if category_id is not None:
+        return feeds.category_stamp_names(category_id)
+    return feeds.all_events_stamp_names()
+
+
+def _feed_etag(request, token, category_id=None, mine=False):
+    names = _feed_names(token, category_id, mine)
+    return feeds.feed_etag(names) if names else None
+
+
+def _feed_last_modified(request, token, category_id=None, mine=False):
+    names = _feed_names(token, category_id, mine)
+    return feeds.feed_last_modified(names) if names else None
+
+
+@condition(etag_func=_feed_etag, last_modified_func=_feed_last_modified)
+def event_feed(request, token, category_id=None, mine=False):
+    names = _feed_names(token, category_id, mine)
+    if names is None:
+        raise Http404
+    owner = feeds.read_feed_token(token)
+    if mine:
+        name = 'My events'
+        events = feeds.feed_events(participant_id=owner[1])
+    elif category_id is not None:
+        category = get_object_or_404(Category, pk=category_id)
+        name = category.name
+        events = feeds.feed_events(category_id=category_id)
+    else:
+        name = 'All events'
+        events = feeds.feed_events()
+    response = StreamingHttpResponse(
+        feeds.stream_calendar(name, events, request.get_host(), feeds.feed_stamp(names)),
+        content_type='text/calendar; charset=utf-8',
+    )
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+@query_budget(4)
 @login_required
 def profile_view(request):
     participant = get_object_or_404(Participant, user=request.user)
-    return render(request, 'core/profile.html', {'participant': participant})
+    return render(request, 'core/profile.html', {
+        'participant': participant,
+        'feed_token': feeds.make_feed_token(request.user, participant),
+    })
 
 
 
 
 
 @login_required
+@write_view()
 def profile_edit(request):
     participant = get_object_or_404(Participant, user=request.user)
 
@@ -0,0 +1,41 @@
+from django import forms
+from django.urls import reverse
+
+
+class AutocompleteSelect(forms.Select):
+    """
+    A select for a ModelChoiceField that renders only the chosen options
+    and fetches the rest from an autocomplete endpoint as the user types,
+    so the page doesn't grow with the related table.
+    """
+
+    def __init__(self, kind, attrs=None):
+        super().__init__(attrs)
+        self.kind = kind
+
+    class Media:
+        js = ['core/autocomplete.js']
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        attrs['data-autocomplete-url'] = reverse('autocomplete', args=[self.kind])
+        return attrs
+
+    def optgroups(self, name, value, attrs=None):
+        # Look up just the selected ids instead of iterating self.choices,
+        # which would load the whole queryset
+        selected = {str(pk) for pk in value if pk not in (None, '')}
+        options = []
+        if not self.allow_multiple_selected:
+            options.append(self.create_option(name, '', '---------', not selected, 0))
+        if selected:
+            queryset = self.choices.queryset.filter(pk__in=selected)
+            for index, obj in enumerate(queryset, start=len(options)):
+                option_value = self.choices.field.prepare_value(obj)
+                label = self.choices.field.label_from_instance(obj)
+                options.append(self.create_option(name, option_value, label, True, index))
+        return [(None, options, 0)]
+
+
+class AutocompleteSelectMultiple(AutocompleteSelect, forms.SelectMultiple):
+    pass
@@ -0,0 +1,9 @@
+from django.urls import include, path
+
+from .urls import urlpatterns as sync_urlpatterns
+
+# Under ASGI the read-heavy pages resolve to their async versions first;
+# everything else falls through to the usual URLconf.
+urlpatterns = [
+    path('', include('core.async_urls')),
+] + sync_urlpatterns
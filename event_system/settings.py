@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,15 +45,20 @@ AUTH_USER_MODEL = 'core.CustomUser'
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.QueryInstrumentationMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'event_system.urls'
+# Set by event_system.asgi; the read-heavy pages then use the async views
+SERVER_MODE = os.environ.get('DJANGO_SERVER_MODE', 'wsgi')
+
+ROOT_URLCONF = 'event_system.asgi_urls' if SERVER_MODE == 'asgi' else 'event_system.urls'
 
 TEMPLATES = [
     {
@@ -64,6 +70,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'core.context_processors.roles',
             ],
         },
     },
@@ -78,7 +85,70 @@ WSGI_APPLICATION = 'event_system.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        # SQLITE_DATABASE lets the load tests point servers at a seeded copy
+        'NAME': BASE_DIR / os.environ.get('SQLITE_DATABASE', 'db.sqlite3'),
+        # Each gunicorn worker keeps its connection instead of reopening
+        # (and re-applying SQLITE_PRAGMAS) on every request
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Wait for the write lock instead of failing straight away;
+            # write_view also takes it as soon as its transaction starts
+            'timeout': 20,
+        },
+        'TEST': {
+            # The threaded tests need a file database. It is migrated like
+            # any other, so the search table and backfills exist in tests.
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
+    }
+}
+
+# Read replicas used by core.routers.ReplicaRouter. To try them locally,
+# set SQLITE_REPLICAS to a comma-separated list of files and copy the
+# primary into them with `manage.py sync_replicas`.
+DATABASE_REPLICAS = []
+for index, path in enumerate(filter(None, os.environ.get('SQLITE_REPLICAS', '').split(',')), 1):
+    DATABASES[f'replica{index}'] = {
+        **DATABASES['default'],
+        'NAME': BASE_DIR / path.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{index}')
+
+if SERVER_MODE == 'asgi':
+    # Async views run their queries on short-lived executor threads, which
+    # would each leave a persistent connection behind
+    for database in DATABASES.values():
+        database['CONN_MAX_AGE'] = 0
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# How long someone who just wrote keeps reading from the primary
+REPLICA_STICKY_SECONDS = 15
+
+# Applied to every new SQLite connection by core.sqlite.apply_pragmas
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -20000,  # KiB, so about 20MB of page cache
+    'mmap_size': 128 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+# Role lookups, dashboard stats versions, feed stamps and fragment versions
+# are invalidated by bumping cache entries, so every worker has to read the
+# same cache; a per-process LocMemCache would leave the other gunicorn
+# workers serving stale roles and pages. Files on the host are shared by
+# all its workers without another service, and unlike DatabaseCache don't
+# add queries (or write locks) on the SQLite file the cache is sparing.
+# The file cache's incr() is not atomic across processes, so the version
+# keys in core.stats and core.versions are only ever set to a fresh value.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('DJANGO_CACHE_DIR', BASE_DIR / 'cache'),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
     }
 }
 
@@ -138,3 +208,22 @@ ALLOWED_HOSTS = ['*']
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 DEFAULT_FROM_EMAIL = 'webmaster@localhost'
 
+
+# Budget overruns from core.middleware; set core.performance to DEBUG to
+# also log every request's queries and timings
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.performance': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
+# Raise instead of logging when a view exceeds its query_budget. The test
+# runner turns it on, so the tests fail on an overrun.
+QUERY_BUDGET_RAISE = False
+
+TEST_RUNNER = 'core.test_runner.QueryBudgetTestRunner'